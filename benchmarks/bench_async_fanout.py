@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""对比串行阻塞请求与 AsyncClient 并发扇出的吞吐
+
+本地替身服务器为每个请求增加 --latency 秒的延迟来模拟到交易所的往返时间。
+
+    python -m benchmarks.bench_async_fanout --requests 200 --latency 0.05
+"""
+import argparse
+import asyncio
+import time
+
+import okx.Trade_api as TradeAPI
+from okx.async_api import AsyncTradeAPI
+from mock.okx_rest import StubServer
+
+
+def run_sync(base_url, inst_ids):
+    api = TradeAPI.TradeAPI('key', 'secret', 'pass', False, '0', base_api=base_url, rate_limiter=False)
+    for inst_id in inst_ids:
+        api.close_positions(instId=inst_id, mgnMode='cross', posSide='net', autoCxl='true')
+
+
+async def run_async(base_url, inst_ids, concurrency):
+    async with AsyncTradeAPI('key', 'secret', 'pass', False, '0', base_api=base_url, max_in_flight=concurrency,
+                             rate_limiter=False) as api:
+        await asyncio.gather(*(api.close_positions(instId=inst_id, mgnMode='cross', posSide='net', autoCxl='true')
+                               for inst_id in inst_ids))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--concurrency', type=int, default=100)
+    args = parser.parse_args()
+
+    inst_ids = [f"COIN{i}-USDT-SWAP" for i in range(args.requests)]
+    with StubServer(latency=args.latency) as server:
+        start = time.perf_counter()
+        run_sync(server.base_url, inst_ids)
+        sync_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        asyncio.run(run_async(server.base_url, inst_ids, args.concurrency))
+        async_elapsed = time.perf_counter() - start
+
+    print(f"sync   {args.requests} requests in {sync_elapsed:.2f}s  ({args.requests / sync_elapsed:.0f} req/s)")
+    print(f"async  {args.requests} requests in {async_elapsed:.2f}s  ({args.requests / async_elapsed:.0f} req/s), "
+          f"concurrency={args.concurrency}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""对比 ccxt 规范化全部 positionRisk 行与只为非零仓位构造精简记录的 CPU 开销
+
+用合成的 positionRisk 响应（--rows 行，其中 --live 行有仓位），不访问网络。
+
+    python -m benchmarks.bench_bn_positions --rows 300 --live 5
+"""
+import argparse
+import time
+import tracemalloc
+
+import ccxt
+
+from trail.binance_positions import PositionRiskReader
+
+
+def synthetic_rows(rows, live):
+    return [{"symbol": f"COIN{i}USDT", "positionSide": "BOTH", "positionAmt": "1.5" if i < live else "0.000",
+             "entryPrice": "1.0", "breakEvenPrice": "1.0", "markPrice": "1.1", "unRealizedProfit": "0",
+             "liquidationPrice": "0", "isolatedMargin": "0", "notional": "0", "isolatedWallet": "0",
+             "updateTime": "0", "initialMargin": "0", "maintMargin": "0", "positionInitialMargin": "0",
+             "openOrderInitialMargin": "0", "adl": "0", "bidNotional": "0", "askNotional": "0",
+             "marginAsset": "USDT"} for i in range(rows)]
+
+
+def measure(func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = func()
+    elapsed = (time.perf_counter() - start) / rounds
+    # 内存峰值单独跑一轮测量，tracemalloc 会拖慢计时
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=300)
+    parser.add_argument('--live', type=int, default=5)
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows, args.live)
+    exchange = ccxt.binance({'options': {'defaultType': 'future'}})
+    reader = PositionRiskReader(exchange)
+    reader.symbols = {row['symbol']: f"{row['symbol'][:-4]}/USDT:USDT" for row in rows}
+
+    def ccxt_path():
+        positions = [exchange.parse_position_risk(row) for row in rows]
+        return [position for position in positions if float(position['info']['positionAmt']) != 0]
+
+    for name, func in (('ccxt', ccxt_path), ('fast', lambda: reader.parse(rows))):
+        elapsed, peak, result = measure(func, args.rounds)
+        print(f"{name:<5} {elapsed * 1000:8.3f} ms/cycle  peak alloc {peak / 1024:8.1f} KiB  live={len(result)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""对比 okx.client 连接池前后的请求延迟
+
+before: 每次请求直接调用 requests.get/post（旧实现），每次都要重新 TCP+TLS 握手
+after:  共享 keep-alive Session
+
+    python -m benchmarks.bench_client_pool --requests 500
+"""
+import argparse
+import statistics
+import time
+
+import requests
+
+import okx.Trade_api as TradeAPI
+from okx.client import new_session
+from mock.okx_rest import StubServer
+
+
+class _BareRequests:
+    """模拟旧版 Client：每次调用模块级 requests.get/post"""
+
+    def __init__(self, verify):
+        self.verify = verify
+
+    def get(self, url, **kwargs):
+        return requests.get(url, verify=self.verify, **kwargs)
+
+    def post(self, url, **kwargs):
+        return requests.post(url, verify=self.verify, **kwargs)
+
+
+def measure(api, n):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        api.get_order_list(instType='SWAP')
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name, samples, connections):
+    q = statistics.quantiles(samples, n=100)
+    print(f"{name:<7} p50={q[49]:.2f}ms  p99={q[98]:.2f}ms  mean={statistics.mean(samples):.2f}ms  "
+          f"connections={connections}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=300)
+    args = parser.parse_args()
+
+    with StubServer(tls=True) as server:
+        session = new_session()
+        session.verify = server.cert_file
+        session.trust_env = False  # 否则 REQUESTS_CA_BUNDLE 会覆盖上面的 verify
+        runs = [
+            ('before', _BareRequests(server.cert_file)),
+            ('after', session),
+        ]
+        for name, transport in runs:
+            api = TradeAPI.TradeAPI('key', 'secret', 'pass', False, '0', base_api=server.base_url, session=transport,
+                                    rate_limiter=False)
+            measure(api, 5)  # 预热
+            before = server.connection_count
+            samples = measure(api, args.requests)
+            report(name, samples, server.connection_count - before)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""在模拟交易所上跑 TrailingBot 的完整轮询流程（拉取 -> 差分 -> 分档判断 -> 平仓），统计单轮耗时
+
+行情由 mock.adapter.MockAdapter 按固定种子生成，--move-ratio 控制每轮价格变化的仓位比例；
+同样的参数每次输出同样的平仓数和平仓序列校验值，可用来对比核心改动前后的耗时和行为。
+
+    python -m benchmarks.bench_core --positions 500 --cycles 300 --move-ratio 0.2
+    python -m benchmarks.bench_core --positions 500 --cycles 300 --scalar   # 关闭 VectorEngine，校验值应相同
+"""
+import argparse
+import logging
+import statistics
+import time
+import zlib
+
+from mock.adapter import MockAdapter
+from trail.core import TrailingBot
+
+CONFIG = dict(leverage=10, stop_loss_pct=2, low_trail_stop_loss_pct=0.2, trail_stop_loss_pct=0.2,
+              higher_trail_stop_loss_pct=0.25, low_trail_profit_threshold=0.3, first_trail_profit_threshold=1.0,
+              second_trail_profit_threshold=3.0, state_dir="")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--positions', type=int, default=500)
+    parser.add_argument('--cycles', type=int, default=300)
+    parser.add_argument('--move-ratio', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--volatility', type=float, default=0.002, help="每轮标记价格变化的标准差")
+    parser.add_argument('--scalar', action='store_true', help="关闭 VectorEngine，全部逐仓位判断")
+    args = parser.parse_args()
+    config = dict(CONFIG, vector_engine=not args.scalar)
+
+    # 只计核心逻辑的耗时，日志不输出
+    logger = logging.getLogger('bench_core')
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    adapter = MockAdapter(config, logger, positions=args.positions, seed=args.seed, volatility=args.volatility,
+                          move_ratio=args.move_ratio)
+    bot = TrailingBot(adapter, config, logger)
+
+    samples = []
+    for _ in range(args.cycles):
+        adapter.step()
+        start = time.perf_counter()
+        bot.monitor_positions()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    q = statistics.quantiles(samples, n=100)
+    checksum = zlib.crc32(repr(adapter.closed).encode())
+    print(f"positions={args.positions} cycles={args.cycles} move_ratio={args.move_ratio} scalar={args.scalar}")
+    print(f"cycle p50={q[49]:.3f}ms  p99={q[98]:.3f}ms  max={max(samples):.3f}ms")
+    print(f"closed={len(adapter.closed)} remaining={len(adapter.positions)} checksum={checksum:08x}")
+
+
+if __name__ == '__main__':
+    main()
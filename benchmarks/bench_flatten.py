@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""对比逐个平仓（原 close_all_positions：串行请求 + 每个品种 sleep 0.1s）与并发全部平仓的耗时
+
+两种方式都经过默认的按账户限速器，所以超过 20 个仓位时并发版本也会按 20 次/2s 排队。
+
+    python -m benchmarks.bench_flatten --positions 30 --latency 0.05
+"""
+import argparse
+import time
+
+import okx.Trade_api as TradeAPI
+from mock.okx_rest import StubServer
+from trail.flatten import flatten
+
+OK_RESPONSE = {"code": "0", "msg": "", "data": [{"clOrdId": "", "instId": "", "posSide": "net", "tag": ""}]}
+
+
+def run_serial(base_url, targets):
+    api = TradeAPI.TradeAPI('serial', 'secret', 'pass', False, '0', base_api=base_url)
+    started = time.perf_counter()
+    latencies = []
+    for target in targets:
+        api.close_positions(instId=target['instId'], mgnMode='cross', posSide='net', autoCxl='true')
+        latencies.append(time.perf_counter() - started)
+        time.sleep(0.1)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--positions', type=int, default=30)
+    parser.add_argument('--latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    targets = [{'symbol': f"COIN{i}/USDT:USDT", 'side': 'long', 'amount': 1, 'instId': f"COIN{i}-USDT-SWAP",
+                'mgnMode': 'cross', 'posSide': 'net'} for i in range(args.positions)]
+    with StubServer(latency=args.latency, routes={'/api/v5/trade/close-position': OK_RESPONSE}) as server:
+        serial = run_serial(server.base_url, targets)
+        results, _ = flatten(('concurrent', 'secret', 'pass'), targets, base_api=server.base_url)
+
+    concurrent = sorted(result['latency'] for result in results)
+    for name, latencies in (('serial', serial), ('concurrent', concurrent)):
+        print(f"{name:<10} positions={len(latencies)} first={latencies[0] * 1000:.0f}ms "
+              f"median={latencies[len(latencies) // 2] * 1000:.0f}ms last={latencies[-1] * 1000:.0f}ms")
+    print(f"all accepted: {all(result['ok'] for result in results)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""对比监控循环内直接 requests.post 飞书通知与 FeishuNotifier 后台发送时的单轮循环耗时
+
+webhook 用本地替身服务器模拟，--latency 为每次请求的往返耗时；每轮循环发 --per-cycle 条通知，
+其中一条是每轮重复、带 key 的报错（模拟拉取持仓故障），其余各不相同。
+
+    python -m benchmarks.bench_notify --cycles 20 --per-cycle 3 --latency 0.3
+"""
+import argparse
+import logging
+import time
+
+import requests
+
+from mock.okx_rest import StubServer
+from trail.notify import FeishuNotifier
+
+WEBHOOK_PATH = '/open-apis/bot/v2/hook/bench'
+OK_RESPONSE = {"StatusCode": 0, "StatusMessage": "success", "code": 0, "data": {}, "msg": "success"}
+
+
+def blocking_send(webhook, message, key=None):
+    # 原 send_feishu_notification 的写法
+    payload = {"msg_type": "text", "content": {"text": message}}
+    requests.post(webhook, json=payload, headers={'Content-Type': 'application/json'})
+
+
+def run_loop(send, cycles, per_cycle):
+    durations = []
+    for cycle in range(cycles):
+        started = time.perf_counter()
+        send("Error fetching positions: 429 Too Many Requests", key="fetch_error")
+        for i in range(per_cycle - 1):
+            send(f"首次检测到仓位：COIN{cycle}-{i}/USDT:USDT, 仓位数量: 1")
+        durations.append(time.perf_counter() - started)
+    return sorted(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cycles', type=int, default=20)
+    parser.add_argument('--per-cycle', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.3)
+    args = parser.parse_args()
+
+    logger = logging.getLogger('bench_notify')
+    with StubServer(latency=args.latency, routes={WEBHOOK_PATH: OK_RESPONSE}) as server:
+        webhook = server.base_url + WEBHOOK_PATH
+        blocking = run_loop(lambda message, key=None: blocking_send(webhook, message), args.cycles, args.per_cycle)
+        blocking_requests = server.request_count
+
+        notifier = FeishuNotifier(webhook, logger, window=0.5)
+        queued = run_loop(notifier.notify, args.cycles, args.per_cycle)
+        notifier.close()
+        queued_requests = server.request_count - blocking_requests
+
+    total = args.cycles * args.per_cycle
+    for name, durations, posts in (('blocking', blocking, blocking_requests), ('queued', queued, queued_requests)):
+        print(f"{name:<9} cycle median={durations[len(durations) // 2] * 1000:.2f}ms "
+              f"max={durations[-1] * 1000:.2f}ms  messages={total} webhook_posts={posts}")
+    print(f"queued delivered lines={notifier.sent} dropped={notifier.dropped}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""对比逐个请求与并发扇出拉取信号策略持仓的单次循环耗时
+
+--no-limit 关闭按账户限速器，只看传输层；默认开启时超过 20 个策略会按 20 次/2s 排队。
+
+    python -m benchmarks.bench_signal_fanout --signals 10 20 40 --latency 0.1
+"""
+import argparse
+import asyncio
+import time
+
+import okx.TradingBot_api as TradingBot
+from okx.async_api import AsyncTradingBotAPI
+from mock.okx_rest import StubServer
+from trail.signals import fetch_signal_positions, parse_positions
+
+POSITIONS = {"code": "0", "msg": "", "data": [
+    {"instId": "BTC-USDT-SWAP", "pos": "1", "avgPx": "60000", "markPx": "60100", "mgnMode": "cross"}]}
+
+
+def run_serial(api, algo_ids):
+    positions = []
+    for algo_id in algo_ids:
+        positions.extend(parse_positions(algo_id, api.signal_positions(algoOrdType='contract', algoId=algo_id)['data']))
+    return positions
+
+
+async def run_fanout(base_url, algo_ids, limiter):
+    async with AsyncTradingBotAPI('fanout', 'secret', 'pass', False, '0', base_api=base_url, rate_limiter=limiter) as api:
+        positions, _ = await fetch_signal_positions(api, algo_ids)
+    return positions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--signals', type=int, nargs='+', default=[10, 20, 40])
+    parser.add_argument('--latency', type=float, default=0.1)
+    parser.add_argument('--no-limit', action='store_true')
+    args = parser.parse_args()
+    limiter = False if args.no_limit else None
+
+    with StubServer(latency=args.latency, routes={'/api/v5/tradingBot/signal/positions': POSITIONS}) as server:
+        api = TradingBot.TradingBotAPI('serial', 'secret', 'pass', False, '0', base_api=server.base_url,
+                                       rate_limiter=limiter)
+        for count in args.signals:
+            algo_ids = [str(i) for i in range(count)]
+            start = time.perf_counter()
+            run_serial(api, algo_ids)
+            serial = time.perf_counter() - start
+            start = time.perf_counter()
+            positions = asyncio.run(run_fanout(server.base_url, algo_ids, limiter))
+            fanout = time.perf_counter() - start
+            print(f"signals={count:<4} serial={serial:.2f}s  fanout={fanout:.2f}s  positions={len(positions)}")
+            time.sleep(0 if args.no_limit else 2.1)  # 等限速窗口恢复，避免影响下一轮
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""单进程多账户监管的内存和单轮耗时
+
+本地替身服务器返回每个账户相同的持仓，Supervisor 在一个事件循环里并发拉取全部账户；
+内存用 tracemalloc 统计启动并跑完 --cycles 轮后 Python 分配的增量，按账户数平均。
+对比参考：单独跑一份 chua_ok.py 需要一个解释器加上 ccxt 及其市场信息，常驻内存在 100MB 以上。
+
+    python -m benchmarks.bench_supervisor --accounts 1 10 100 --cycles 5 --latency 0.05
+"""
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+import tracemalloc
+
+from mock.okx_rest import StubServer
+from trail.supervisor import Supervisor
+
+DEFAULTS = dict(leverage=10, stop_loss_pct=2, low_trail_stop_loss_pct=0.2, trail_stop_loss_pct=0.2,
+                higher_trail_stop_loss_pct=0.25, low_trail_profit_threshold=0.3, first_trail_profit_threshold=1.0,
+                second_trail_profit_threshold=3.0)
+POSITIONS = {"code": "0", "msg": "", "data": [
+    {"instId": f"COIN{i}-USDT-SWAP", "pos": str(i + 1), "posSide": "net", "avgPx": "100", "markPx": "100.1",
+     "mgnMode": "cross"} for i in range(10)]}
+ACCOUNT_CONFIG = {"code": "0", "msg": "", "data": [{"posMode": "net_mode"}]}
+
+
+async def run(base_url, accounts, cycles, state_dir):
+    logger = logging.getLogger('bench_supervisor')
+    defaults = dict(DEFAULTS, base_api=base_url, state_dir=state_dir)
+    configs = [{"name": f"acct{i}", "apiKey": f"key{i}", "secret": "s", "password": "p"} for i in range(accounts)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    supervisor = Supervisor(configs, defaults, logger)
+    await supervisor.start()
+    durations = []
+    for _ in range(cycles):
+        started = time.perf_counter()
+        await supervisor.poll_all()
+        durations.append(time.perf_counter() - started)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    await supervisor.close()
+    positions = sum(len(bot.positions_cache) for bot in supervisor.bots)
+    return used, sorted(durations), positions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--accounts', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--cycles', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--state', action='store_true', help="开启共用的 SQLite 状态文件")
+    args = parser.parse_args()
+
+    logging.getLogger('bench_supervisor').addHandler(logging.NullHandler())
+    logging.getLogger('bench_supervisor').propagate = False
+    routes = {'/api/v5/account/positions': POSITIONS, '/api/v5/account/config': ACCOUNT_CONFIG}
+    with StubServer(latency=args.latency, routes=routes) as server:
+        for accounts in args.accounts:
+            state_dir = tempfile.mkdtemp(prefix="bench_supervisor_") if args.state else ""
+            used, durations, positions = asyncio.run(run(server.base_url, accounts, args.cycles, state_dir))
+            print(f"accounts={accounts:<4} memory={used / 1024:8.0f}KB  per_account={used / 1024 / accounts:6.1f}KB  "
+                  f"cycle median={durations[len(durations) // 2] * 1000:7.1f}ms  positions={positions}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""对比逐仓位重算盈亏百分比与触发簿二分查找在单个 tick 上的耗时
+
+两边都把触发的仓位移除，最后核对剩余仓位是否一致。
+
+    python -m benchmarks.bench_trigger_book --positions 10000 --ticks 2000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from trail.trigger_book import TriggerBook
+
+PARAMS = dict(stop_loss_pct=2, low_trail_stop_loss_pct=0.2, trail_stop_loss_pct=0.2, higher_trail_stop_loss_pct=0.25,
+              low_trail_profit_threshold=0.3, first_trail_profit_threshold=1.0, second_trail_profit_threshold=3.0)
+
+
+def naive_tick(book, positions, highest, price):
+    """monitor_positions 的做法：每个仓位都重算盈亏、档位和止损线"""
+    hits = []
+    for key, (side, entry) in positions.items():
+        profit_pct = ((price - entry) if side == 'long' else (entry - price)) / entry * 100
+        if profit_pct > highest[key]:
+            highest[key] = profit_pct
+        if profit_pct <= book.stop_profit(highest[key]):
+            hits.append(key)
+    for key in hits:
+        del positions[key]
+    return hits
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--positions', type=int, default=10000)
+    parser.add_argument('--ticks', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    book = TriggerBook(**PARAMS)
+    positions = {}
+    for i in range(args.positions):
+        side = rng.choice(('long', 'short'))
+        entry = 100 * (1 + rng.uniform(-0.03, 0.03))
+        positions[str(i)] = (side, entry)
+        book.upsert(str(i), 'BTC/USDT:USDT', side, entry)
+    highest = {key: 0 for key in positions}
+    naive_positions = dict(positions)
+
+    price = 100.0
+    naive, indexed = [], []
+    for _ in range(args.ticks):
+        price *= 1 + rng.gauss(0, 0.0002)
+        start = time.perf_counter()
+        naive_tick(book, naive_positions, highest, price)
+        naive.append((time.perf_counter() - start) * 1e6)
+        start = time.perf_counter()
+        book.remove_many(book.on_price('BTC/USDT:USDT', price, raised=False))
+        indexed.append((time.perf_counter() - start) * 1e6)
+
+    print(f"positions={args.positions} ticks={args.ticks}")
+    for name, samples in (("naive loop", naive), ("trigger book", indexed)):
+        q = statistics.quantiles(samples, n=100)
+        print(f"{name:<13} p50={q[49]:9.1f}us  p99={q[98]:9.1f}us  max={max(samples):9.1f}us")
+    # 创新高只推进共同峰值；max 是价格回撤到 guard 时整批重新定价的那一次
+    print(f"remaining={len(book)} naive_remaining={len(naive_positions)} "
+          f"same={set(naive_positions) == set(book.triggers)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""逐仓位字典循环与列式引擎一次向量化计算的耗时对比
+
+    python -m benchmarks.bench_vector_engine --sizes 10 1000 100000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from trail.vector_engine import VectorEngine
+
+CONFIG = dict(stop_loss_pct=2, low_trail_stop_loss_pct=0.2, trail_stop_loss_pct=0.2, higher_trail_stop_loss_pct=0.25,
+              low_trail_profit_threshold=0.3, first_trail_profit_threshold=1.0, second_trail_profit_threshold=3.0)
+
+
+def dict_loop(positions, marks, highest_profits, current_tiers, cfg):
+    """monitor_positions 的计算部分（去掉日志和下单）"""
+    closing = []
+    for symbol, (side, entry_price) in positions.items():
+        current_price = marks[symbol]
+        if side == 'long':
+            profit_pct = (current_price - entry_price) / entry_price * 100
+        else:
+            profit_pct = (entry_price - current_price) / entry_price * 100
+        highest_profit = highest_profits.get(symbol, 0)
+        if profit_pct > highest_profit:
+            highest_profit = profit_pct
+            highest_profits[symbol] = highest_profit
+        if highest_profit >= cfg['second_trail_profit_threshold']:
+            current_tier = "第二档移动止盈"
+        elif highest_profit >= cfg['first_trail_profit_threshold']:
+            current_tier = "第一档移动止盈"
+        elif highest_profit >= cfg['low_trail_profit_threshold']:
+            current_tier = "低档保护止盈"
+        else:
+            current_tier = "无"
+        current_tiers[symbol] = current_tier
+        if current_tier == "低档保护止盈" and profit_pct <= cfg['low_trail_stop_loss_pct']:
+            closing.append(symbol)
+        elif current_tier == "第一档移动止盈" and profit_pct <= highest_profit * (1 - cfg['trail_stop_loss_pct']):
+            closing.append(symbol)
+        elif current_tier == "第二档移动止盈" and profit_pct <= highest_profit * (1 - cfg['higher_trail_stop_loss_pct']):
+            closing.append(symbol)
+        elif profit_pct <= -cfg['stop_loss_pct']:
+            closing.append(symbol)
+    return closing
+
+
+def run(size, rounds):
+    rng = np.random.default_rng(size)
+    sides = rng.choice(['long', 'short'], size)
+    entries = 100 * (1 + rng.uniform(-0.03, 0.03, size))
+    keys = [f"S{i}" for i in range(size)]
+    positions = {key: (side, entry) for key, side, entry in zip(keys, sides, entries)}
+    engine = VectorEngine(**CONFIG, capacity=size)
+    for key, side, entry in zip(keys, sides, entries):
+        engine.upsert(key, side, entry, 1)
+
+    highest_profits, current_tiers = {}, {}
+    loop_time = vector_time = 0.0
+    mismatches = 0
+    for _ in range(rounds):
+        prices = entries * (1 + rng.normal(0, 0.01, size))
+        marks = dict(zip(keys, prices.tolist()))
+        start = time.perf_counter()
+        expected = dict_loop(positions, marks, highest_profits, current_tiers, CONFIG)
+        loop_time += time.perf_counter() - start
+        start = time.perf_counter()
+        mask = engine.evaluate(prices)
+        vector_time += time.perf_counter() - start
+        mismatches += set(expected) != set(engine.closing(mask))
+    return loop_time / rounds * 1e6, vector_time / rounds * 1e6, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 100000])
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'positions':>10} {'dict loop':>14} {'vectorized':>14} {'speedup':>8} {'mismatch':>8}")
+    for size in args.sizes:
+        loop_us, vector_us, mismatches = run(size, args.rounds)
+        print(f"{size:>10} {loop_us:>12.1f}us {vector_us:>12.1f}us {loop_us / vector_us:>7.1f}x {mismatches:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""测量持仓推送从服务端发出到回调处理完成的延迟，并与 REST 轮询的理论反应延迟对比
+
+    python -m benchmarks.bench_ws_positions --rounds 50
+"""
+import argparse
+import logging
+import statistics
+import threading
+import time
+
+from mock.ws_replay import ReplayServer, load_recording
+from trail.okx_ws import OkxPositionStream
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--recording', default='mock/recordings/okx_positions.jsonl')
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--monitor-interval', type=float, default=4.0)
+    args = parser.parse_args()
+
+    base = load_recording(args.recording)
+    span = base[-1][0] + 0.5
+    frames = [(offset + span * i, message) for i in range(args.rounds) for offset, message in base]
+
+    sent = {}
+    received = []
+    done = threading.Event()
+
+    def on_send(index, ts):
+        sent[index] = ts
+
+    def on_positions(positions, full_snapshot):
+        received.append(time.perf_counter())
+        if len(received) == len(frames):
+            done.set()
+
+    logger = logging.getLogger('bench')
+    with ReplayServer(frames, speed=20, on_send=on_send) as server:
+        stream = OkxPositionStream('key', 'secret', 'pass', on_positions, logger, url=server.url)
+        stream.start()
+        done.wait(span * args.rounds / 20 + 30)
+        stream.stop()
+
+    latencies = [(received[i] - sent[i]) * 1000 for i in range(min(len(received), len(sent)))]
+    q = statistics.quantiles(latencies, n=100)
+    print(f"ws push   frames={len(latencies)}  p50={q[49]:.3f}ms  p99={q[98]:.3f}ms")
+    print(f"rest poll interval={args.monitor_interval}s  mean={args.monitor_interval * 500:.0f}ms  "
+          f"worst={args.monitor_interval * 1000:.0f}ms (+ 一次 REST 往返)")
+
+
+if __name__ == '__main__':
+    main()
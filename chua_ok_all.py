@@ -1,11 +1,16 @@
 # -*- coding: utf-8 -*-
-import ccxt
 import time
-import logging
-import requests
 import json
-import okx.Trade_api as TradeAPI
-from logging.handlers import TimedRotatingFileHandler
+from trail.adapters import OkxAdapter
+from trail.flatten import flatten, close_targets, cancel_batches
+from trail.portfolio import Portfolio
+from trail.notify import FeishuNotifier
+from trail.logsetup import setup_logger, CycleLog
+from trail.state_store import StateStore
+from trail.diff import SnapshotDiffer
+
+# 组合状态在 trail_state 表中的 key
+PORTFOLIO_KEY = ('*', 'portfolio', '')
 
 
 class MultiAssetTradingBot:
@@ -21,74 +26,43 @@ class MultiAssetTradingBot:
         self.monitor_interval = monitor_interval  # 监控循环时间是分仓监控的3倍
         self.highest_total_profit = 0  # 记录最高总盈利
 
-        # 配置交易所
-        self.exchange = ccxt.okx({
-            'apiKey': config["apiKey"],
-            'secret': config["secret"],
-            'password': config["password"],
-            'timeout': 3000,
-            'rateLimit': 50,
-            'options': {'defaultType': 'future'}
-        })
-
-        # 配置 OKX 第三方库
-        self.trading_bot = TradeAPI.TradeAPI(config["apiKey"], config["secret"], config["password"], False, '0')
+        # 紧急平仓走异步客户端并发发出
+        self.credentials = (config["apiKey"], config["secret"], config["password"])
 
         # 配置日志
-        log_file = "log/okx_all.log"
-        logger = logging.getLogger(__name__)
-        logger.setLevel(logging.INFO)
-
-        file_handler = TimedRotatingFileHandler(log_file, when='midnight', interval=1, backupCount=7, encoding='utf-8')
-        file_handler.suffix = "%Y-%m-%d"
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-
-        console_handler = logging.StreamHandler()
-        console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
+        logger = setup_logger(__name__, "log/okx_all.log", json_lines=config.get("log_json", True))
 
         self.logger = logger
-        self.position_mode = self.get_position_mode()  # 获取持仓模式
-
-    def get_position_mode(self):
-        try:
-            # 假设获取账户持仓模式的 API
-            response = self.exchange.private_get_account_config()
-            data = response.get('data', [])
-            if data and isinstance(data, list):
-                # 取列表的第一个元素（假设它是一个字典），然后获取 'posMode'
-                position_mode = data[0].get('posMode', 'single')  # 默认值为单向
-                self.logger.info(f"当前持仓模式: {position_mode}")
-                return position_mode
-            else:
-                self.logger.error("无法检测持仓模式: 'data' 字段为空或格式不正确")
-                return 'single'  # 返回默认值
-        except Exception as e:
-            self.logger.error(f"无法检测持仓模式: {e}")
-            return None
-
-    def send_feishu_notification(self, message):
-        if self.feishu_webhook:
-            try:
-                headers = {'Content-Type': 'application/json'}
-                payload = {"msg_type": "text", "content": {"text": message}}
-                response = requests.post(self.feishu_webhook, json=payload, headers=headers)
-                if response.status_code == 200:
-                    self.logger.info("飞书通知发送成功")
-                else:
-                    self.logger.error("飞书通知发送失败，状态码: %s", response.status_code)
-            except Exception as e:
-                self.logger.error("发送飞书通知时出现异常: %s", str(e))
+        # 与 chua_ok.py 共用 OKX 适配层（连接、持仓模式、持仓拉取）；组合盈亏判断和一键平仓仍在这里
+        self.adapter = OkxAdapter(config, logger)
+        self.exchange = self.adapter.exchange
+        self.trading_bot = self.adapter.trading_bot
+        self.position_mode = self.adapter.position_mode  # 获取持仓模式
+        # 飞书通知由后台线程合并、去重后发送
+        self.notifier = FeishuNotifier(feishu_webhook, logger) if feishu_webhook else None
+        # 单个仓位只在出现或变化时记日志，组合盈亏每轮汇总成一行
+        self.cycle_log = CycleLog(logger)
+        # 拉取失败或偶发的空持仓响应不进入组合盈利计算，避免被当成盈利归零触发全部平仓
+        self.position_diff = SnapshotDiffer()
+        self.logged_state = None
+        # 组合的最高总盈利和档位持久化，重启后总仓位未变时恢复；state_dir 为空时关闭
+        self.state_store = None
+        if config.get("state_dir", "state"):
+            self.state_store = StateStore(f"{config.get('state_dir', 'state')}/okx_all.sqlite", logger=logger)
+        # 组合盈亏口径：simple（简单平均）/ notional（名义价值加权）/ margin（保证金加权）
+        self.portfolio = Portfolio(self.exchange, config.get("all_profit_weighting", "simple"))
+
+    def send_feishu_notification(self, message, key=None):
+        if self.notifier:
+            self.notifier.notify(message, key=key)
 
     def fetch_positions(self):
         try:
-            positions = self.exchange.fetch_positions()
+            positions, _ = self.adapter.snapshot()
             return positions
         except Exception as e:
             self.logger.error(f"Error fetching positions: {e}")
-            return []
+            return None
 
     def fetch_open_orders(self):
         try:
@@ -100,91 +74,81 @@ class MultiAssetTradingBot:
 
     def cancel_all_orders(self):
         orders = self.fetch_open_orders()
-        for order in orders:
-            try:
-                self.exchange.cancel_order(order['id'])
-                self.logger.info(f"Order {order['id']} cancelled.")
-            except Exception as e:
-                self.logger.error(f"Error cancelling order {order['id']}: {e}")
+        if not orders:
+            return
+        # 20 个一批走 cancel-batch-orders，各批并发发出
+        _, cancels = flatten(self.credentials, [], cancel_batches(orders))
+        for result in cancels:
+            ids = [item['ordId'] for item in result['orders']]
+            if result['ok']:
+                self.logger.info(f"Orders {ids} cancelled.")
+            else:
+                self.logger.error(f"Error cancelling orders {ids}: {result['error']}")
 
-    def close_all_positions(self):
+    def take_snapshot(self):
+        """每个循环只拉一次持仓，后续判断和平仓都用这份快照；拉取失败或空快照待确认时返回 None"""
         positions = self.fetch_positions()
-        for position in positions:
-            symbol = position['symbol']
-            amount = abs(float(position['contracts']))
-            side = position['side']
-            td_mode = position['marginMode']
-            if amount > 0:
-                try:
-                    self.logger.info(f"Preparing to close position for {symbol}, side: {side}, amount: {amount}")
-
-                    if self.position_mode == 'long_short_mode':
-                        # 在双向持仓模式下，指定平仓方向
-                        pos_side = 'long' if side == 'long' else 'short'
-                    else:
-                        # 在单向模式下，不指定方向
-                        pos_side = 'net'
-
-                    # 将 symbol 转换为 API 需要的格式
-                    inst_id = symbol.replace('/', '-').replace(':USDT', '')
-                    if 'SWAP' not in inst_id:  # 确保是永续合约标识
-                        inst_id += '-SWAP'
-                    # print(f'{inst_id}处理平仓')
+        if positions is None:
+            return None
+        if self.position_diff.apply(positions) is None:
+            self.logger.warning("持仓快照为空，等待再次确认后再按全部平仓处理")
+            return None
+        return self.portfolio.snapshot(positions)
 
-                    # 发送平仓请求并获取返回值
-                    response = self.trading_bot.close_positions(
-                        instId=inst_id,
-                        mgnMode=td_mode,
-                        posSide=pos_side,
-                        autoCxl='true'
-                    )
-                    self.logger.info(f"Close position response for {symbol}: {response}")
-                    time.sleep(0.1)  # 短暂延迟后再试
-                    # 检查返回值
-                    if response.get('status') == 'filled':
-                        self.logger.info(f"Successfully closed position for {symbol}, side: {side}, amount: {amount}")
-                        self.send_feishu_notification(f"Successfully closed position for {symbol}, side: {side}, amount: {amount}")
-                    elif response.get('status') == 'partially_filled':
-                        remaining_amount = amount - response.get('filled', 0)
-                        self.logger.warning(f"Partially closed position for {symbol}. Remaining amount: {remaining_amount}")
-                        self.send_feishu_notification(f"Partially closed position for {symbol}. Remaining amount: {remaining_amount}")
-                    else:
-                        self.logger.error(f"Failed to close position for {symbol}: {response}")
-                        self.send_feishu_notification(f"Failed to close position for {symbol}: {response}")
+    def close_all_positions(self, snapshot=None):
+        positions = snapshot.positions if snapshot is not None else self.fetch_positions() or []
+        targets = close_targets(positions, self.position_mode)
+        if not targets:
+            return
+        self.logger.info(f"Preparing to close {len(targets)} positions: {[target['symbol'] for target in targets]}")
 
-                except Exception as e:
-                    self.logger.error(f"Error closing position for {symbol}: {e}")
+        # 所有仓位同时发出平仓请求（autoCxl 会顺带撤掉这些品种的挂单），按账户限速排队
+        try:
+            results, _ = flatten(self.credentials, targets)
+        except Exception as e:
+            self.logger.error(f"Error closing positions: {e}")
+            results = []
+        for result in results:
+            if result['ok']:
+                self.logger.info(f"Close position request for {result['symbol']} accepted in {result['latency'] * 1000:.0f}ms, "
+                                 f"side: {result['side']}, amount: {result['amount']}")
+            else:
+                self.logger.error(f"Failed to close position for {result['symbol']} "
+                                  f"({result['latency'] * 1000:.0f}ms): {result['error']}")
 
-    def calculate_average_profit(self):
+        # 只重新拉一次持仓确认最终状态，拉取失败时只按请求结果汇报
         positions = self.fetch_positions()
-        total_profit_pct = 0.0
-        num_positions = 0
-
-        for position in positions:
-            symbol = position['symbol']
-            entry_price = float(position['entryPrice'])
-            current_price = float(position['markPrice'])
-            side = position['side']
-
-            # 计算单个仓位的浮动盈利百分比
-            if side == 'long':
-                profit_pct = (current_price - entry_price) / entry_price * 100
-            elif side == 'short':
-                profit_pct = (entry_price - current_price) / entry_price * 100
+        remaining = {(p['symbol'], p['side']) for p in positions or []
+                     if abs(float(p.get('contracts') or 0)) > 0}
+        lines = []
+        for result in results:
+            still_open = (result['symbol'], result['side']) in remaining
+            if positions is None:
+                status = "已提交" if result['ok'] else "失败"
             else:
-                continue
-
-            # 累加总盈利百分比
-            total_profit_pct += profit_pct
-            num_positions += 1
-
-            # 记录单个仓位的盈利情况
-            self.logger.info(f"仓位 {symbol}，方向: {side}，开仓价格: {entry_price}，当前价格: {current_price}，"
-                             f"浮动盈亏: {profit_pct:.2f}%")
-
-        # 计算平均浮动盈利百分比
-        average_profit_pct = total_profit_pct / num_positions if num_positions > 0 else 0
-        return average_profit_pct
+                status = "未平完" if still_open else ("已平仓" if result['ok'] else "失败")
+            lines.append(f"{result['symbol']} {result['side']} {result['amount']}: {status}，{result['latency'] * 1000:.0f}ms")
+            if still_open:
+                self.logger.error(f"Position for {result['symbol']} {result['side']} is still open after flatten")
+        self.send_feishu_notification("全部平仓结果：\n" + "\n".join(lines))
+
+    def calculate_average_profit(self, snapshot=None):
+        if snapshot is None:
+            snapshot = self.take_snapshot()
+
+        # 与 close_all_positions 一致按 (symbol, side) 区分，双向持仓的两条腿各自记录
+        keys = list(zip(snapshot.symbols, snapshot.sides))
+        for key in set(self.cycle_log.states) - set(keys):
+            self.cycle_log.forget(key)
+        # 记录单个仓位的盈利情况（仓位出现或数量、开仓价变化时）
+        for i, (symbol, side) in enumerate(keys):
+            state = (snapshot.entry[i], snapshot.contracts[i])
+            if self.cycle_log.changed((symbol, side), state, snapshot.profit_pct[i]):
+                self.logger.info(f"仓位 {symbol}，方向: {side}，开仓价格: {snapshot.entry[i]}，"
+                                 f"当前价格: {snapshot.mark[i]}，浮动盈亏: {snapshot.profit_pct[i]:.2f}%")
+
+        # 按配置的口径计算组合浮动盈利百分比
+        return self.portfolio.profit(snapshot)
 
     def reset_highest_profit_and_tier(self):
         """重置最高总盈利和当前档位状态"""
@@ -192,22 +156,40 @@ class MultiAssetTradingBot:
         self.current_tier = "无"
         self.logger.info("已重置最高总盈利和档位状态")
 
+    def restore_state(self, position_size):
+        """总仓位规模与上次保存时一致才恢复（期间没有加仓、平仓）"""
+        state = self.state_store.load().get(PORTFOLIO_KEY)
+        if state is None:
+            return
+        if position_size > 0 and abs(state.amount - position_size) <= 1e-9 * position_size:
+            self.highest_total_profit = state.highest_profit
+            self.current_tier = state.tier
+            self.logger.info(f"恢复组合追踪状态：最高总盈利 {state.highest_profit:.2f}%，档位 {state.tier}")
+        else:
+            self.state_store.remove(PORTFOLIO_KEY)
+
     def monitor_total_profit(self):
         self.logger.info("启动主循环，开始监控总盈利...")
-        previous_position_size = sum(
-            abs(float(position['contracts'])) for position in self.fetch_positions())  # 初始总仓位大小
+        snapshot = self.take_snapshot()
+        previous_position_size = snapshot.total_contracts if snapshot is not None else 0  # 初始总仓位大小
+        if self.state_store and snapshot is not None:
+            self.restore_state(previous_position_size)
         try:
             while True:
+                snapshot = self.take_snapshot()
+                if snapshot is None:
+                    time.sleep(self.monitor_interval)
+                    continue
+                self.cycle_log.begin()
                 # 检查仓位总规模变化
-                current_position_size = sum(abs(float(position['contracts'])) for position in self.fetch_positions())
+                current_position_size = snapshot.total_contracts
                 if current_position_size > previous_position_size:
                     self.send_feishu_notification(f"检测到仓位变化操作，重置最高盈利和档位状态")
                     self.logger.info("检测到加仓操作，重置最高盈利和档位状态")
                     self.reset_highest_profit_and_tier()
                     previous_position_size = current_position_size
 
-                total_profit = self.calculate_average_profit()
-                self.logger.info(f"当前总盈利: {total_profit:.2f}%")
+                total_profit = self.calculate_average_profit(snapshot)
                 if total_profit > self.highest_total_profit:
                     self.highest_total_profit = total_profit
                 # 确定当前盈利档位
@@ -220,44 +202,57 @@ class MultiAssetTradingBot:
                 else:
                     self.current_tier = "无"
 
-                self.logger.info(
-                    f"当前总盈利: {total_profit:.2f}%，最高总盈利: {self.highest_total_profit:.2f}%，当前档位: {self.current_tier}")
+                # 档位或最高总盈利变化时才记录档位和回撤阈值，其余轮次只有汇总行
+                state = (self.current_tier, round(self.highest_total_profit, 2))
+                changed = state != self.logged_state
+                self.logged_state = state
+                if changed:
+                    self.logger.info(
+                        f"当前总盈利: {total_profit:.2f}%，最高总盈利: {self.highest_total_profit:.2f}%，当前档位: {self.current_tier}")
+                if self.state_store:
+                    self.state_store.record(PORTFOLIO_KEY, 0.0, previous_position_size,
+                                            self.highest_total_profit, self.current_tier)
+                self.cycle_log.end(total_pct=round(total_profit, 4), highest_total_pct=round(self.highest_total_profit, 4),
+                                   tier=self.current_tier)
 
                 # 各档止盈逻辑
                 if self.current_tier == "低档保护止盈":
-                    self.logger.info(f"低档回撤止盈阈值: {self.low_trail_stop_loss_pct:.2f}%")
+                    if changed:
+                        self.logger.info(f"低档回撤止盈阈值: {self.low_trail_stop_loss_pct:.2f}%")
                     if total_profit <= self.low_trail_stop_loss_pct:
                         self.send_feishu_notification(f"总盈利触发低档保护止盈，当前回撤到: {total_profit:.2f}%，执行全部平仓")
                         self.logger.info(f"总盈利触发低档保护止盈，当前回撤到: {total_profit:.2f}%，执行全部平仓")
-                        self.close_all_positions()
+                        self.close_all_positions(snapshot)
                         self.reset_highest_profit_and_tier()
                         continue
                 elif self.current_tier == "第一档移动止盈":
                     trail_stop_loss = self.highest_total_profit * (1 - self.trail_stop_loss_pct)
-                    self.logger.info(f"第一档回撤止盈阈值: {trail_stop_loss:.2f}%")
+                    if changed:
+                        self.logger.info(f"第一档回撤止盈阈值: {trail_stop_loss:.2f}%")
                     if total_profit <= trail_stop_loss:
                         self.send_feishu_notification(
                             f"总盈利达到第一档回撤阈值，最高总盈利: {self.highest_total_profit:.2f}%，当前回撤到: {total_profit:.2f}%，执行全部平仓")
                         self.logger.info(
                             f"总盈利达到第一档回撤阈值，最高总盈利: {self.highest_total_profit:.2f}%，当前回撤到: {total_profit:.2f}%，执行全部平仓")
-                        self.close_all_positions()
+                        self.close_all_positions(snapshot)
                         self.reset_highest_profit_and_tier()
                         continue
 
                 elif self.current_tier == "第二档移动止盈":
                     trail_stop_loss = self.highest_total_profit * (1 - self.higher_trail_stop_loss_pct)
-                    self.logger.info(f"第二档回撤止盈阈值: {trail_stop_loss:.2f}%")
+                    if changed:
+                        self.logger.info(f"第二档回撤止盈阈值: {trail_stop_loss:.2f}%")
                     if total_profit <= trail_stop_loss:
                         self.logger.info(f"总盈利达到第二档回撤阈值，最高总盈利: {self.highest_total_profit:.2f}%，当前回撤到: {total_profit:.2f}%，执行全部平仓")
                         self.send_feishu_notification(f"总盈利达到第二档回撤阈值，最高总盈利: {self.highest_total_profit:.2f}%，当前回撤到: {total_profit:.2f}%，执行全部平仓")
-                        self.close_all_positions()
+                        self.close_all_positions(snapshot)
                         self.reset_highest_profit_and_tier()
                         continue
                 # 全局止损
                 if total_profit <= -self.stop_loss_pct:
                     self.logger.info(f"总盈利触发全局止损，当前回撤到: {total_profit:.2f}%，执行全部平仓")
                     self.send_feishu_notification(f"总盈利触发全局止损，当前回撤到: {total_profit:.2f}%，执行全部平仓")
-                    self.close_all_positions()
+                    self.close_all_positions(snapshot)
                     self.reset_highest_profit_and_tier()
                     continue
 
@@ -269,7 +264,7 @@ class MultiAssetTradingBot:
         except Exception as e:
             error_message = f"程序异常退出: {str(e)}"
             self.logger.error(error_message)
-            self.send_feishu_notification(error_message)
+            self.send_feishu_notification(error_message, key="fatal")
 
 
 if __name__ == '__main__':
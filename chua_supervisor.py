@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+from trail.logsetup import setup_logger
+from trail.metrics import LoopMetrics
+from trail.supervisor import Supervisor
+
+
+if __name__ == '__main__':
+    with open('config.json', 'r') as f:
+        config_data = json.load(f)
+
+    # okx 配置作为各账户的默认参数，okx_accounts 里每个账户至少填 name 和 API key
+    platform_config = config_data['okx']
+    accounts = config_data.get('okx_accounts', [])
+    # discover_sub_accounts 开启时用 okx 里的母账户 key 发现子账户，okx_sub_accounts 按子账户名配置 key 和覆盖参数
+    sub_accounts = config_data.get('okx_sub_accounts', {}) if platform_config.get("discover_sub_accounts") else None
+    metrics_port = config_data.get("metrics_port", 0)
+    feishu_webhook_url = config_data['feishu_webhook']
+    monitor_interval = config_data.get("monitor_interval", 4)  # 默认值为4秒
+
+    # 配置日志：所有账户写同一个文件，logger 名带账户名
+    logger = setup_logger('okx_supervisor', "log/okx_supervisor.log", json_lines=platform_config.get("log_json", True))
+    metrics = None
+    if metrics_port:
+        metrics = LoopMetrics()
+        metrics.serve(metrics_port)
+        logger.info(f"指标导出: http://0.0.0.0:{metrics_port}/metrics")
+    supervisor = Supervisor(accounts, platform_config, logger, feishu_webhook=feishu_webhook_url,
+                            monitor_interval=monitor_interval, sub_accounts=sub_accounts, metrics=metrics)
+    try:
+        asyncio.run(supervisor.run())
+    except KeyboardInterrupt:
+        logger.info("程序收到中断信号，开始退出...")
+    except Exception as e:
+        logger.error(f"程序异常退出: {str(e)}")
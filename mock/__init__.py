@@ -0,0 +1 @@
+"""离线调试、压测用的本地交易所替身服务器"""
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""确定性的模拟交易所适配器
+
+标记价格按固定种子随机游走，不访问网络，用于离线压测 trail.core.TrailingBot：
+step() 推进一轮行情（每轮只有 move_ratio 比例的品种价格变化），snapshot() 返回当前持仓，
+close() 记录平仓并从持仓中移除。同样的参数每次运行得到同样的行情和平仓序列。
+"""
+import random
+import time
+
+from trail.core import ExchangeAdapter
+
+
+class MockAdapter(ExchangeAdapter):
+    name = 'mock'
+
+    def __init__(self, config, logger, positions=100, seed=7, volatility=0.002, move_ratio=1.0, close_latency=0.0):
+        super().__init__(config, logger)
+        self.rng = random.Random(seed)
+        self.volatility = volatility
+        self.move_ratio = move_ratio
+        self.close_latency = close_latency
+        self.positions = {}
+        for i in range(positions):
+            symbol = f"COIN{i}/USDT:USDT"
+            entry = round(100 * (1 + self.rng.uniform(-0.05, 0.05)), 4)
+            self.positions[symbol] = {
+                'symbol': symbol,
+                'side': self.rng.choice(('long', 'short')),
+                'contracts': float(self.rng.randint(1, 10)),
+                'entryPrice': entry,
+                'markPrice': entry,
+                'marginMode': 'cross',
+            }
+        self.closed = []  # 按顺序记录 (轮次, symbol, side, 平仓时标记价格)
+        self.cycle = 0
+
+    def step(self):
+        self.cycle += 1
+        for symbol, position in self.positions.items():
+            if self.rng.random() < self.move_ratio:
+                mark = position['markPrice'] * (1 + self.rng.gauss(0, self.volatility))
+                self.positions[symbol] = dict(position, markPrice=round(mark, 4))
+
+    def snapshot(self):
+        return list(self.positions.values()), True
+
+    def close(self, position):
+        if self.close_latency:
+            time.sleep(self.close_latency)
+        current = self.positions.pop(position['symbol'], None)
+        if current is None:
+            return False
+        self.closed.append((self.cycle, current['symbol'], current['side'], current['markPrice']))
+        return True
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""本地 OKX REST 替身服务器
+
+按路径返回预置的 JSON 响应，支持 HTTPS（自签名证书）和模拟网络延迟，
+用于在不访问 www.okx.com 的情况下压测 okx 客户端。
+"""
+import argparse
+import json
+import os
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+DEFAULT_RESPONSE = {"code": "0", "msg": "", "data": []}
+
+
+def generate_self_signed_cert(directory=None):
+    """用 openssl 生成仅对 127.0.0.1/localhost 有效的自签名证书，返回 (cert_file, key_file)"""
+    directory = directory or tempfile.mkdtemp(prefix="okx_stub_")
+    cert_file = os.path.join(directory, "cert.pem")
+    key_file = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", key_file, "-out", cert_file, "-subj", "/CN=localhost",
+         "-addext", "subjectAltName=IP:127.0.0.1,DNS:localhost"],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return cert_file, key_file
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # 保持连接，才能体现客户端连接池的效果
+    disable_nagle_algorithm = True  # 响应头和响应体分两次写出，否则会撞上 40ms 的延迟确认
+
+    def setup(self):
+        super().setup()
+        self.server.stub.record_connection()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        parts = urlsplit(self.path)
+        payload = self.server.stub.respond(method, parts.path, dict(parse_qsl(parts.query)), body)
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512  # 并发扇出时瞬间会有上百个新连接
+
+
+class StubServer:
+    def __init__(self, host='127.0.0.1', port=0, tls=False, latency=0.0, routes=None):
+        """
+        routes: {path: dict 或 callable(method, path, query, body) -> dict}，未配置的路径返回 DEFAULT_RESPONSE
+        latency: 每个请求在服务端额外等待的秒数，用于模拟公网往返
+        """
+        self.host = host
+        self.port = port
+        self.tls = tls
+        self.latency = latency
+        self.routes = dict(routes or {})
+        self.cert_file = None
+        self.request_count = 0
+        self.connection_count = 0
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        scheme = 'https' if self.tls else 'http'
+        return f"{scheme}://{self.host}:{self.port}"
+
+    def record_connection(self):
+        with self._lock:
+            self.connection_count += 1
+
+    def respond(self, method, path, query, body):
+        with self._lock:
+            self.request_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+        route = self.routes.get(path, DEFAULT_RESPONSE)
+        if callable(route):
+            return route(method, path, query, body)
+        return route
+
+    def start(self):
+        httpd = _Server((self.host, self.port), _Handler)
+        httpd.stub = self
+        if self.tls:
+            self.cert_file, key_file = generate_self_signed_cert()
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(self.cert_file, key_file)
+            httpd.socket = context.wrap_socket(httpd.socket, server_side=True)
+        self.port = httpd.server_address[1]
+        self._httpd = httpd
+        self._thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="本地 OKX REST 替身服务器")
+    parser.add_argument('--port', type=int, default=8443)
+    parser.add_argument('--tls', action='store_true')
+    parser.add_argument('--latency', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StubServer(port=args.port, tls=args.tls, latency=args.latency)
+    print(f"stub listening on {server.start()}" + (f", cert: {server.cert_file}" if server.cert_file else ""))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
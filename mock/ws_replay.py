@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""本地 WebSocket 回放服务器
+
+按录制时间回放交易所推送（JSONL，每行 {"t": 相对秒数, "msg": 推送内容}），
+并应答登录/订阅/ping，用于离线测试推送模式和测量推送处理延迟。
+
+    python -m mock.ws_replay mock/recordings/okx_positions.jsonl --port 8765 --exchange okx
+"""
+import argparse
+import json
+import threading
+import time
+
+from websockets.sync.server import serve
+
+
+def load_recording(path):
+    frames = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                item = json.loads(line)
+                frames.append((float(item.get('t', 0)), item['msg']))
+    return frames
+
+
+def okx_responder(message):
+    op = message.get('op')
+    if op == 'login':
+        return [{"event": "login", "code": "0", "msg": ""}], False
+    if op == 'subscribe':
+        return [{"event": "subscribe", "arg": arg} for arg in message.get('args', [])], True
+    return [], False
+
+
+def bitget_responder(message):
+    op = message.get('op')
+    if op == 'login':
+        return [{"event": "login", "code": 0, "msg": ""}], False
+    if op == 'subscribe':
+        return [{"event": "subscribe", "arg": arg} for arg in message.get('args', [])], True
+    return [], False
+
+
+RESPONDERS = {
+    'okx': okx_responder,
+    'bitget': bitget_responder,
+    'binance': None,  # 用户数据流通过 URL 中的 listenKey 鉴权，连接即开始推送
+}
+
+
+class ReplayServer:
+    def __init__(self, frames, host='127.0.0.1', port=0, exchange='okx', speed=1.0, drop_after=None, on_send=None):
+        """
+        speed: 回放倍速，0 表示不等待、连续发送
+        drop_after: 发送指定数量的帧后主动断开连接，用于测试断线回退和重连
+        on_send(index, perf_counter): 每帧发出后的回调，用于测量端到端延迟
+        """
+        self.frames = frames
+        self.host = host
+        self.port = port
+        self.responder = RESPONDERS[exchange]
+        self.speed = speed
+        self.drop_after = drop_after
+        self.on_send = on_send
+        self.connections = 0
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    def _reader(self, ws, ready):
+        try:
+            for raw in ws:
+                if raw == 'ping':
+                    ws.send('pong')
+                    continue
+                replies, subscribed = self.responder(json.loads(raw)) if self.responder else ([], False)
+                for reply in replies:
+                    ws.send(json.dumps(reply))
+                if subscribed:
+                    ready.set()
+        except Exception:
+            pass
+        ready.set()
+
+    def _handler(self, ws):
+        self.connections += 1
+        ready = threading.Event()
+        if self.responder is None:
+            ready.set()
+        reader = threading.Thread(target=self._reader, args=(ws, ready), daemon=True)
+        reader.start()
+        ready.wait(10)
+
+        start = time.perf_counter()
+        for index, (offset, message) in enumerate(self.frames):
+            if self.drop_after is not None and index >= self.drop_after:
+                ws.close()
+                return
+            if self.speed:
+                delay = start + offset / self.speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            try:
+                ws.send(json.dumps(message))
+            except Exception:
+                return
+            if self.on_send:
+                self.on_send(index, time.perf_counter())
+        # 回放结束后保持连接，直到客户端断开
+        reader.join()
+
+    def start(self):
+        self._server = serve(self._handler, self.host, self.port)
+        self.port = self._server.socket.getsockname()[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="本地 WebSocket 推送回放服务器")
+    parser.add_argument('recording')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--exchange', choices=sorted(RESPONDERS), default='okx')
+    parser.add_argument('--speed', type=float, default=1.0)
+    parser.add_argument('--drop-after', type=int, default=None)
+    args = parser.parse_args()
+
+    server = ReplayServer(load_recording(args.recording), port=args.port, exchange=args.exchange,
+                          speed=args.speed, drop_after=args.drop_after)
+    print(f"replay server listening on {server.start()}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
@@ -4,5 +4,5 @@ from .consts import *
 
 class AffiliateAPI(Client):
 
-    def __init__(self, api_key, api_secret_key, passphrase, use_server_time=False, flag='1'):
-        Client.__init__(self, api_key, api_secret_key, passphrase, use_server_time, flag)
\ No newline at end of file
+    def __init__(self, api_key, api_secret_key, passphrase, use_server_time=False, flag='1', **kwargs):
+        Client.__init__(self, api_key, api_secret_key, passphrase, use_server_time, flag, **kwargs)
\ No newline at end of file
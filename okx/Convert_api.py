@@ -3,8 +3,8 @@ from .consts import *
 
 
 class ConvertAPI(Client):
-    def __init__(self, api_key, api_secret_key, passphrase, use_server_time=False, flag='1'):
-        Client.__init__(self, api_key, api_secret_key, passphrase, use_server_time, flag)
+    def __init__(self, api_key, api_secret_key, passphrase, use_server_time=False, flag='1', **kwargs):
+        Client.__init__(self, api_key, api_secret_key, passphrase, use_server_time, flag, **kwargs)
 
     def get_currencies(self):
         params = {}
@@ -4,8 +4,8 @@ from .consts import *
 
 class CopytradingAPI(Client):
 
-    def __init__(self, api_key, api_secret_key, passphrase, use_server_time=False, flag='1'):
-        Client.__init__(self, api_key, api_secret_key, passphrase, use_server_time, flag)
+    def __init__(self, api_key, api_secret_key, passphrase, use_server_time=False, flag='1', **kwargs):
+        Client.__init__(self, api_key, api_secret_key, passphrase, use_server_time, flag, **kwargs)
 
     # GET /api/v5/copytrading/current-subpositions
     def current_subpositions(self, instId='',after='', before='', limit='',uniqueCode='',subPosType=''):
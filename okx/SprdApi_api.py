@@ -3,8 +3,8 @@ from .consts import *
 
 
 class SprdAPI(Client):
-    def __init__(self, api_key, api_secret_key, passphrase, use_server_time=False, flag='1'):
-        Client.__init__(self, api_key, api_secret_key, passphrase, use_server_time, flag)
+    def __init__(self, api_key, api_secret_key, passphrase, use_server_time=False, flag='1', **kwargs):
+        Client.__init__(self, api_key, api_secret_key, passphrase, use_server_time, flag, **kwargs)
 
     # 下单 POST /api/v5/sprd/order
     def place(self,sprdId,side,ordType,sz,px='',clOrdId='',tag='',):
@@ -3,8 +3,8 @@ from .consts import *
 
 
 class TradingBotAPI(Client):
-    def __init__(self, api_key, api_secret_key, passphrase, use_server_time=False, flag='1'):
-        Client.__init__(self, api_key, api_secret_key, passphrase, use_server_time, flag)
+    def __init__(self, api_key, api_secret_key, passphrase, use_server_time=False, flag='1', **kwargs):
+        Client.__init__(self, api_key, api_secret_key, passphrase, use_server_time, flag, **kwargs)
 
     def grid_order_algo(self, instId = '', algoOrdType = '', maxPx= '', minPx = '', gridNum ='', runType = '', tpTriggerPx = '', slTriggerPx = '', tag = '', quoteSz = '',algoClOrdId='',
                         baseSz = '', sz = '', direction = '', lever = '', basePos = '',tpRatio = '',slRatio='',profitSharingRatio='',triggerParams =[]):
@@ -74,4 +74,9 @@ class TradingBotAPI(Client):
     # GET /api/v5/tradingBot/signal/close-position
     def signal_close_position(self, instId = '', algoId = ''):
         params = {'instId': instId, 'algoId': algoId, 'tag': 'f1ee03b510d5SUDE'}
-        return self._request_with_params(POST, SIGNAL_CLOSE_POSITION, params)
\ No newline at end of file
+        return self._request_with_params(POST, SIGNAL_CLOSE_POSITION, params)
+
+    # GET /api/v5/tradingBot/signal/positions
+    def signal_positions(self, algoOrdType = 'contract', algoId = ''):
+        params = {'algoOrdType': algoOrdType, 'algoId': algoId}
+        return self._request_with_params(GET, SIGNAL_POSITIONS, params)
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""Async versions of the okx API classes
+
+Each class reuses the endpoint methods of its blocking counterpart; AsyncClient
+comes first in the MRO so ``_request`` resolves to the coroutine version.
+"""
+from .async_client import AsyncClient
+from .Account_api import AccountAPI
+from .Affiliate_api import AffiliateAPI
+from .Broker_api import BrokerAPI
+from .Convert_api import ConvertAPI
+from .Copytrading_api import CopytradingAPI
+from .FDBroker_api import FDBrokerAPI
+from .Finance_api import FinanceAPI
+from .Funding_api import FundingAPI
+from .Market_api import MarketAPI
+from .Public_api import PublicAPI
+from .Recurring_api import RecurringAPI
+from .Rfq_api import RfqAPI
+from .SprdApi_api import SprdAPI
+from .Trade_api import TradeAPI
+from .TradingBot_api import TradingBotAPI
+from .TradingData_api import TradingDataAPI
+from .status_api import StatusAPI
+from .subAccount_api import SubAccountAPI
+
+
+class AsyncAccountAPI(AsyncClient, AccountAPI):
+    pass
+
+
+class AsyncAffiliateAPI(AsyncClient, AffiliateAPI):
+    pass
+
+
+class AsyncBrokerAPI(AsyncClient, BrokerAPI):
+    pass
+
+
+class AsyncConvertAPI(AsyncClient, ConvertAPI):
+    pass
+
+
+class AsyncCopytradingAPI(AsyncClient, CopytradingAPI):
+    pass
+
+
+class AsyncFDBrokerAPI(AsyncClient, FDBrokerAPI):
+    pass
+
+
+class AsyncFinanceAPI(AsyncClient, FinanceAPI):
+    pass
+
+
+class AsyncFundingAPI(AsyncClient, FundingAPI):
+    pass
+
+
+class AsyncMarketAPI(AsyncClient, MarketAPI):
+    pass
+
+
+class AsyncPublicAPI(AsyncClient, PublicAPI):
+    pass
+
+
+class AsyncRecurringAPI(AsyncClient, RecurringAPI):
+    pass
+
+
+class AsyncRfqAPI(AsyncClient, RfqAPI):
+    pass
+
+
+class AsyncSprdAPI(AsyncClient, SprdAPI):
+    pass
+
+
+class AsyncTradeAPI(AsyncClient, TradeAPI):
+    pass
+
+
+class AsyncTradingBotAPI(AsyncClient, TradingBotAPI):
+    pass
+
+
+class AsyncTradingDataAPI(AsyncClient, TradingDataAPI):
+    pass
+
+
+class AsyncStatusAPI(AsyncClient, StatusAPI):
+    pass
+
+
+class AsyncSubAccountAPI(AsyncClient, SubAccountAPI):
+    pass
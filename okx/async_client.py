@@ -0,0 +1,114 @@
+"""asyncio counterpart of okx.client.Client
+
+Every API class only builds params and returns ``self._request_with_params(...)``,
+so mixing AsyncClient in front of it turns each endpoint method into a coroutine
+without duplicating any endpoint definitions:
+
+    async with AsyncTradeAPI(key, secret, passphrase, False, '0') as api:
+        results = await asyncio.gather(*(api.close_positions(instId, 'cross') for instId in inst_ids))
+"""
+import json
+import aiohttp
+from . import consts as c, utils, exceptions
+from .ratelimit import get_limiter, request_cost
+
+
+class _ResponseSnapshot(object):
+    # minimal requests.Response look-alike, so OkxAPIException can be reused as is
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class AsyncClient(object):
+
+    def __init__(self, api_key, api_secret_key, passphrase, use_server_time=False, flag='1',
+                 base_api=c.API_URL, timeout=c.REQUEST_TIMEOUT, session=None, max_in_flight=c.ASYNC_MAX_IN_FLIGHT,
+                 rate_limiter=None):
+
+        self.API_KEY = api_key
+        self.API_SECRET_KEY = api_secret_key
+        self.PASSPHRASE = passphrase
+        self.use_server_time = use_server_time
+        self.flag = flag
+        self.base_api = base_api
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        # same process-wide budget as the blocking Client, waited on with asyncio.sleep
+        self.rate_limiter = get_limiter() if rate_limiter is None else rate_limiter or None
+        # aiohttp sessions must be created inside a running loop, so the owned one is created lazily
+        self.session = session
+        self._owns_session = session is None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _get_session(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_in_flight, keepalive_timeout=30)
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    def _client_timeout(self, timeout):
+        timeout = self.timeout if timeout is None else timeout
+        if isinstance(timeout, tuple):
+            return aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+        return aiohttp.ClientTimeout(total=timeout)
+
+    async def _request(self, method, request_path, params, timeout=None):
+
+        endpoint = request_path
+        if method == c.GET:
+            request_path = request_path + utils.parse_params_to_str(params)
+        url = self.base_api + request_path
+
+        # wait for the budget before signing, so a throttled request never goes out with a stale timestamp
+        if self.rate_limiter:
+            await self.rate_limiter.acquire_async(self.API_KEY, endpoint, method, request_cost(endpoint, params))
+
+        timestamp = utils.get_timestamp()
+        if self.use_server_time:
+            timestamp = await self._get_timestamp()
+
+        body = json.dumps(params) if method == c.POST else ""
+
+        sign = utils.sign(utils.pre_hash(timestamp, method, request_path, str(body)), self.API_SECRET_KEY)
+        header = utils.get_header(self.API_KEY, sign.decode('utf-8'), timestamp, self.PASSPHRASE, self.flag)
+
+        session = self._get_session()
+        async with session.request(method, url, data=body or None, headers=header,
+                                   timeout=self._client_timeout(timeout)) as response:
+            text = await response.text()
+            status = response.status
+
+        if status == 429 and self.rate_limiter:
+            self.rate_limiter.penalize(self.API_KEY, endpoint, method)
+
+        if not str(status).startswith('2'):
+            raise exceptions.OkxAPIException(_ResponseSnapshot(status, text))
+
+        return json.loads(text)
+
+    def _request_without_params(self, method, request_path, timeout=None):
+        return self._request(method, request_path, {}, timeout)
+
+    def _request_with_params(self, method, request_path, params, timeout=None):
+        return self._request(method, request_path, params, timeout)
+
+    async def _get_timestamp(self):
+        session = self._get_session()
+        async with session.get(self.base_api + c.SERVER_TIMESTAMP_URL, timeout=self._client_timeout(None)) as response:
+            if response.status == 200:
+                return (await response.json(content_type=None))['data'][0]['ts']
+            return ""
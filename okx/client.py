@@ -1,24 +1,62 @@
 import requests
 import json
+import threading
+from requests.adapters import HTTPAdapter
 from . import consts as c, utils, exceptions
+from .ratelimit import get_limiter, request_cost
+
+
+_session_lock = threading.Lock()
+_shared_session = None
+
+
+def get_session():
+    # Process-wide keep-alive session shared by every API class, so an order
+    # placed right after a position fetch reuses the same TCP+TLS connection.
+    global _shared_session
+    if _shared_session is None:
+        with _session_lock:
+            if _shared_session is None:
+                _shared_session = new_session()
+    return _shared_session
+
+
+def new_session(pool_connections=c.HTTP_POOL_CONNECTIONS, pool_maxsize=c.HTTP_POOL_MAXSIZE):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
 
 
 class Client(object):
 
-    def __init__(self, api_key, api_secret_key, passphrase, use_server_time=False, flag='1'):
+    def __init__(self, api_key, api_secret_key, passphrase, use_server_time=False, flag='1',
+                 base_api=c.API_URL, timeout=c.REQUEST_TIMEOUT, session=None, rate_limiter=None):
 
         self.API_KEY = api_key
         self.API_SECRET_KEY = api_secret_key
         self.PASSPHRASE = passphrase
         self.use_server_time = use_server_time
         self.flag = flag
+        self.base_api = base_api
+        # default timeout for every request, either seconds or a (connect, read) tuple
+        self.timeout = timeout
+        self.session = session if session is not None else get_session()
+        # per-account, per-endpoint budget shared process-wide; pass rate_limiter=False to disable
+        self.rate_limiter = get_limiter() if rate_limiter is None else rate_limiter or None
 
-    def _request(self, method, request_path, params):
+    def _request(self, method, request_path, params, timeout=None):
 
+        endpoint = request_path
         if method == c.GET:
             request_path = request_path + utils.parse_params_to_str(params)
         # url
-        url = c.API_URL + request_path
+        url = self.base_api + request_path
+
+        # wait for the budget before signing, so a throttled request never goes out with a stale timestamp
+        if self.rate_limiter:
+            self.rate_limiter.acquire(self.API_KEY, endpoint, method, request_cost(endpoint, params))
 
         timestamp = utils.get_timestamp()
 
@@ -33,33 +71,37 @@ class Client(object):
 
         # send request
         response = None
+        timeout = self.timeout if timeout is None else timeout
 
         # print("url:", url)
         # print("headers:", header)
         # print("body:", body)
 
         if method == c.GET:
-            response = requests.get(url, headers=header)
+            response = self.session.get(url, headers=header, timeout=timeout)
         elif method == c.POST:
-            response = requests.post(url, data=body, headers=header)
+            response = self.session.post(url, data=body, headers=header, timeout=timeout)
 
         # exception handle
         # print(response.headers)
 
+        if response.status_code == 429 and self.rate_limiter:
+            self.rate_limiter.penalize(self.API_KEY, endpoint, method)
+
         if not str(response.status_code).startswith('2'):
             raise exceptions.OkxAPIException(response)
 
         return response.json()
 
-    def _request_without_params(self, method, request_path):
-        return self._request(method, request_path, {})
+    def _request_without_params(self, method, request_path, timeout=None):
+        return self._request(method, request_path, {}, timeout)
 
-    def _request_with_params(self, method, request_path, params):
-        return self._request(method, request_path, params)
+    def _request_with_params(self, method, request_path, params, timeout=None):
+        return self._request(method, request_path, params, timeout)
 
     def _get_timestamp(self):
-        url = c.API_URL + c.SERVER_TIMESTAMP_URL
-        response = requests.get(url)
+        url = self.base_api + c.SERVER_TIMESTAMP_URL
+        response = self.session.get(url, timeout=self.timeout)
         if response.status_code == 200:
             return response.json()['data'][0]['ts']
         else:
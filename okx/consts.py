@@ -16,6 +16,14 @@ APPLICATION_JSON = 'application/json'
 GET = "GET"
 POST = "POST"
 
+# http connection pool
+HTTP_POOL_CONNECTIONS = 4
+HTTP_POOL_MAXSIZE = 32
+# concurrent connections per AsyncClient session
+ASYNC_MAX_IN_FLIGHT = 100
+# (connect, read) timeout in seconds
+REQUEST_TIMEOUT = (3.05, 10)
+
 SERVER_TIMESTAMP_URL = '/api/v5/public/time'
 
 # account
@@ -312,6 +320,7 @@ GRID_ADJUST_INVESTMETN = '/api/v5/tradingBot/grid/adjust-investment'
 GRID_QUANTITY = '/api/v5/tradingBot/grid/grid-quantity'
 SIGNAL_ORDERS_ALGO_PENDING = '/api/v5/tradingBot/signal/orders-algo-pending'
 SIGNAL_CLOSE_POSITION = '/api/v5/tradingBot/signal/close-position'
+SIGNAL_POSITIONS = '/api/v5/tradingBot/signal/positions'
 
 # finance
 STAKING_DEFI_OFFERS = '/api/v5/finance/staking-defi/offers'
@@ -0,0 +1,196 @@
+"""Client-side rate limiting keyed by OKX endpoint and account
+
+Each (account, endpoint) pair gets its own bucket sized from RATE_LIMITS, which maps
+the request paths in consts.py to the limits documented by OKX. Market and public
+data are limited per IP, so those buckets are shared by every account in the process.
+
+A bucket holds `count` tokens and every spent token comes back exactly `seconds`
+after it was spent. That lets a fan-out burst through the whole budget at once and
+then keeps the sustained rate at the documented maximum, while no window of
+`seconds` ever sees more than `count` requests leave this process. OKX counts
+batch order endpoints per order, so request_cost charges those one token per order.
+
+Acquiring returns a reservation (how long to wait), so the same buckets serve both
+the blocking Client (time.sleep) and AsyncClient (asyncio.sleep):
+
+    limiter = get_limiter()
+    limiter.acquire(api_key, c.POSITION_INFO)              # blocks until allowed
+    await limiter.acquire_async(api_key, c.POSITION_INFO)  # yields to the loop instead
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+
+from . import consts as c
+
+USER = 'user'
+IP = 'ip'
+
+# path -> (requests, seconds, scope); paths shared by GET and POST map methods separately
+RATE_LIMITS = {
+    # account
+    c.POSITION_INFO: (10, 2, USER),
+    c.ACCOUNT_INFO: (10, 2, USER),
+    c.POSITION_RISK: (10, 2, USER),
+    c.ACCOUNT_CONFIG: (5, 2, USER),
+    c.POSITION_MODE: (5, 2, USER),
+    c.SET_LEVERAGE: (20, 2, USER),
+    c.GET_LEVERAGE: (20, 2, USER),
+    c.MAX_TRADE_SIZE: (20, 2, USER),
+    c.MAX_AVAIL_SIZE: (20, 2, USER),
+    c.ADJUSTMENT_MARGIN: (20, 2, USER),
+    c.BILLS_DETAIL: (5, 1, USER),
+    c.BILLS_ARCHIVE: (5, 2, USER),
+    c.FEE_RATES: (5, 2, USER),
+    c.POSITIONS_HISTORY: (10, 2, USER),
+    c.ACC_RATE_LIMIT: (1, 1, USER),
+    # trade
+    c.PLACR_ORDER: {c.POST: (60, 2, USER), c.GET: (60, 2, USER)},
+    c.BATCH_ORDERS: (300, 2, USER),
+    c.CANAEL_ORDER: (60, 2, USER),
+    c.CANAEL_BATCH_ORDERS: (300, 2, USER),
+    c.AMEND_ORDER: (60, 2, USER),
+    c.AMEND_BATCH_ORDER: (300, 2, USER),
+    c.CLOSE_POSITION: (20, 2, USER),
+    c.ORDERS_PENDING: (60, 2, USER),
+    c.ORDERS_HISTORY: (40, 2, USER),
+    c.ORDERS_HISTORY_ARCHIVE: (20, 2, USER),
+    c.ORDER_FILLS: (60, 2, USER),
+    c.ORDERS_FILLS_HISTORY: (10, 2, USER),
+    c.PLACE_ALGO_ORDER: {c.POST: (20, 2, USER), c.GET: (20, 2, USER)},
+    c.CANCEL_ALGOS: (20, 2, USER),
+    c.AMEND_ALGOS: (20, 2, USER),
+    c.ORDERS_ALGO_OENDING: (20, 2, USER),
+    c.ORDERS_ALGO_HISTORY: (20, 2, USER),
+    c.MASS_CANCEL: (5, 2, USER),
+    c.CANCEL_ALL_AFTER: (1, 1, USER),
+    # trading bot
+    c.SIGNAL_ORDERS_ALGO_PENDING: (20, 2, USER),
+    c.SIGNAL_CLOSE_POSITION: (20, 2, USER),
+    c.SIGNAL_POSITIONS: (20, 2, USER),
+    # sub-account
+    c.VIEW_LIST: (2, 2, USER),
+    c.BALANCE: (6, 2, USER),
+    # market data
+    c.TICKERS_INFO: (20, 2, IP),
+    c.TICKER_INFO: (20, 2, IP),
+    c.ORDER_BOOKS: (40, 2, IP),
+    c.MARKET_CANDLES: (40, 2, IP),
+    c.HISTORY_CANDLES: (20, 2, IP),
+    c.INDEX_CANSLES: (20, 2, IP),
+    c.MARKPRICE_CANDLES: (20, 2, IP),
+    c.HISTORY_MARK_PRICE_CANDLES: (10, 2, IP),
+    c.HISTORY_INDEX_CANDLES: (10, 2, IP),
+    c.MARKET_TRADES: (100, 2, IP),
+    c.HISTORY_TRADES: (20, 2, IP),
+    # public data
+    c.INSTRUMENT_INFO: (20, 2, IP),
+    c.SYSTEM_TIME: (10, 2, IP),
+    c.MARK_PRICE: (10, 2, IP),
+    c.FUNDING_RATE: (20, 2, IP),
+    c.OPEN_INTEREST: (20, 2, IP),
+    c.PRICE_LIMIT: (20, 2, IP),
+    c.TIER: (10, 2, IP),
+}
+
+# OKX counts these per order, not per request: a batch of n orders costs n tokens
+BATCH_ENDPOINTS = {c.BATCH_ORDERS, c.CANAEL_BATCH_ORDERS, c.AMEND_BATCH_ORDER}
+
+# anything not in the table: conservative per-account default
+DEFAULT_LIMIT = (5, 2, USER)
+# extra time before a spent token is returned, covering send-time jitter against the server's window
+WINDOW_MARGIN = 0.05
+
+
+class TokenBucket(object):
+
+    def __init__(self, count, seconds, margin=WINDOW_MARGIN):
+        self.count = count
+        self.seconds = seconds + margin
+        self._spent = deque()  # release time of every token currently out of the bucket
+        self._lock = threading.Lock()
+
+    def reserve(self, now=None, tokens=1):
+        """Take `tokens` tokens and return how many seconds the caller must wait before sending"""
+        # a batch larger than the whole budget can only wait for the full bucket
+        tokens = min(max(tokens, 1), self.count)
+        with self._lock:
+            now = time.monotonic() if now is None else now
+            while self._spent and self._spent[0] <= now:
+                self._spent.popleft()
+            if len(self._spent) + tokens <= self.count:
+                start = now
+            else:
+                # wait until enough of the earliest spent tokens have come back
+                start = max(now, self._spent[tokens - self.count - 1])
+            self._spent.extend([start + self.seconds] * tokens)
+            return start - now
+
+    def penalize(self, now=None):
+        """Server said 429: treat the whole budget as spent from now"""
+        with self._lock:
+            now = time.monotonic() if now is None else now
+            self._spent = deque(max(release, now + self.seconds) for release in self._spent)
+            while len(self._spent) < self.count:
+                self._spent.appendleft(now + self.seconds)
+
+
+class RateLimiter(object):
+
+    def __init__(self, limits=None, default=DEFAULT_LIMIT):
+        self.limits = RATE_LIMITS if limits is None else limits
+        self.default = default
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def limit_for(self, method, path):
+        limit = self.limits.get(path, self.default)
+        if isinstance(limit, dict):
+            limit = limit.get(method, self.default)
+        return limit
+
+    def bucket(self, api_key, path, method=c.GET):
+        count, seconds, scope = self.limit_for(method, path)
+        key = (api_key if scope == USER else '', method, path)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.setdefault(key, TokenBucket(count, seconds))
+        return bucket
+
+    def acquire(self, api_key, path, method=c.GET, tokens=1):
+        wait = self.bucket(api_key, path, method).reserve(tokens=tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, api_key, path, method=c.GET, tokens=1):
+        wait = self.bucket(api_key, path, method).reserve(tokens=tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def penalize(self, api_key, path, method=c.GET):
+        self.bucket(api_key, path, method).penalize()
+
+
+def request_cost(path, params):
+    """Tokens one request spends: the number of orders for batch endpoints, otherwise 1"""
+    if path in BATCH_ENDPOINTS and isinstance(params, (list, tuple)):
+        return max(len(params), 1)
+    return 1
+
+
+_limiter_lock = threading.Lock()
+_shared_limiter = None
+
+
+def get_limiter():
+    # one limiter per process, so every API class instance for the same account draws on the same budget
+    global _shared_limiter
+    if _shared_limiter is None:
+        with _limiter_lock:
+            if _shared_limiter is None:
+                _shared_limiter = RateLimiter()
+    return _shared_limiter
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+import logging
+
+import pytest
+
+TIERS = dict(stop_loss_pct=2, low_trail_stop_loss_pct=0.2, trail_stop_loss_pct=0.2, higher_trail_stop_loss_pct=0.25,
+             low_trail_profit_threshold=0.3, first_trail_profit_threshold=1.0, second_trail_profit_threshold=3.0)
+
+
+@pytest.fixture
+def tiers():
+    return dict(TIERS)
+
+
+@pytest.fixture
+def bot_config():
+    return dict(TIERS, leverage=10, state_dir="")
+
+
+@pytest.fixture
+def logger():
+    logger = logging.getLogger('tests')
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    return logger
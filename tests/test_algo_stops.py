@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from trail.algo_stops import PREFIX, AlgoStopManager, round_stop
+
+KEY = ('BTC/USDT:USDT', 'long', 'cross')
+
+
+@pytest.mark.parametrize('price, tick, side, expected', [
+    (60799.95, 0.1, 'long', 60800.0),  # 多头止损向上取整，更早触发
+    (60799.95, 0.1, 'short', 60799.9),  # 空头止损向下取整
+    (60800.00000000001, 0.1, 'long', 60800.0),  # 浮点误差不进到下一个价位
+    (0.123456, 0.0001, 'long', 0.1235),
+    (101.7, None, 'long', 101.7),
+])
+def test_round_stop(price, tick, side, expected):
+    assert round_stop(price, tick, side) == pytest.approx(expected)
+
+
+class FakeTradeAPI:
+    def __init__(self):
+        self.placed = []
+        self.amended = []
+        self.cancelled = []
+        self.amend_code = '0'
+        self.pages = []
+
+    def place_algo_order(self, **params):
+        self.placed.append(params)
+        return {'code': '0', 'data': [{'algoId': f'a{len(self.placed)}'}]}
+
+    def amend_algos(self, instId, algoId, newSlTriggerPx):
+        self.amended.append((algoId, newSlTriggerPx))
+        return {'code': self.amend_code, 'msg': ''}
+
+    def cancel_algo_order(self, orders):
+        self.cancelled.append([order['algoId'] for order in orders])
+        return {'code': '0'}
+
+    def order_algos_list(self, ordType, instType, after):
+        return {'code': '0', 'data': self.pages.pop(0) if self.pages else []}
+
+
+@pytest.fixture
+def api():
+    return FakeTradeAPI()
+
+
+def test_place_then_debounced_amend(api, logger):
+    manager = AlgoStopManager(api, logger, amend_interval=60)
+    manager.sync(KEY, 'BTC-USDT-SWAP', 'long', 'net', 'cross', 98.0)
+    params = api.placed[0]
+    assert params['side'] == 'sell' and params['reduceOnly'] == 'true' and params['slTriggerPx'] == '98.0'
+    assert params['algoClOrdId'].startswith(PREFIX)
+    # 去抖期间只保留最新的目标价
+    manager.sync(KEY, 'BTC-USDT-SWAP', 'long', 'net', 'cross', 99.0)
+    manager.sync(KEY, 'BTC-USDT-SWAP', 'long', 'net', 'cross', 99.5)
+    manager.flush()
+    assert api.amended == []
+    manager.stops[KEY].amended_at -= 60
+    manager.flush()
+    assert api.amended == [('a1', '99.5')]
+    assert manager.stops[KEY].price == 99.5 and manager.stops[KEY].pending is None
+
+
+def test_failed_amend_cancels_and_next_sync_replaces(api, logger):
+    manager = AlgoStopManager(api, logger, amend_interval=0)
+    manager.sync(KEY, 'BTC-USDT-SWAP', 'long', 'long', 'cross', 98.0)
+    assert api.placed[0]['posSide'] == 'long' and 'reduceOnly' not in api.placed[0]
+    api.amend_code = '51280'
+    manager.sync(KEY, 'BTC-USDT-SWAP', 'long', 'long', 'cross', 99.0)
+    assert api.cancelled == [['a1']] and KEY not in manager.stops
+    manager.sync(KEY, 'BTC-USDT-SWAP', 'long', 'long', 'cross', 99.0)
+    assert len(api.placed) == 2 and manager.stops[KEY].algo_id == 'a2'
+
+
+def test_flip_replaces_and_retain_cancels_closed_positions(api, logger):
+    manager = AlgoStopManager(api, logger, amend_interval=0)
+    manager.sync(KEY, 'BTC-USDT-SWAP', 'long', 'net', 'cross', 98.0)
+    manager.sync(KEY, 'BTC-USDT-SWAP', 'short', 'net', 'cross', 102.0)  # 单向持仓反手
+    assert api.cancelled == [['a1']] and api.placed[1]['side'] == 'buy'
+    manager.retain([])
+    assert api.cancelled == [['a1'], ['a2']] and manager.stops == {}
+
+
+def test_cancel_stale_pages_and_only_touches_own_orders(api, logger):
+    api.pages = [[{'algoId': str(i), 'instId': 'BTC-USDT-SWAP', 'algoClOrdId': f'{PREFIX}{i}' if i % 2 else 'manual'}
+                  for i in range(30, 10, -1)],
+                 [{'algoId': '5', 'instId': 'BTC-USDT-SWAP', 'algoClOrdId': f'{PREFIX}5'}]]
+    manager = AlgoStopManager(api, logger)
+    assert manager.cancel_stale() == 11
+    assert [len(batch) for batch in api.cancelled] == [10, 1]
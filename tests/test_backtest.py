@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from trail.backtest import entry_points, simulate, summarize
+from trail.vector_engine import Ladder
+
+
+@pytest.fixture
+def ladder(tiers):
+    return Ladder(**tiers)
+
+
+def random_candles(n, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, n)))
+    open_ = np.concatenate([[100.0], close[:-1]]) * (1 + rng.normal(0, 0.001, n))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.003, n))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.003, n))
+    return {'open': open_, 'high': high, 'low': low, 'close': close}
+
+
+def reference(candles, entry_index, entry_price, sign, ladder, horizon):
+    """逐根 K 线的标量实现，规则与 simulate 的文档一致"""
+    n = len(candles['close'])
+    rows = []
+    for index, entry, side in zip(entry_index, entry_price, sign):
+        def pct(price):
+            return (price - entry) / entry * 100 * side
+
+        def stop_line(highest):
+            tier, stop = ladder.stop_line(np.array([highest]))
+            return int(tier[0]), float(stop[0])
+
+        highest = 0.0
+        last = min(index + horizon, n - 1)
+        result = None
+        for j in range(index + 1, last + 1):
+            favourable = pct(candles['high'][j] if side > 0 else candles['low'][j])
+            adverse = pct(candles['low'][j] if side > 0 else candles['high'][j])
+            _, stop_prior = stop_line(highest)
+            current = max(highest, favourable)
+            tier, stop_current = stop_line(current)
+            if adverse <= stop_prior:
+                result = (j - index, min(stop_prior, pct(candles['open'][j])), current, tier, True)
+                break
+            if pct(candles['close'][j]) <= stop_current:
+                result = (j - index, pct(candles['close'][j]), current, tier, True)
+                break
+            highest = current
+        if result is None:
+            tier, _ = stop_line(highest)
+            result = (last - index, pct(candles['close'][last]), highest, tier, False)
+        rows.append(result)
+    return rows
+
+
+@pytest.mark.parametrize('block, max_block', [(16, 512), (1, 1), (3, 5)])
+def test_simulate_matches_bar_by_bar_reference(ladder, block, max_block):
+    candles = random_candles(3000)
+    entry_index, sign = entry_points(len(candles['close']), 37)
+    entry_price = candles['close'][entry_index]
+    out = simulate(candles, entry_index, entry_price, sign, ladder, horizon=400, chunk=50, block=block,
+                   max_block=max_block)
+    expected = reference(candles, entry_index, entry_price, sign, ladder, horizon=400)
+    assert out['exit_offset'].tolist() == [row[0] for row in expected]
+    assert out['profit'] == pytest.approx([row[1] for row in expected])
+    assert out['highest'] == pytest.approx([row[2] for row in expected])
+    assert out['tier'].tolist() == [row[3] for row in expected]
+    assert out['closed'].tolist() == [row[4] for row in expected]
+
+
+def test_gap_through_stop_fills_at_open(ladder):
+    # 多头在 100 开仓，下一根直接低开 95：止损线 -2%，按开盘价 -5% 成交
+    candles = {'open': np.array([100.0, 95.0]), 'high': np.array([100.0, 96.0]),
+               'low': np.array([100.0, 94.0]), 'close': np.array([100.0, 95.5])}
+    out = simulate(candles, np.array([0]), np.array([100.0]), np.array([1.0]), ladder, horizon=10)
+    assert out['closed'][0] and out['exit_offset'][0] == 1
+    assert out['profit'][0] == pytest.approx(-5.0)
+
+
+def test_summarize_drawdown_and_fees():
+    report = summarize([1.0, -2.0, 0.5, 3.0], fee_pct=0.5)
+    assert report['pnl'] == pytest.approx(0.5)
+    assert report['max_drawdown'] == pytest.approx(2.5)
+    assert report['hit_rate'] == 0.5
+    assert summarize([])['trades'] == 0
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from trail.candle_store import CandleStore, parse_rows
+
+MINUTE = 60000
+
+
+def rows(start, count, confirm='1'):
+    """OKX 格式的 K 线，新到旧排列，close 等于分钟序号"""
+    return [[str(start + i * MINUTE), '1', '2', '0.5', str(start // MINUTE + i), '3', '3', '3', confirm]
+            for i in reversed(range(count))]
+
+
+def test_parse_rows_sorts_ascending_and_drops_unconfirmed():
+    data = rows(0, 3)
+    data.insert(0, [str(3 * MINUTE), '1', '2', '0.5', '9', '3', '3', '3', '0'])
+    columns = parse_rows(data)
+    assert columns['ts'].tolist() == [0, MINUTE, 2 * MINUTE]
+    assert columns['ts'].dtype == np.int64
+
+
+def test_append_and_prepend_keep_order_without_duplicates(tmp_path):
+    store = CandleStore(str(tmp_path))
+    assert store.write('BTC-USDT-SWAP', '1m', 'mark', parse_rows(rows(10 * MINUTE, 5))) == 5
+    view = store.read('BTC-USDT-SWAP', '1m', 'mark')
+    # 尾部追加：与已有部分重叠的行忽略
+    assert store.write('BTC-USDT-SWAP', '1m', 'mark', parse_rows(rows(13 * MINUTE, 4))) == 7
+    # 前插：更早的数据整体重写，中间已有的部分忽略
+    assert store.write('BTC-USDT-SWAP', '1m', 'mark', parse_rows(rows(6 * MINUTE, 6))) == 11
+    columns = store.read('BTC-USDT-SWAP', '1m', 'mark')
+    assert columns['ts'].tolist() == [m * MINUTE for m in range(6, 17)]
+    assert columns['close'].tolist() == list(range(6, 17))
+    assert not columns['ts'].flags.writeable
+    # 写入前打开的视图仍指向原来的 5 行
+    assert view['ts'].tolist() == [m * MINUTE for m in range(10, 15)]
+
+
+class FakeMarketAPI:
+    def __init__(self, start, count):
+        self.data = rows(start, count)
+        self.calls = []
+
+    def page(self, kind, after, limit):
+        self.calls.append(kind)
+        older = [row for row in self.data if not after or int(row[0]) < int(after)]
+        return {'code': '0', 'data': older[:limit]}
+
+    def get_history_markprice_candlesticks(self, instId, after, bar, limit):
+        return self.page('history', after, limit)
+
+    def get_markprice_candlesticks(self, instId, after, bar, limit):
+        return self.page('recent', after, limit)
+
+
+def test_fetch_range_splits_pages_and_trims(tmp_path):
+    api = FakeMarketAPI(0, 450)
+    store = CandleStore(str(tmp_path), api, workers=4)
+    columns = store.fetch_range('BTC-USDT-SWAP', '1m', 'mark', 5 * MINUTE, 420 * MINUTE)
+    assert columns['ts'].tolist() == [m * MINUTE for m in range(5, 420)]
+    assert len(api.calls) == 5
+    assert set(api.calls) == {'history'}  # 远早于最近 1440 根，只能走历史接口
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import threading
+
+import pytest
+
+from trail.core import ExchangeAdapter, TrailingBot
+
+
+class FakeAdapter(ExchangeAdapter):
+    name = 'fake'
+
+    def __init__(self, config, logger):
+        super().__init__(config, logger)
+        self.closed = []
+
+    def close(self, position):
+        self.closed.append((position['symbol'], position['side']))
+        return True
+
+
+@pytest.fixture
+def bot(bot_config, logger):
+    return TrailingBot(FakeAdapter(bot_config, logger), bot_config, logger)
+
+
+def position(side, mark, contracts=1, symbol='BTC'):
+    return {'symbol': symbol, 'side': side, 'contracts': contracts, 'entryPrice': 100.0, 'markPrice': mark,
+            'marginMode': 'cross'}
+
+
+def test_hedge_legs_are_tracked_separately(bot):
+    bot.process_positions([position('long', 100), position('short', 100)])
+    bot.process_positions([position('long', 101.5), position('short', 101.5)])
+    assert bot.highest_profits == {('BTC', 'long', 'cross'): 1.5, ('BTC', 'short', 'cross'): 0}
+    bot.on_mark_price('BTC', 101.1)  # 多头从 1.5% 回撤到 1.1%，低于第一档 1.2% 的平仓线
+    assert bot.adapter.closed == [('BTC', 'long')]
+    assert list(bot.positions_cache) == [('BTC', 'short', 'cross')]
+
+
+def test_add_resets_only_that_leg(bot):
+    bot.process_positions([position('long', 100), position('short', 100)])
+    bot.process_positions([position('long', 99.5), position('short', 99.5)])
+    bot.process_positions([position('long', 99.5), position('short', 99.5, contracts=2)])
+    assert bot.highest_profits[('BTC', 'short', 'cross')] == 0
+    assert bot.current_tiers[('BTC', 'long', 'cross')] == "无"
+    assert bot.detected_positions[('BTC', 'short', 'cross')] == 2
+
+
+def test_adapter_can_keep_peak_and_tier_on_add(bot_config, logger):
+    adapter = FakeAdapter(bot_config, logger)
+    adapter.reset_on_add = False
+    bot = TrailingBot(adapter, bot_config, logger)
+    bot.process_positions([position('long', 100)])
+    bot.process_positions([position('long', 101.5)])
+    bot.process_positions([position('long', 101.4, contracts=2)])
+    key = ('BTC', 'long', 'cross')
+    assert bot.highest_profits[key] == 1.5
+    assert bot.current_tiers[key] == "第一档移动止盈"
+    assert bot.detected_positions[key] == 2
+    bot.process_positions([position('long', 101.1, contracts=2)])  # 按保留的 1.5% 峰值回撤平仓
+    assert adapter.closed == [('BTC', 'long')]
+
+
+def test_empty_poll_needs_confirmation_but_push_does_not(bot):
+    bot.process_positions([position('long', 100)])
+    bot.process_positions([])
+    assert bot.detected_positions
+    bot.process_positions([position('long', 100)])
+    bot.on_position_push([], True)
+    assert not bot.detected_positions and not bot.positions_cache
+
+
+def test_cycle_log_ends_when_empty_snapshot_is_skipped(bot, monkeypatch):
+    ended = []
+    monkeypatch.setattr(bot.cycle_log, 'end', lambda **fields: ended.append(fields))
+    bot.process_positions([position('long', 100)])
+    bot.process_positions([])
+    assert len(ended) == 2
+
+
+class LiveFeed:
+    def __init__(self):
+        self.live = threading.Event()
+        self.live.set()
+
+    def set_symbols(self, symbols):
+        pass
+
+
+def test_live_mark_feed_still_discovers_positions_every_poll(bot):
+    bot.mark_feed = LiveFeed()
+    bot.process_positions([position('long', 100)])
+    # 只有价格变化：交给逐 tick 计算，本轮不重新判断
+    bot.process_positions([position('long', 101.5)])
+    assert bot.highest_profits[('BTC', 'long', 'cross')] == 0
+    # 新开的仓位和加仓在下一次轮询就能看到
+    bot.process_positions([position('long', 101.5, contracts=2), position('short', 100, symbol='ETH')])
+    assert bot.detected_positions == {('BTC', 'long', 'cross'): 2, ('ETH', 'short', 'cross'): 1}
+    assert bot.highest_profits[('BTC', 'long', 'cross')] == 0  # 加仓后重新记录最高盈利
+    bot.process_positions([position('long', 102, contracts=2), position('short', 100, symbol='ETH')])
+    assert bot.highest_profits[('BTC', 'long', 'cross')] == 0
+    # 到了 position_refresh_interval，价格变化的仓位也完整判断一次
+    bot.next_full_evaluation = 0
+    bot.process_positions([position('long', 102.5, contracts=2), position('short', 100, symbol='ETH')])
+    assert bot.highest_profits[('BTC', 'long', 'cross')] == 2.5
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from trail.diff import SnapshotDiffer, OPEN, ADD, REDUCE, CLOSE, FLIP, position_key
+
+
+def position(symbol, side, contracts, mark=100.0, margin_mode='cross'):
+    return {'symbol': symbol, 'side': side, 'contracts': contracts, 'entryPrice': 100.0, 'markPrice': mark,
+            'marginMode': margin_mode}
+
+
+def kinds(diff):
+    return sorted((event.kind, event.symbol) for event in diff.events)
+
+
+def test_position_key():
+    assert position_key(position('BTC', 'long', 1)) == ('BTC', 'long', 'cross')
+    assert position_key({'symbol': 'BTC', 'side': 'short'}) == ('BTC', 'short', '')
+
+
+def test_lifecycle_events():
+    differ = SnapshotDiffer()
+    diff = differ.apply([position('BTC', 'long', 1), position('ETH', 'short', 2)])
+    assert kinds(diff) == [(OPEN, 'BTC'), (OPEN, 'ETH')]
+    assert len(diff.changed) == 2
+
+    diff = differ.apply([position('BTC', 'long', 1), position('ETH', 'short', 2)])
+    assert diff.events == [] and diff.changed == []
+
+    diff = differ.apply([position('BTC', 'long', 3), position('ETH', 'short', 1)])
+    assert kinds(diff) == [(ADD, 'BTC'), (REDUCE, 'ETH')]
+
+    diff = differ.apply([position('BTC', 'long', 3, mark=101)])
+    assert kinds(diff) == [(CLOSE, 'ETH')]
+    assert [p['symbol'] for p in diff.changed] == ['BTC']
+    assert [p['symbol'] for p in diff.closed] == ['ETH']
+
+
+def test_flip_replaces_close_and_open():
+    differ = SnapshotDiffer()
+    differ.apply([position('BTC', 'long', 1)])
+    diff = differ.apply([position('BTC', 'short', 1)])
+    assert kinds(diff) == [(FLIP, 'BTC')]
+    assert diff.events[0].previous['side'] == 'long'
+
+
+def test_hedge_legs_are_separate_positions():
+    differ = SnapshotDiffer()
+    differ.apply([position('BTC', 'long', 1), position('BTC', 'short', 1)])
+    diff = differ.apply([position('BTC', 'long', 1)])
+    assert kinds(diff) == [(CLOSE, 'BTC')]
+    assert diff.events[0].previous['side'] == 'short'
+
+
+def test_empty_snapshot_needs_confirmation():
+    differ = SnapshotDiffer(empty_confirmations=2)
+    differ.apply([position('BTC', 'long', 1)])
+    assert differ.apply([]) is None
+    diff = differ.apply([])
+    assert kinds(diff) == [(CLOSE, 'BTC')]
+
+
+def test_non_empty_snapshot_resets_confirmation():
+    differ = SnapshotDiffer(empty_confirmations=2)
+    differ.apply([position('BTC', 'long', 1)])
+    assert differ.apply([]) is None
+    assert differ.apply([position('BTC', 'long', 1)]).events == []
+    assert differ.apply([]) is None
+
+
+def test_confirmed_empty_snapshot_applies_at_once():
+    differ = SnapshotDiffer(empty_confirmations=2)
+    differ.apply([position('BTC', 'long', 1)])
+    diff = differ.apply([], confirmed=True)
+    assert kinds(diff) == [(CLOSE, 'BTC')]
+
+
+def test_incremental_update_closes_only_zeroed_positions():
+    differ = SnapshotDiffer()
+    differ.apply([position('BTC', 'long', 1), position('ETH', 'long', 1)])
+    diff = differ.apply([position('BTC', 'long', 0)], full_snapshot=False)
+    assert kinds(diff) == [(CLOSE, 'BTC')]
+    # 单向持仓平仓推送不带原方向时按品种和保证金模式匹配
+    diff = differ.apply([position('ETH', 'short', 0)], full_snapshot=False)
+    assert kinds(diff) == [(CLOSE, 'ETH')]
+
+
+def test_invalidate_puts_unchanged_position_back_in_changed():
+    differ = SnapshotDiffer()
+    differ.apply([position('BTC', 'long', 1), position('BTC', 'short', 1)])
+    differ.invalidate(('BTC', 'short', 'cross'))
+    diff = differ.apply([position('BTC', 'long', 1), position('BTC', 'short', 1)])
+    assert [p['side'] for p in diff.changed] == ['short']
+    assert differ.apply([position('BTC', 'long', 1), position('BTC', 'short', 1)]).changed == []
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+from trail.flatten import CANCEL_BATCH, cancel_batches, close_targets, flatten_async, inst_id_of
+
+
+def position(symbol, side, contracts, margin_mode='cross'):
+    return {'symbol': symbol, 'side': side, 'contracts': contracts, 'marginMode': margin_mode}
+
+
+def test_inst_id_of():
+    assert inst_id_of('BTC/USDT:USDT') == 'BTC-USDT-SWAP'
+    assert inst_id_of('ETH-USDT-SWAP') == 'ETH-USDT-SWAP'
+
+
+def test_close_targets_skip_empty_and_set_pos_side():
+    positions = [position('BTC/USDT:USDT', 'long', '2'), position('ETH/USDT:USDT', 'short', -1, 'isolated'),
+                 position('SOL/USDT:USDT', 'long', 0)]
+    hedge = close_targets(positions, 'long_short_mode')
+    assert [(t['instId'], t['posSide'], t['amount'], t['mgnMode']) for t in hedge] == [
+        ('BTC-USDT-SWAP', 'long', 2.0, 'cross'), ('ETH-USDT-SWAP', 'short', 1.0, 'isolated')]
+    assert {t['posSide'] for t in close_targets(positions, 'net_mode')} == {'net'}
+
+
+def test_cancel_batches_split_by_limit():
+    orders = [{'id': i, 'symbol': 'BTC/USDT:USDT', 'info': {}} for i in range(CANCEL_BATCH * 2 + 1)]
+    orders[0]['info'] = {'instId': 'BTC-USDT-240628'}
+    batches = cancel_batches(orders)
+    assert [len(batch) for batch in batches] == [CANCEL_BATCH, CANCEL_BATCH, 1]
+    assert batches[0][0] == {'instId': 'BTC-USDT-240628', 'ordId': '0'}
+    assert batches[0][1] == {'instId': 'BTC-USDT-SWAP', 'ordId': '1'}
+
+
+class FakeTradeAPI:
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+
+    async def close_positions(self, instId, mgnMode, posSide, autoCxl):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if instId == 'ETH-USDT-SWAP':
+            return {'code': '51000', 'msg': 'rejected'}
+        if instId == 'SOL-USDT-SWAP':
+            raise ConnectionError('reset')
+        return {'code': '0', 'data': []}
+
+    async def cancel_multiple_orders(self, batch):
+        return {'code': '2', 'data': [{'ordId': item['ordId'], 'sCode': '0' if item['ordId'] != '1' else '51400'}
+                                      for item in batch]}
+
+
+def test_flatten_sends_everything_concurrently_and_reports_each_result():
+    api = FakeTradeAPI()
+    targets = close_targets([position('BTC/USDT:USDT', 'long', 1), position('ETH/USDT:USDT', 'long', 1),
+                             position('SOL/USDT:USDT', 'long', 1)], 'net_mode')
+    batches = cancel_batches([{'id': i, 'symbol': 'BTC/USDT:USDT'} for i in range(3)])
+    results, cancels = asyncio.run(flatten_async(api, targets, batches))
+    assert api.peak == 3
+    assert [(r['symbol'], r['ok']) for r in results] == [
+        ('BTC/USDT:USDT', True), ('ETH/USDT:USDT', False), ('SOL/USDT:USDT', False)]
+    assert isinstance(results[2]['error'], ConnectionError)
+    assert all(r['latency'] >= 0.01 for r in results)
+    assert not cancels[0]['ok'] and cancels[0]['error'] == [{'ordId': '1', 'sCode': '51400'}]
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from trail.notify import FeishuNotifier
+
+
+class Response:
+    status_code = 200
+
+
+class Session:
+    def __init__(self):
+        self.payloads = []
+
+    def post(self, url, json=None, timeout=None):
+        self.payloads.append(json)
+        return Response()
+
+
+@pytest.fixture
+def notifier(logger):
+    notifier = FeishuNotifier('https://example.invalid/hook', logger, window=0.05, dedupe_ttl=60)
+    notifier.session = Session()
+    yield notifier
+    notifier.close()
+
+
+def test_keyed_messages_are_coalesced_and_deduplicated(notifier):
+    batch = [('fetch', "拉取失败"), (None, "平仓 BTC"), ('fetch', "拉取失败"), (None, "平仓 BTC")]
+    assert notifier._coalesce(batch) == ["拉取失败（重复 2 次）", "平仓 BTC", "平仓 BTC"]
+    # dedupe_ttl 内同一个 key 不再发出，压掉的次数在下一次发出时附上
+    assert notifier._coalesce([('fetch', "拉取失败")]) == []
+    notifier._last_sent['fetch'] -= 61
+    assert notifier._coalesce([('fetch', "拉取失败")]) == ["拉取失败（重复 2 次）"]
+
+
+def test_messages_within_window_become_one_card(notifier):
+    for i in range(3):
+        notifier.notify(f"首次检测到仓位 {i}")
+    notifier.close()
+    assert len(notifier.session.payloads) == 1
+    card = notifier.session.payloads[0]
+    assert card['msg_type'] == 'interactive'
+    assert card['card']['elements'][0]['text']['content'].splitlines() == [f"首次检测到仓位 {i}" for i in range(3)]
+    assert notifier.sent == 3
+
+
+def test_single_message_is_plain_text(notifier):
+    assert notifier._payload(["平仓 BTC"]) == {"msg_type": "text", "content": {"text": "平仓 BTC"}}
+
+
+def test_full_queue_drops_instead_of_blocking(logger):
+    notifier = FeishuNotifier('https://example.invalid/hook', logger, maxsize=1)
+    notifier.close()  # 后台线程已停止，队列不再被消费
+    notifier.notify("a")
+    notifier.notify("b")
+    assert notifier.dropped == 1
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from trail import optimize
+from trail.backtest import run
+
+
+def symbols(n=1500):
+    rng = np.random.default_rng(3)
+    result = {}
+    for inst_id in ('BTC-USDT-SWAP', 'ETH-USDT-SWAP'):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, n)))
+        mark = {'ts': np.arange(n, dtype=np.float64) * 60000, 'open': close * 0.999, 'high': close * 1.002,
+                'low': close * 0.998, 'close': close}
+        result[inst_id] = (mark, close * 1.0001)
+        n += 100  # 两个品种长度不同，检查共享内存里的分段
+    return result
+
+
+def test_grid_skips_invalid_combinations(tiers):
+    grid = {'low_trail_profit_threshold': [0.5, 1.5], 'first_trail_profit_threshold': [1.0, 2.0]}
+    combos = list(optimize.grid_combinations(tiers, grid))
+    # 1.5 作为低档阈值时必须小于第一档阈值，(1.5, 1.0) 被去掉
+    assert [(p['low_trail_profit_threshold'], p['first_trail_profit_threshold']) for p in combos] == \
+        [(0.5, 1.0), (0.5, 2.0), (1.5, 2.0)]
+
+
+def test_random_combinations_are_valid_and_reproducible(tiers):
+    first = list(optimize.random_combinations(tiers, optimize.DEFAULT_RANGES, 50, seed=1))
+    assert len(first) == 50 and all(optimize.valid_params(p) for p in first)
+    assert first == list(optimize.random_combinations(tiers, optimize.DEFAULT_RANGES, 50, seed=1))
+
+
+def test_shared_memory_roundtrip():
+    data = symbols()
+    shm, shape = optimize.share_symbols(data)
+    try:
+        optimize.attach_symbols(shm.name, shape)
+        for inst_id, (mark, trade_close) in data.items():
+            views, close = optimize._symbols[inst_id]
+            assert np.array_equal(close, trade_close)
+            for name in ('ts', 'open', 'high', 'low', 'close'):
+                assert np.array_equal(views[name], mark[name])
+    finally:
+        optimize._shm.close()
+        shm.close()
+        shm.unlink()
+
+
+def test_sweep_matches_serial_run_and_sorts_by_pnl(tiers):
+    data = symbols()
+    grid = {'stop_loss_pct': [1.0, 2.0, 3.0], 'trail_stop_loss_pct': [0.1, 0.3]}
+    combos = list(optimize.grid_combinations(tiers, grid))
+    results = optimize.sweep(data, combos, every=30, horizon=300, workers=2, batch_size=2)
+    assert len(results) == len(combos)
+    pnls = [summary['pnl'] for _, summary in results]
+    assert pnls == sorted(pnls, reverse=True)
+    for params, summary in results:
+        assert summary == pytest.approx(run(data, params, 30, 300)['total'])
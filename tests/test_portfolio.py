@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+from types import SimpleNamespace
+
+import pytest
+
+from chua_ok_all import MultiAssetTradingBot
+from trail.logsetup import CycleLog
+from trail.portfolio import Portfolio
+
+
+def position(symbol, side, entry, mark, contracts=1, **extra):
+    return dict(symbol=symbol, side=side, entryPrice=entry, markPrice=mark, contracts=contracts, **extra)
+
+
+POSITIONS = [
+    # +10%，名义价值 1 * 10 * 110 = 1100，保证金 110
+    position('BTC', 'long', 100, 110, contractSize=10, leverage=10),
+    # -5%（空头上涨），名义价值 3 * 1 * 21 = 63，initialMargin 直接给出
+    position('ETH', 'short', 20, 21, contracts=-3, contractSize=1, initialMargin=63),
+]
+
+
+@pytest.mark.parametrize('weighting, expected', [
+    ('simple', (10 - 5) / 2),
+    ('notional', (10 * 1100 - 5 * 63) / 1163),
+    ('margin', (10 * 110 - 5 * 63) / 173),
+])
+def test_weightings(weighting, expected):
+    portfolio = Portfolio(weighting=weighting)
+    assert portfolio.profit(portfolio.snapshot(POSITIONS)) == pytest.approx(expected)
+
+
+def test_snapshot_skips_rows_without_side_or_entry():
+    snapshot = Portfolio().snapshot(POSITIONS + [position('SOL', None, 1, 1), position('XRP', 'long', 0, 1)])
+    assert snapshot.symbols == ['BTC', 'ETH']
+    assert snapshot.total_contracts == 4
+    assert Portfolio().profit(Portfolio().snapshot([])) == 0.0
+
+
+def test_contract_size_is_looked_up_once():
+    calls = []
+
+    class Exchange:
+        def market(self, symbol):
+            calls.append(symbol)
+            return {'contractSize': 0.01}
+
+    portfolio = Portfolio(Exchange(), 'notional')
+    for _ in range(3):
+        snapshot = portfolio.snapshot([position('BTC', 'long', 100, 110)])
+    assert calls == ['BTC']
+    assert snapshot.notional.tolist() == pytest.approx([1.1])
+
+
+def test_unknown_weighting_is_rejected():
+    with pytest.raises(ValueError):
+        Portfolio(weighting='equal')
+
+
+def test_hedge_legs_are_logged_separately(logger):
+    portfolio = Portfolio()
+    bot = SimpleNamespace(cycle_log=CycleLog(logger), logger=logger, portfolio=portfolio)
+    hedge = [position('BTC', 'long', 100, 101), position('BTC', 'short', 100, 101)]
+    MultiAssetTradingBot.calculate_average_profit(bot, portfolio.snapshot(hedge))
+    assert set(bot.cycle_log.states) == {('BTC', 'long'), ('BTC', 'short')}
+    MultiAssetTradingBot.calculate_average_profit(bot, portfolio.snapshot(hedge[1:]))
+    assert set(bot.cycle_log.states) == {('BTC', 'short')}
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from okx import consts as c
+from okx.ratelimit import TokenBucket, RateLimiter, request_cost, IP, USER
+
+
+def test_bucket_allows_burst_then_waits_for_released_tokens():
+    bucket = TokenBucket(3, 2, margin=0)
+    assert [bucket.reserve(now=0) for _ in range(3)] == [0, 0, 0]
+    assert bucket.reserve(now=0.5) == 1.5  # 第一个 token 在 t=2 归还
+    # t=3 时前三个 token 已归还，第四个请求（t=2 发出）的 token 要到 t=4
+    assert [bucket.reserve(now=3) for _ in range(3)] == [0, 0, 1]
+
+
+def test_bucket_never_exceeds_count_per_window():
+    bucket = TokenBucket(5, 1, margin=0)
+    sends = [t + bucket.reserve(now=t) for t in [i * 0.01 for i in range(40)]]
+    for start in sends:
+        assert sum(start <= send < start + 1 for send in sends) <= 5
+
+
+def test_batch_reserves_several_tokens():
+    bucket = TokenBucket(10, 2, margin=0)
+    assert bucket.reserve(now=0, tokens=8) == 0
+    assert bucket.reserve(now=0, tokens=3) == 2  # 只剩 2 个，等最早的 token 归还
+    # 超过整个预算的批量只等满桶
+    assert TokenBucket(4, 2, margin=0).reserve(now=0, tokens=100) == 0
+
+
+def test_penalize_spends_whole_budget():
+    bucket = TokenBucket(3, 2, margin=0)
+    bucket.reserve(now=0)
+    bucket.penalize(now=1)
+    assert bucket.reserve(now=1) == 2  # 整个预算从 t=1 起算，t=3 才归还
+    assert bucket.reserve(now=3) == 0
+
+
+def test_request_cost():
+    orders = [{'instId': 'BTC-USDT-SWAP'}] * 7
+    assert request_cost(c.BATCH_ORDERS, orders) == 7
+    assert request_cost(c.CANAEL_BATCH_ORDERS, orders[:2]) == 2
+    assert request_cost(c.BATCH_ORDERS, []) == 1
+    assert request_cost(c.PLACR_ORDER, {'instId': 'BTC-USDT-SWAP'}) == 1
+
+
+def test_buckets_are_per_account_for_user_limits_and_shared_for_ip_limits():
+    limiter = RateLimiter()
+    assert limiter.limit_for(c.GET, c.POSITION_INFO)[2] == USER
+    assert limiter.bucket('a', c.POSITION_INFO) is not limiter.bucket('b', c.POSITION_INFO)
+    assert limiter.bucket('a', c.POSITION_INFO) is limiter.bucket('a', c.POSITION_INFO)
+    assert limiter.limit_for(c.GET, c.MARK_PRICE)[2] == IP
+    assert limiter.bucket('a', c.MARK_PRICE) is limiter.bucket('b', c.MARK_PRICE)
+    assert limiter.bucket('a', c.PLACR_ORDER, c.POST) is not limiter.bucket('a', c.PLACR_ORDER, c.GET)
+    assert limiter.limit_for(c.GET, '/api/v5/unknown') == limiter.default
+
+
+def test_penalize_only_affects_that_bucket():
+    limiter = RateLimiter(limits={'/x': (2, 1, USER)})
+    limiter.penalize('a', '/x')
+    assert limiter.bucket('a', '/x').reserve() > 0.9
+    assert limiter.bucket('b', '/x').reserve() == 0
+
+
+def test_ccxt_okx_requests_share_the_okx_limiter(monkeypatch):
+    ccxt = pytest.importorskip('ccxt')
+    import trail.adapters as adapters
+
+    limiter = RateLimiter()
+    monkeypatch.setattr(adapters, 'get_limiter', lambda: limiter)
+    exchange = adapters.LimitedOkx({'apiKey': 'k', 'secret': 's', 'password': 'p', 'enableRateLimit': False})
+
+    def fetch(url, method='GET', headers=None, body=None):
+        raise ccxt.RateLimitExceeded('429')
+
+    monkeypatch.setattr(exchange, 'fetch', fetch)
+    with pytest.raises(ccxt.RateLimitExceeded):
+        exchange.private_get_account_positions({'instType': 'SWAP'})
+    bucket = limiter.bucket('k', c.POSITION_INFO, c.GET)
+    # 先取了一个令牌，429 之后整桶被罚空
+    assert bucket.reserve() > 0
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from trail.signals import AlgoIdCache, LoopThread, fetch_signal_positions
+
+
+def test_first_load_is_synchronous_and_failures_are_not_cached(logger):
+    results = [RuntimeError('down'), ['a', 'b']]
+
+    def load():
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    cache = AlgoIdCache(load, ttl=60, logger=logger)
+    assert cache.get() is None  # 从未加载成功，不能当成没有策略
+    assert cache.get() == ['a', 'b']
+    assert cache.get() == ['a', 'b'] and not results  # ttl 内不再加载
+
+
+def test_stale_list_is_served_while_one_background_refresh_runs(logger):
+    release = threading.Event()
+    calls = []
+
+    def load():
+        calls.append(threading.current_thread().name)
+        if len(calls) > 1:
+            release.wait(5)
+        return [f'v{len(calls)}']
+
+    cache = AlgoIdCache(load, ttl=60, logger=logger)
+    assert cache.get() == ['v1']
+    cache.invalidate()
+    assert cache.get() == ['v1']  # 过期后仍立即返回旧列表
+    assert cache.get() == ['v1']  # 刷新进行中不会再起第二个
+    release.set()
+    for _ in range(100):
+        if cache.get() == ['v2']:
+            break
+        threading.Event().wait(0.01)
+    assert cache.get() == ['v2']
+    assert calls == ['MainThread', 'algo-id-refresh']
+
+
+class FakeTradingBotAPI:
+    async def signal_positions(self, algoOrdType, algoId):
+        if algoId == 'broken':
+            raise ConnectionError('reset')
+        if algoId == 'stopped':
+            return {'code': '51000', 'msg': 'algo not found'}
+        return {'code': '0', 'data': [{'instId': 'BTC-USDT-SWAP', 'pos': '-2', 'avgPx': '100', 'markPx': '99',
+                                       'mgnMode': 'cross'}]}
+
+
+def test_fetch_signal_positions_merges_and_reports_errors():
+    loop = LoopThread('test-signals')
+    try:
+        positions, errors = loop.run(fetch_signal_positions(FakeTradingBotAPI(), ['s1', 'broken', 'stopped']))
+    finally:
+        loop.stop()
+    assert [(p['algoId'], p['side'], p['contracts']) for p in positions] == [('s1', 'short', -2.0)]
+    assert isinstance(errors['broken'], ConnectionError) and errors['stopped'] == 'algo not found'
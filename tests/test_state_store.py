@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+
+import pytest
+
+from trail.core import ExchangeAdapter, TrailingBot
+from trail.state_store import StateStore, TrailState, reconcile
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = StateStore(str(tmp_path / 'state.sqlite'), flush_interval=60)
+    yield store
+    store.close()
+
+
+def position(symbol, side, entry, margin_mode='cross', contracts=1):
+    return {'symbol': symbol, 'side': side, 'contracts': contracts, 'entryPrice': entry, 'markPrice': entry,
+            'marginMode': margin_mode}
+
+
+def test_record_flush_load_roundtrip(tmp_path, store):
+    store.record(('BTC', 'long', 'cross'), 100.0, 1.0, 2.5, "第一档移动止盈")
+    store.record(('BTC', 'short', 'cross'), 101.0, 2.0, 0.4, "低档保护止盈")
+    assert store.flush() == 2
+    assert store.flush() == 0
+    store.record(('BTC', 'long', 'cross'), 100.0, 1.0, 2.5, "第一档移动止盈")  # 未变化不写入
+    assert store.flush() == 0
+    store.close()
+
+    reopened = StateStore(str(tmp_path / 'state.sqlite'))
+    states = reopened.load()
+    reopened.close()
+    assert set(states) == {('BTC', 'long', 'cross'), ('BTC', 'short', 'cross')}
+    assert states[('BTC', 'short', 'cross')].highest_profit == 0.4
+
+
+def test_remove_and_retain(store):
+    for side in ('long', 'short'):
+        store.record(('ETH', side, ''), 10.0, 1.0, 0.0, "无")
+    store.flush()
+    store.retain([('ETH', 'long', '')])
+    store.flush()
+    assert set(store.load()) == {('ETH', 'long', '')}
+    store.remove(('ETH', 'long', ''))
+    store.flush()
+    assert store.load() == {}
+
+
+def test_accounts_share_one_file(store):
+    a, b = store.account('a'), store.account('b')
+    a.record(('BTC', 'long', 'cross'), 100.0, 1.0, 1.0, "无")
+    b.record(('BTC', 'long', 'cross'), 200.0, 1.0, 2.0, "无")
+    store.flush()
+    a.retain([])
+    store.flush()
+    assert a.load() == {}
+    assert b.load()[('BTC', 'long', 'cross')].entry_price == 200.0
+
+
+def test_legacy_table_is_migrated(tmp_path):
+    path = str(tmp_path / 'legacy.sqlite')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE trail_state (symbol TEXT PRIMARY KEY, side TEXT, entry_price REAL, amount REAL,"
+                 " highest_profit REAL, tier TEXT, updated REAL)")
+    conn.execute("INSERT INTO trail_state VALUES ('BTC', 'long', 100, 1, 3, '第二档移动止盈', 0)")
+    conn.commit()
+    conn.close()
+    store = StateStore(path)
+    try:
+        state = store.load()[('BTC', 'long', '')]
+        assert state.highest_profit == 3 and state.tier == '第二档移动止盈'
+    finally:
+        store.close()
+
+
+def test_reconcile_matches_symbol_side_and_margin_mode(store):
+    store.record(('BTC', 'long', 'cross'), 100.0, 1.0, 2.0, "第一档移动止盈")
+    store.record(('BTC', 'short', 'cross'), 100.0, 1.0, 1.0, "第一档移动止盈")
+    store.record(('ETH', 'long', 'isolated'), 10.0, 1.0, 1.0, "第一档移动止盈")
+    store.record(('SOL', 'long', 'cross'), 20.0, 1.0, 1.0, "第一档移动止盈")
+    store.flush()
+    live = [position('BTC', 'long', 100.0),  # 仍在
+            position('BTC', 'short', 100.0, contracts=0),  # 已平
+            position('ETH', 'long', 10.0, margin_mode='cross'),  # 保证金模式不同
+            position('SOL', 'long', 21.0)]  # 重新开仓
+    kept, dropped = reconcile(store.load(), live)
+    assert set(kept) == {('BTC', 'long', 'cross')}
+    assert set(dropped) == {('BTC', 'short', 'cross'), ('ETH', 'long', 'isolated'), ('SOL', 'long', 'cross')}
+
+
+def test_reconcile_tolerates_float_noise():
+    restored = {('BTC', 'long', ''): TrailState('BTC', 'long', '', 100.0, 1.0, 1.0, "无", 0)}
+    kept, dropped = reconcile(restored, [{'symbol': 'BTC', 'side': 'long', 'contracts': 1,
+                                          'entryPrice': 100.00000001}])
+    assert list(kept) == [('BTC', 'long', '')] and dropped == []
+
+
+class _Adapter(ExchangeAdapter):
+    name = 'state'
+
+
+def test_rows_survive_empty_and_partial_snapshots_before_restore(tmp_path, bot_config, logger):
+    config = dict(bot_config, state_dir=str(tmp_path))
+    store = StateStore(str(tmp_path / 'state.sqlite'))
+    store.record(('BTC', 'long', 'cross'), 100.0, 1.0, 2.5, "第一档移动止盈")
+    store.close()
+
+    bot = TrailingBot(_Adapter(config, logger), config, logger)
+    bot.process_positions([])  # 重启后第一轮拉到空快照
+    bot.process_positions([position('ETH', 'long', 10.0)], full_snapshot=False)  # 不完整的快照
+    bot.state_store.flush()
+    assert set(bot.state_store.load()) == {('BTC', 'long', 'cross')}
+
+    live = [dict(position('BTC', 'long', 100.0), markPrice=102.3), position('ETH', 'long', 10.0)]
+    bot.process_positions(live)
+    assert bot.highest_profits[('BTC', 'long', 'cross')] == 2.5
+    bot.state_store.flush()
+    assert set(bot.state_store.load()) == {('BTC', 'long', 'cross'), ('ETH', 'long', 'cross')}
+    bot.state_store.close()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+from trail.core import CLOSE_PENDING, TrailingBot
+from trail.supervisor import OkxAccountAdapter
+
+
+class FakeTradeAPI:
+    def __init__(self, code):
+        self.code = code
+        self.calls = 0
+        self.answer = asyncio.Event()  # 交易所什么时候回复由测试控制
+
+    async def close_positions(self, **params):
+        self.calls += 1
+        await self.answer.wait()
+        return {'code': self.code, 'msg': '' if self.code == '0' else 'rejected', 'data': []}
+
+
+class Notifier:
+    def __init__(self):
+        self.messages = []
+
+    def notify(self, message, key=None):
+        self.messages.append(message)
+
+
+def position(mark):
+    return {'symbol': 'BTC/USDT:USDT', 'side': 'long', 'contracts': 1.0, 'entryPrice': 100.0, 'markPrice': mark,
+            'marginMode': 'cross'}
+
+
+def run_close(bot_config, logger, code):
+    """第一轮建立跟踪，第二轮亏损超过止损触发平仓，等异步平仓结束后返回 bot 和各轮 close 的返回值"""
+    async def main():
+        loop = asyncio.get_running_loop()
+        config = dict(bot_config, name='a', apiKey='k', secret='s', password='p')
+        adapter = OkxAccountAdapter(config, logger, None, loop)
+        adapter.position_mode = 'long_short_mode'
+        adapter.trade_api = FakeTradeAPI(code)
+        notifier = Notifier()
+        bot = TrailingBot(adapter, config, logger, notifier=notifier)
+        await loop.run_in_executor(None, bot.process_positions, [position(100.0)])
+        await loop.run_in_executor(None, bot.process_positions, [position(97.0)])
+        pending = dict(bot.pending_closes)
+        adapter.trade_api.answer.set()
+        await asyncio.gather(*(asyncio.wrap_future(future) for future in adapter.pending_closes()))
+        # 下一次快照仍有该仓位：成功时交易所已平仓不会再出现；失败时按保留的状态重新判断并再次平仓
+        if code != '0':
+            await loop.run_in_executor(None, bot.process_positions, [position(97.0)])
+            await asyncio.gather(*(asyncio.wrap_future(future) for future in adapter.pending_closes()))
+        return bot, notifier, pending
+
+    return asyncio.run(main())
+
+
+def test_close_is_pending_until_exchange_answers(bot_config, logger):
+    bot, notifier, pending = run_close(bot_config, logger, '0')
+    key = ('BTC/USDT:USDT', 'long', 'cross')
+    assert list(pending) == [key]
+    assert bot.adapter.trade_api.calls == 1
+    assert bot.pending_closes == {}
+    assert key not in bot.detected_positions and key not in bot.highest_profits
+    assert any(message.startswith("Closed position") for message in notifier.messages)
+
+
+def test_failed_close_keeps_tracking_state(bot_config, logger):
+    bot, notifier, pending = run_close(bot_config, logger, '51000')
+    key = ('BTC/USDT:USDT', 'long', 'cross')
+    assert list(pending) == [key]
+    assert bot.pending_closes == {}
+    assert key in bot.detected_positions and key in bot.highest_profits
+    assert not any(message.startswith("Closed position") for message in notifier.messages)
+    assert any("平仓请求失败" in message for message in notifier.messages)
+    assert bot.adapter.trade_api.calls == 2
+    assert bot.adapter.closing == {}
+
+
+def test_snapshot_without_position_confirms_pending_close(bot_config, logger):
+    async def main():
+        loop = asyncio.get_running_loop()
+        config = dict(bot_config, name='a', apiKey='k', secret='s', password='p')
+        adapter = OkxAccountAdapter(config, logger, None, loop)
+        adapter.position_mode = 'net_mode'
+        notifier = Notifier()
+        bot = TrailingBot(adapter, config, logger, notifier=notifier)
+        adapter.close = lambda position: CLOSE_PENDING  # 交易所迟迟不回复
+        await loop.run_in_executor(None, bot.process_positions, [position(100.0)])
+        await loop.run_in_executor(None, bot.process_positions, [position(97.0)])
+        assert list(bot.pending_closes) == [('BTC/USDT:USDT', 'long', 'cross')]
+        for _ in range(2):  # 空快照要连续两次才确认
+            await loop.run_in_executor(None, bot.process_positions, [])
+        return bot, notifier
+
+    bot, notifier = asyncio.run(main())
+    assert bot.pending_closes == {} and bot.positions_cache == {}
+    assert [m for m in notifier.messages if m.startswith("Closed position")] != []
+    assert not any("手动平仓" in message for message in notifier.messages)
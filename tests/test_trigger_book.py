@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import random
+
+from trail.trigger_book import TriggerBook, TIER_NONE, TIER_LOW, TIER_FIRST, TIER_SECOND
+
+
+def profit(side, entry, price):
+    return ((price - entry) if side == 'long' else (entry - price)) / entry * 100
+
+
+def test_tiers_and_stop_profit(tiers):
+    book = TriggerBook(**tiers)
+    assert book.tier(0.1) == TIER_NONE
+    assert book.tier(0.3) == TIER_LOW
+    assert book.tier(1.5) == TIER_FIRST
+    assert book.tier(3.0) == TIER_SECOND
+    assert book.stop_profit(0) == -2
+    assert book.stop_profit(0.5) == 0.2
+    assert abs(book.stop_profit(2.0) - 1.6) < 1e-12
+    assert abs(book.stop_profit(4.0) - 3.0) < 1e-12
+
+
+def test_stop_and_peak_prices(tiers):
+    book = TriggerBook(**tiers)
+    long = book.upsert('a', 'X', 'long', 100)
+    short = book.upsert('b', 'X', 'short', 100)
+    assert abs(long.stop_price - 98) < 1e-9
+    assert abs(abs(short.stop_price) - 102) < 1e-9
+    assert book.on_price('X', 99) == ['b']  # 空头创新高
+    assert book.on_price('X', 99, raised=False) == []
+    assert book.on_price('X', 97.9, raised=False) == ['a']
+    assert book.on_price('Y', 50) == []
+
+
+def test_new_high_moves_stop_up(tiers):
+    book = TriggerBook(**tiers)
+    book.upsert('a', 'X', 'long', 100)
+    assert book.on_price('X', 102) == ['a']  # 创新高
+    trigger = book.get('a')
+    assert abs(trigger.highest_profit - 2) < 1e-9
+    assert trigger.tier == TIER_FIRST
+    assert book.on_price('X', 101.7, raised=False) == []
+    assert book.on_price('X', 101.5, raised=False) == ['a']
+
+
+def test_remove_and_upsert_reset(tiers):
+    book = TriggerBook(**tiers)
+    book.upsert('a', 'X', 'long', 100)
+    book.on_price('X', 105)
+    book.upsert('a', 'X', 'long', 105)
+    assert book.get('a').highest_profit == 0
+    book.remove('a')
+    assert 'a' not in book and len(book) == 0
+    assert book.on_price('X', 1) == []
+
+
+def test_matches_per_position_loop(tiers):
+    """随机行情下与逐仓位计算的平仓集合、最高盈利一致（包括一起创新高的仓位）"""
+    for seed in range(5):
+        rng = random.Random(seed)
+        book = TriggerBook(**tiers)
+        expected = {}
+        price = 100.0
+        for key in range(200):
+            side, entry = rng.choice(('long', 'short')), 100 * (1 + rng.uniform(-0.03, 0.03))
+            book.upsert(key, 'X', side, entry)
+            expected[key] = [side, entry, 0.0]
+        for _ in range(1000):
+            price *= 1 + rng.gauss(0, 0.002)
+            if rng.random() < 0.02:
+                key, side = rng.randrange(200), rng.choice(('long', 'short'))
+                book.upsert(key, 'X', side, price)
+                expected[key] = [side, price, 0.0]
+            hits = set()
+            for key, state in expected.items():
+                current = profit(state[0], state[1], price)
+                state[2] = max(state[2], current)
+                if current <= book.stop_profit(state[2]):
+                    hits.add(key)
+            assert set(book.on_price('X', price, raised=False)) == hits
+            for key in hits:
+                del expected[key]
+            book.remove_many(hits)
+            for key in rng.sample(sorted(expected), min(3, len(expected))):
+                assert abs(book.get(key).highest_profit - expected[key][2]) < 1e-9
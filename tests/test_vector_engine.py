@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from mock.adapter import MockAdapter
+from trail.core import TrailingBot
+from trail.vector_engine import VectorEngine
+
+
+def loop_closing(positions, marks, highest_profits, tiers):
+    """TrailingBot.evaluate_position 的分档判断（去掉日志和下单）"""
+    closing = []
+    for key, (side, entry) in positions.items():
+        current = (marks[key] - entry) / entry * 100 * (1 if side == 'long' else -1)
+        highest = highest_profits[key] = max(highest_profits.get(key, 0), current)
+        if highest >= tiers['second_trail_profit_threshold']:
+            stop = highest * (1 - tiers['higher_trail_stop_loss_pct'])
+        elif highest >= tiers['first_trail_profit_threshold']:
+            stop = highest * (1 - tiers['trail_stop_loss_pct'])
+        elif highest >= tiers['low_trail_profit_threshold']:
+            stop = tiers['low_trail_stop_loss_pct']
+        else:
+            stop = None
+        if (stop is not None and current <= stop) or current <= -tiers['stop_loss_pct']:
+            closing.append(key)
+    return closing
+
+
+def test_evaluate_matches_loop(tiers):
+    rng = np.random.default_rng(1)
+    size = 500
+    keys = [f"S{i}" for i in range(size)]
+    sides = rng.choice(['long', 'short'], size)
+    entries = 100 * (1 + rng.uniform(-0.03, 0.03, size))
+    engine = VectorEngine(**tiers, capacity=16)
+    for key, side, entry in zip(keys, sides, entries):
+        engine.upsert(key, side, entry, 1)
+    positions = {key: (side, entry) for key, side, entry in zip(keys, sides, entries)}
+    highest = {}
+    for _ in range(20):
+        prices = entries * (1 + rng.normal(0, 0.01, size))
+        expected = loop_closing(positions, dict(zip(keys, prices)), highest, tiers)
+        assert engine.closing(engine.evaluate(prices)) == expected
+    for key in keys[:10]:
+        assert abs(engine.state(key)['highest_profit'] - highest[key]) < 1e-9
+
+
+def test_upsert_skips_row_in_cycle_it_was_added_to(tiers):
+    engine = VectorEngine(**tiers)
+    engine.upsert('a', 'long', 100, 1)
+    engine.evaluate([102])
+    assert engine.state('a')['tier'] == "第一档移动止盈"
+    engine.upsert('a', 'long', 100, 2, mark_price=90)  # 加仓：重置最高盈利，本轮不判断
+    assert not engine.evaluate()[0]
+    assert engine.state('a')['highest_profit'] == 0
+    assert engine.evaluate()[0]  # 下一轮按 -10% 止损
+
+
+def test_remove_keeps_rows_aligned(tiers):
+    engine = VectorEngine(**tiers)
+    for i, side in enumerate(('long', 'short', 'long')):
+        engine.upsert(i, side, 100, 1)
+    engine.remove(0)
+    assert engine.keys == [2, 1]  # 最后一行移到空位
+    assert engine.closing(engine.evaluate([97, 97])) == [2]
+
+
+def run_bot(config, logger, vector):
+    adapter = MockAdapter(config, logger, positions=200, seed=3, volatility=0.001)
+    bot = TrailingBot(adapter, dict(config, vector_engine=vector, vector_min_batch=16), logger)
+    for _ in range(60):
+        adapter.step()
+        bot.monitor_positions()
+    return adapter.closed, bot.highest_profits
+
+
+def test_bot_batch_path_matches_scalar(bot_config, logger):
+    assert run_bot(bot_config, logger, True) == run_bot(bot_config, logger, False)
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+from trail import bitget_ws, okx_ws
+from trail.binance_positions import compact_position
+from trail.binance_ws import parse_account_update
+
+
+def test_okx_parse_position_net_mode():
+    row = {'instId': 'BTC-USDT-SWAP', 'pos': '-3', 'posSide': 'net', 'avgPx': '60000', 'markPx': '59000',
+           'mgnMode': 'cross'}
+    position = okx_ws.parse_position(row)
+    assert position == {'symbol': 'BTC/USDT:USDT', 'contracts': 3.0, 'entryPrice': 60000.0, 'markPrice': 59000.0,
+                        'side': 'short', 'marginMode': 'cross', 'info': row}
+
+
+def test_okx_parse_position_hedge_mode_and_empty_fields():
+    position = okx_ws.parse_position({'instId': 'ETH-USDT-SWAP', 'pos': '2', 'posSide': 'short', 'avgPx': '',
+                                      'markPx': '', 'mgnMode': 'isolated'})
+    assert position['side'] == 'short' and position['contracts'] == 2.0
+    assert position['entryPrice'] == 0 and position['markPrice'] == 0
+    assert okx_ws.parse_position({'instId': 'ETH-USDT-SWAP', 'pos': ''})['contracts'] == 0
+
+
+def test_bitget_parse_position():
+    row = {'instId': 'BTCUSDT', 'holdSide': 'long', 'total': '0.01', 'openPriceAvg': '60000', 'markPrice': '60300',
+           'marginMode': 'crossed'}
+    position = bitget_ws.parse_position(row)
+    assert position['symbol'] == 'BTC/USDT:USDT'
+    assert position['side'] == 'long' and position['contracts'] == 0.01
+    assert position['markPrice'] == 60300.0 and position['marginMode'] == 'cross'
+
+
+def test_bitget_mark_price_from_unrealized_pnl():
+    row = {'instId': 'ETHUSDT', 'holdSide': 'short', 'total': '0.5', 'openPriceAvg': '2500', 'unrealizedPL': '5',
+           'marginMode': 'isolated'}
+    position = bitget_ws.parse_position(row)
+    assert position['markPrice'] == 2490.0 and position['marginMode'] == 'isolated'
+
+
+def test_bitget_stream_drops_only_older_updates(logger):
+    tables = []
+    stream = bitget_ws.BitgetPositionStream('k', 's', 'p', tables.append, logger)
+
+    def push(action, total, u_time):
+        row = {'instId': 'BTCUSDT', 'holdSide': 'long', 'total': total, 'openPriceAvg': '60000',
+               'markPrice': '60300', 'marginMode': 'crossed', 'uTime': u_time}
+        stream.on_message({'action': action, 'arg': {'channel': 'positions'}, 'data': [row]})
+        return [p['contracts'] for p in tables[-1]]
+
+    assert push('snapshot', '1', '100') == [1.0]
+    assert push('update', '2', '99') == [1.0]  # 乱序到达的旧数据
+    assert push('update', '2', '100') == [2.0]  # 同一毫秒的后一次更新
+    assert push('update', '0', '101') == []
+
+
+def test_binance_compact_position():
+    row = {'symbol': 'BTCUSDT', 'positionSide': 'BOTH', 'positionAmt': '-0.5', 'entryPrice': '60000',
+           'markPrice': '61000'}
+    position = compact_position(row, 'BTC/USDT:USDT')
+    assert position['side'] == 'short' and position['contracts'] == 0.5
+    assert compact_position(dict(row, positionSide='LONG', positionAmt='1'), 'BTC/USDT:USDT')['side'] == 'long'
+
+
+def test_binance_account_update():
+    event = {'E': 123, 'a': {'P': [
+        {'s': 'BTCUSDT', 'pa': '2', 'ep': '100', 'up': '10', 'ps': 'BOTH', 'mt': 'cross'},
+        {'s': 'ETHUSDT', 'pa': '0', 'ep': '0', 'up': '0', 'ps': 'BOTH', 'mt': 'cross'},
+    ]}}
+    btc, eth = parse_account_update(event, lambda market_id: market_id[:-4] + '/USDT:USDT')
+    assert btc['symbol'] == 'BTC/USDT:USDT' and btc['side'] == 'long'
+    assert btc['contracts'] == 2.0 and btc['markPrice'] == 105.0
+    assert eth['contracts'] == 0
@@ -0,0 +1 @@
+"""分档移动止盈机器人的公共组件（行情/持仓推送、状态、执行等），供各 chua_*.py 共用"""
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""各交易所的 ExchangeAdapter 实现
+
+OkxAdapter（chua_ok.py、chua_ok_all.py）、BinanceAdapter（chua_bn.py）、BitgetAdapter（chua_bitget.py）、
+OkxSignalAdapter（chua_ok_bot.py）。只负责连接、拉取持仓、平仓和推送线程，分档判断在 trail.core.TrailingBot。
+"""
+import ccxt
+import okx.Trade_api as TradeAPI
+import okx.TradingBot_api as TradingBot
+from okx.async_api import AsyncTradingBotAPI
+from okx.ratelimit import get_limiter
+
+from trail.algo_stops import AlgoStopManager, round_stop
+from trail.binance_positions import PositionRiskReader
+from trail.binance_ws import BinanceUserStream, BINANCE_FSTREAM_URL
+from trail.bitget_ws import BitgetPositionStream, BITGET_WS_PRIVATE_URL
+from trail.core import ExchangeAdapter
+from trail.market_data import (OkxMarkPriceFeed, OKX_WS_PUBLIC_URL, BinanceMarkPriceFeed, BINANCE_WS_URL,
+                               BitgetMarkPriceFeed, BITGET_WS_PUBLIC_URL)
+from trail.okx_ws import OkxPositionStream, OKX_WS_PRIVATE_URL
+from trail.signals import AlgoIdCache, LoopThread, fetch_signal_positions
+
+
+def okx_inst_id(symbol):
+    return symbol.replace('/', '-').replace(':USDT', '-SWAP')
+
+
+class LimitedOkx(ccxt.okx):
+    """ccxt.okx 的请求走 okx.ratelimit，与 okx SDK 客户端共用同一账户的限速桶；在签名之前等待，时间戳不会过期"""
+
+    def fetch2(self, path, api='public', method='GET', params={}, headers=None, body=None, config={}):
+        endpoint = f"/api/{self.version}/{self.implode_params(path, params)}"
+        limiter = get_limiter()
+        limiter.acquire(self.apiKey, endpoint, method)
+        try:
+            return super().fetch2(path, api, method, params, headers, body, config)
+        except ccxt.RateLimitExceeded:
+            limiter.penalize(self.apiKey, endpoint, method)
+            raise
+
+
+class OkxAdapter(ExchangeAdapter):
+    name = 'okx'
+
+    def __init__(self, config, logger):
+        super().__init__(config, logger)
+        # 配置交易所
+        self.exchange = LimitedOkx({
+            'apiKey': config["apiKey"],
+            'secret': config["secret"],
+            'password': config["password"],
+            'timeout': 3000,
+            'enableRateLimit': False,  # 限速由 LimitedOkx 按接口处理
+            'options': {'defaultType': 'future'},
+            # 'proxies': {'http': 'http://127.0.0.1:10100', 'https': 'http://127.0.0.1:10100'},
+        })
+        # 配置 OKX 第三方库
+        self.trading_bot = TradeAPI.TradeAPI(config["apiKey"], config["secret"], config["password"], False, '0')
+        self.algo_stops = None
+        self.tick_sizes = {}  # symbol -> 最小变动价位，algo_stops 模式下启动时加载
+        # 获取持仓模式
+        self.position_mode = self.get_position_mode()
+
+    def get_position_mode(self):
+        try:
+            # 假设该端点用于获取账户持仓模式
+            response = self.exchange.private_get_account_config()
+            data = response.get('data', [])
+            if data and isinstance(data, list):
+                # 取列表的第一个元素（假设它是一个字典），然后获取 'posMode'
+                position_mode = data[0].get('posMode', 'single')  # 默认值为单向
+                self.logger.info(f"当前持仓模式: {position_mode}")
+                return position_mode
+            else:
+                self.logger.error("无法检测持仓模式: 'data' 字段为空或格式不正确")
+                return 'single'  # 返回默认值
+        except Exception as e:
+            self.logger.error(f"无法检测持仓模式: {e}")
+            return None
+
+    def prepare(self):
+        # 交易所常驻止损模式：按当前档位的平仓线挂条件单，峰值抬高时去抖修改触发价
+        if self.config.get("algo_stops", False):
+            self.algo_stops = AlgoStopManager(self.trading_bot, self.logger,
+                                              amend_interval=self.config.get("algo_amend_interval", 1.0))
+            self.load_tick_sizes()
+            try:
+                self.algo_stops.cancel_stale()
+            except Exception as e:
+                self.logger.error(f"撤销遗留止损条件单时出现异常: {e}")
+
+    def load_tick_sizes(self):
+        # sync_stop 在 state_lock 内调用，不能在那里加载市场信息
+        try:
+            markets = self.exchange.load_markets(reload=bool(self.tick_sizes))
+            self.tick_sizes = {symbol: market['precision']['price'] for symbol, market in markets.items()}
+        except Exception as e:
+            self.logger.error(f"加载市场信息失败: {e}")
+
+    def snapshot(self):
+        positions = self.exchange.fetch_positions()
+        if self.algo_stops and any(position['symbol'] not in self.tick_sizes for position in positions):
+            # 新上线的品种，在锁外刷新一次最小变动价位
+            self.load_tick_sizes()
+        return positions, True
+
+    def close(self, position):
+        symbol = position['symbol']
+        # 双向持仓模式下指定平仓方向；net_mode 下不区分方向，系统会自动平仓
+        pos_side = position['side'] if self.position_mode == 'long_short_mode' else 'net'
+        order = self.trading_bot.close_positions(instId=okx_inst_id(symbol), mgnMode=position['marginMode'],
+                                                 posSide=pos_side, autoCxl='true')
+        if order['code'] != '0':
+            self.logger.error(f"Failed to close position for {symbol}: {order}")
+            return False
+        return True
+
+    def stream(self, on_positions, on_state):
+        if not self.config.get("ws_positions", False):
+            return None
+        return OkxPositionStream(self.config["apiKey"], self.config["secret"], self.config["password"], on_positions,
+                                 self.logger, url=self.config.get("ws_url", OKX_WS_PRIVATE_URL), on_state=on_state)
+
+    def mark_feed(self, on_mark_price):
+        if not self.config.get("ws_mark_price", False):
+            return None
+        return OkxMarkPriceFeed(on_mark_price, self.logger, url=self.config.get("ws_public_url", OKX_WS_PUBLIC_URL))
+
+    def sync_stop(self, position, trigger):
+        if not self.algo_stops:
+            return
+        symbol = position['symbol']
+        # 触发价按最小变动价位取整；还没有该品种的价位时先按原价挂单，下一次快照刷新后再取整
+        tick = self.tick_sizes.get(symbol)
+        price = round_stop(abs(trigger.stop_price), tick, trigger.side)
+        pos_side = trigger.side if self.position_mode == 'long_short_mode' else 'net'
+        # 按 position_key 挂单，双向持仓下多空两边各有一张
+        self.algo_stops.sync(trigger.key, okx_inst_id(symbol), trigger.side, pos_side, position['marginMode'], price)
+
+    def forget(self, key):
+        if self.algo_stops:
+            self.algo_stops.forget(key)
+
+    def retain(self, keys):
+        if self.algo_stops:
+            self.algo_stops.retain(keys)
+
+    def flush(self):
+        if self.algo_stops:
+            self.algo_stops.flush()
+
+
+class BinanceAdapter(ExchangeAdapter):
+    name = 'binance'
+    reset_on_add = False  # 与原来的 chua_bn.py 一致，加仓不重置最高盈利和档位
+
+    def __init__(self, config, logger):
+        super().__init__(config, logger)
+        # 配置交易所
+        self.exchange = ccxt.binance({
+            'apiKey': config["apiKey"],
+            'secret': config["secret"],
+            'timeout': 3000,
+            'options': {
+                'defaultType': 'future',
+            },
+            # 'proxies': {'http': 'http://127.0.0.1:10100', 'https': 'http://127.0.0.1:10100'},
+        })
+        # 直接读原始 positionRisk，只为非零仓位构造精简记录
+        self.position_reader = PositionRiskReader(self.exchange)
+
+    def snapshot(self):
+        return self.position_reader.fetch(), True
+
+    def close(self, position):
+        side = 'sell' if position['side'] == 'long' else 'buy'
+        self.exchange.create_order(position['symbol'], 'market', side, abs(float(position['contracts'])), None,
+                                   {'type': 'future'})
+        return True
+
+    def stream(self, on_positions, on_state):
+        # 用户数据流（listenKey）推送
+        if not self.config.get("ws_positions", False):
+            return None
+        return BinanceUserStream(self.exchange, self.position_reader, on_positions, self.logger,
+                                 url=self.config.get("ws_url", BINANCE_FSTREAM_URL), on_state=on_state)
+
+    def mark_feed(self, on_mark_price):
+        if not self.config.get("ws_mark_price", False):
+            return None
+        return BinanceMarkPriceFeed(on_mark_price, self.logger, url=self.config.get("ws_public_url", BINANCE_WS_URL))
+
+
+class CustomBitget(ccxt.bitget):
+    def fetch(self, url, method='GET', headers=None, body=None):
+        if headers is None:
+            headers = {}
+        headers['X-CHANNEL-API-CODE'] = 'tu3hz'
+        return super().fetch(url, method, headers, body)
+
+
+class BitgetAdapter(ExchangeAdapter):
+    name = 'bitget'
+
+    def __init__(self, config, logger):
+        super().__init__(config, logger)
+        # 配置交易所
+        self.exchange = CustomBitget({
+            'apiKey': config["apiKey"],
+            'secret': config["secret"],
+            'password': config.get("password", ""),  # 如果 Bitget 需要 password，可以配置进去
+            'timeout': 3000,
+            'options': {'defaultType': 'swap'},
+            # 'proxies': {'http': 'http://127.0.0.1:10100', 'https': 'http://127.0.0.1:10100'},
+        })
+        # 平仓后用单品种持仓接口确认是否已平（只查这一个品种）
+        self.fast_verify = config.get("fast_verify", False)
+        self.position_stream = None
+
+    def prepare(self):
+        # 检查持仓模式
+        if not self.is_single_position_mode():
+            self.logger.error("持仓模式无法双向持仓,可能是因为手上有持仓单子导致，请先平仓更改双向持仓后再运行程序。")
+            self.notify("持仓模式无法双向持仓,可能是因为手上有持仓单子导致，请先平仓更改双向持仓后再运行程序。")
+            raise SystemExit("持仓模式无法双向持仓,可能是因为手上有持仓单子导致，请先平仓更改双向持仓后再运行程序。")
+
+    def is_single_position_mode(self):
+        try:
+            # 设置为双向持仓模式
+            account_info = self.exchange.set_position_mode(hedged=True)
+
+            # 获取 posMode 字段的值
+            self.logger.info(f"程序启动，更改持仓模式为双向持仓")
+            self.notify(f"程序启动，更改持仓模式为双向持仓")
+            pos_mode = account_info.get('data', {}).get('posMode', None)
+
+            # 如果 pos_mode 为 'single_mode'，则表示为单向持仓模式
+            return pos_mode == 'hedge_mode'
+        except Exception as e:
+            self.logger.error(f"获取账户信息时出错: {e}")
+            return False
+
+    def snapshot(self):
+        return self.exchange.fetch_positions(), True
+
+    def verify_closed(self, bg_symbol, side):
+        result = self.exchange.privateMixGetV2MixPositionSinglePosition(
+            {'symbol': bg_symbol, 'productType': 'USDT-FUTURES', 'marginCoin': 'USDT'})
+        return not any(row.get('holdSide') == side and float(row.get('total') or 0) != 0
+                       for row in result.get('data') or [])
+
+    def close(self, position):
+        symbol = position['symbol']
+        side = position['side']
+        bg_symbol = symbol.replace("/", "").replace(":USDT", "")
+        # 按持仓方向一次性市价全平
+        order = self.exchange.privateMixPostV2MixOrderClosePositions(
+            {'symbol': bg_symbol, 'holdSide': side, 'productType': 'USDT-FUTURES'})
+        if order['code'] != '00000' or not order['data']['successList']:
+            self.logger.error(f"Failed to close position for {symbol}: {order}")
+            return False
+        if self.position_stream:
+            self.position_stream.forget(symbol, side)
+        if self.fast_verify and not self.verify_closed(bg_symbol, side):
+            self.logger.error(f"{symbol} {side} 平仓请求已成功但仓位仍未清零，等待下一轮刷新")
+            self.notify(f"{symbol} {side} 平仓请求已成功但仓位仍未清零，等待下一轮刷新",
+                        key=f"close_pending:{symbol}:{side}")
+        return True
+
+    def stream(self, on_positions, on_state):
+        if not self.config.get("ws_positions", False):
+            return None
+        # 推送线程维护整张持仓表，每次回调都是全量快照
+        self.position_stream = BitgetPositionStream(
+            self.config["apiKey"], self.config["secret"], self.config.get("password", ""),
+            lambda positions: on_positions(positions, True), self.logger,
+            url=self.config.get("ws_url", BITGET_WS_PRIVATE_URL), on_state=on_state)
+        return self.position_stream
+
+    def mark_feed(self, on_mark_price):
+        if not self.config.get("ws_mark_price", False):
+            return None
+        return BitgetMarkPriceFeed(on_mark_price, self.logger, url=self.config.get("ws_public_url", BITGET_WS_PUBLIC_URL))
+
+
+class OkxSignalAdapter(ExchangeAdapter):
+    """OKX 信号策略：持仓按 algoId 分别拉取，平仓需要带上 algoId"""
+    name = 'ok_bot'
+
+    def __init__(self, config, logger):
+        super().__init__(config, logger)
+        # 配置 OKX 第三方库
+        self.trading_bot = TradingBot.TradingBotAPI(config["apiKey"], config["secret"], config["password"], False, '0')
+        # 信号策略列表缓存，过期后后台刷新；各策略持仓在常驻事件循环里并发拉取
+        self.signal_cache = AlgoIdCache(self.load_signals, config.get("signal_refresh_interval", 60), logger)
+        self.signal_loop = LoopThread('ok_bot_signals')
+        self.async_trading_bot = AsyncTradingBotAPI(config["apiKey"], config["secret"], config["password"], False, '0')
+
+    def load_signals(self):
+        # 使用 `signalBotTrade` 模块获取信号数据
+        details = self.trading_bot.signal_orders_algo_pending(algoOrdType="contract")
+        if details.get('code') != '0':
+            raise RuntimeError(details.get('msg'))
+        # 提取所有的 `algoId`
+        return [item['algoId'] for item in details.get('data', [])]
+
+    def snapshot(self):
+        algo_ids = self.signal_cache.get()
+        if algo_ids is None:
+            # 策略列表从未加载成功，不能当成空快照，否则已跟踪的仓位都会被判定为已平仓
+            raise RuntimeError("信号策略列表尚未加载成功")
+        # 各信号策略的持仓请求并发发出，合并成一份快照
+        all_positions, errors = self.signal_loop.run(
+            fetch_signal_positions(self.async_trading_bot, algo_ids), timeout=30)
+        for signal_id, error in errors.items():
+            self.logger.error(f"获取信号策略 {signal_id} 的持仓失败: {error}")
+        if errors:
+            # 策略可能已停止，尽快刷新 algoId 列表
+            self.signal_cache.invalidate()
+        return all_positions, not errors
+
+    def close(self, position):
+        symbol = position['symbol']
+        # 使用带 algoId 的平仓方法
+        order = self.trading_bot.signal_close_position(instId=okx_inst_id(symbol), algoId=position['algoId'])
+        if order['code'] == '0' and 'data' in order and order['data']:
+            return True
+        self.logger.error(f"Failed to close position for {symbol}: {order}")
+        return False
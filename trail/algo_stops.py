@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""交易所常驻止损（chua_ok 的 algo_stops 模式）
+
+每个持仓在 OKX 挂一张全平的条件单（ordType=conditional，closeFraction=1，按标记价触发、市价平仓），
+触发价等于 TriggerBook 当前档位的平仓线。峰值抬高、档位上移时用 amend_algos 修改触发价，
+而不是撤单重挂，所以任何时刻都有一张止损单在交易所；进程卡住或网络中断时由交易所按撮合延迟平仓。
+
+- 修改按品种去抖：同一品种 amend_interval 秒内最多修改一次，期间只保留最新的目标价，到期后由 flush 发出；
+  所有请求再经过 okx.ratelimit 的按账户限速（amend-algos 20 次/2s）。
+- 挂单都带 PREFIX 开头的 algoClOrdId，启动时撤掉上一次运行遗留的挂单（同一持仓只允许一张全平止盈止损单）。
+- 修改失败（已触发、已被撤销）时撤单并丢弃本地记录，下一次 sync 重新挂单。
+"""
+import time
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+
+PREFIX = 'trail'
+# cancel-algos 单次最多 10 个
+CANCEL_BATCH = 10
+
+
+def round_stop(price, tick, side):
+    """按最小变动价位取整，向更保守的方向（多头向上、空头向下），保证不晚于机器人自身的平仓线触发"""
+    if not tick:
+        return price
+    tick = Decimal(str(tick))
+    # 先去掉浮点误差（60800.00000000001 不应进到下一个价位）
+    steps = Decimal(str(round(price / float(tick), 6))).to_integral_value(ROUND_CEILING if side == 'long' else ROUND_FLOOR)
+    return float(steps * tick)
+
+
+class AlgoStop:
+    __slots__ = ("inst_id", "side", "algo_id", "price", "pending", "amended_at")
+
+    def __init__(self, inst_id, side, algo_id, price):
+        self.inst_id = inst_id
+        self.side = side
+        self.algo_id = algo_id
+        self.price = price
+        self.pending = None
+        self.amended_at = time.monotonic()
+
+
+class AlgoStopManager:
+    def __init__(self, trade_api, logger, amend_interval=1.0, retry_interval=30, trigger_px_type='mark'):
+        self.api = trade_api
+        self.logger = logger
+        self.amend_interval = amend_interval
+        self.retry_interval = retry_interval
+        self.trigger_px_type = trigger_px_type
+        self.stops = {}  # key -> AlgoStop
+        self._retry_at = {}  # 挂单失败的 key -> 下次重试时间
+        self._seq = 0
+
+    def cancel_stale(self, inst_type='SWAP'):
+        """撤掉上一次运行遗留的条件单；未完成的条件单按 algoId 倒序分页，after 取上一页最后一张，直到取空"""
+        stale = []
+        after = ''
+        while True:
+            response = self.api.order_algos_list(ordType='conditional', instType=inst_type, after=after)
+            if response.get('code', '0') != '0':
+                raise RuntimeError(response.get('msg') or response)
+            orders = response.get('data', [])
+            if not orders:
+                break
+            stale.extend({'algoId': order['algoId'], 'instId': order['instId']} for order in orders
+                         if order.get('algoClOrdId', '').startswith(PREFIX))
+            after = orders[-1]['algoId']
+        for i in range(0, len(stale), CANCEL_BATCH):
+            self.api.cancel_algo_order(stale[i:i + CANCEL_BATCH])
+        if stale:
+            self.logger.info(f"撤销遗留的止损条件单 {len(stale)} 张")
+        return len(stale)
+
+    def sync(self, key, inst_id, side, pos_side, td_mode, price):
+        """让 key 对应的条件单触发价跟上 price；没有挂单时新挂，有挂单时去抖后修改"""
+        stop = self.stops.get(key)
+        if stop is not None and (stop.side != side or stop.inst_id != inst_id):
+            # 单向持仓下反手开仓，旧单的方向已经不对
+            self.cancel(key)
+            stop = None
+        if stop is None:
+            if time.monotonic() >= self._retry_at.get(key, 0):
+                self._place(key, inst_id, side, pos_side, td_mode, price)
+            return
+        stop.pending = None if price == stop.price else price
+        self._amend_if_due(key, stop)
+
+    def flush(self):
+        """发出已到期的待修改触发价，主循环每轮调用"""
+        for key, stop in list(self.stops.items()):
+            if stop.pending is not None:
+                self._amend_if_due(key, stop)
+
+    def cancel(self, key):
+        stop = self.stops.pop(key, None)
+        if stop is None:
+            return
+        try:
+            response = self.api.cancel_algo_order([{'algoId': stop.algo_id, 'instId': stop.inst_id}])
+            if response.get('code') != '0':
+                # 仓位已平时交易所会自动撤销全平条件单，这里只记录
+                self.logger.info(f"撤销 {key} 止损条件单未成功: {response.get('msg')}")
+        except Exception as e:
+            self.logger.error(f"撤销 {key} 止损条件单时出现异常: {e}")
+
+    def retain(self, keys):
+        """撤掉不在 keys 中的条件单（仓位已平或不再监控）"""
+        keys = set(keys)
+        for key in [key for key in self.stops if key not in keys]:
+            self.cancel(key)
+        for key in [key for key in self._retry_at if key not in keys]:
+            del self._retry_at[key]
+
+    def forget(self, key):
+        """仓位已由机器人平掉，全平条件单会被交易所自动撤销，只清理本地记录"""
+        self.stops.pop(key, None)
+        self._retry_at.pop(key, None)
+
+    def _place(self, key, inst_id, side, pos_side, td_mode, price):
+        self._seq += 1
+        params = {
+            'instId': inst_id, 'tdMode': td_mode, 'side': 'sell' if side == 'long' else 'buy',
+            'ordType': 'conditional', 'closeFraction': '1', 'slTriggerPx': str(price), 'slOrdPx': '-1',
+            'slTriggerPxType': self.trigger_px_type, 'algoClOrdId': f"{PREFIX}{int(time.time() * 1000)}{self._seq}",
+        }
+        if pos_side == 'net':
+            params['reduceOnly'] = 'true'
+        else:
+            params['posSide'] = pos_side
+        try:
+            response = self.api.place_algo_order(**params)
+            if response.get('code') == '0':
+                self.stops[key] = AlgoStop(inst_id, side, response['data'][0]['algoId'], price)
+                self._retry_at.pop(key, None)
+                self.logger.info(f"{key} 已挂交易所止损条件单，触发价 {price}")
+                return True
+            self.logger.error(f"{key} 挂止损条件单失败: {response}")
+        except Exception as e:
+            self.logger.error(f"{key} 挂止损条件单时出现异常: {e}")
+        self._retry_at[key] = time.monotonic() + self.retry_interval
+        return False
+
+    def _amend_if_due(self, key, stop):
+        if stop.pending is None:
+            return
+        now = time.monotonic()
+        if now - stop.amended_at < self.amend_interval:
+            return
+        price = stop.pending
+        try:
+            response = self.api.amend_algos(instId=stop.inst_id, algoId=stop.algo_id, newSlTriggerPx=str(price))
+        except Exception as e:
+            self.logger.error(f"{key} 修改止损条件单时出现异常: {e}")
+            return
+        if response.get('code') == '0':
+            self.logger.info(f"{key} 止损条件单触发价 {stop.price} -> {price}")
+            stop.price = price
+            stop.pending = None
+            stop.amended_at = now
+        else:
+            # 条件单已触发、已被撤销或新触发价不合法，撤掉后由下次 sync 重新挂单
+            self.logger.error(f"{key} 修改止损条件单失败: {response}")
+            self.cancel(key)
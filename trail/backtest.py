@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""分档移动止盈的历史回测
+
+用 OKX 标记价格 K 线（触发判断，与机器人使用 markPrice 一致）和成交价 K 线（开仓价）回放
+chua_ok.monitor_positions 的分档规则。每隔 every 根 K 线在收盘价同时开多、开空，
+所有入场点按块堆成 (入场数, horizon) 的二维数组一次向量化计算，用 argmax 找第一次触发平仓的位置。
+
+K 线内部路径未知，按保守顺序处理：先用上一根为止的最高盈利对应的平仓线检查本根的不利极值
+（多头看 low，空头看 high，跳空时按开盘价成交），再用本根有利极值更新最高盈利，并用收盘价复核。
+
+    python -m trail.backtest --inst BTC-USDT-SWAP ETH-USDT-SWAP --days 30 --sync
+    python -m trail.backtest --inst BTC-USDT-SWAP --config config.json --exchange okx
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from trail.candle_store import CandleStore, KINDS, STORE_DIR
+from trail.trigger_book import TIER_PARAMS
+from trail.vector_engine import Ladder, TIER_NAMES
+
+
+def columns(candles):
+    """(n, 5) 的 [ts, open, high, low, close] 数组 -> 回测使用的列 dict（视图，不拷贝）"""
+    return {name: candles[:, index] for index, name in enumerate(('ts', 'open', 'high', 'low', 'close'))}
+
+
+def align(mark, trade):
+    """按时间戳对齐标记价格和成交价 K 线，返回 (mark 列, 成交价收盘价)
+
+    两边时间戳完全一致时直接返回存储的视图；没有成交价 K 线时用标记价收盘价。
+    """
+    if not len(trade['ts']):
+        return mark, mark['close']
+    if len(mark['ts']) == len(trade['ts']) and np.array_equal(mark['ts'], trade['ts']):
+        return mark, trade['close']
+    _, mark_index, trade_index = np.intersect1d(mark['ts'], trade['ts'], return_indices=True)
+    return {name: column[mark_index] for name, column in mark.items()}, trade['close'][trade_index]
+
+
+def simulate(candles, entry_index, entry_price, sign, ladder, horizon, chunk=4096, block=16, max_block=512):
+    """对一组入场点向量化回放分档规则
+
+    candles: 标记价格 K 线的列 dict（open/high/low/close）；entry_index/entry_price/sign: 每个入场点的 K 线下标、开仓价、方向(+1/-1)。
+    返回 dict：exit_offset（持有的 K 线数）、profit（平仓盈亏 %）、highest（最高盈利 %）、tier、closed。
+
+    大部分入场点很快就会触发平仓，所以按时间分块推进：每块只计算仍未平仓的入场点，
+    块宽从 block 起倍增到 max_block，最高盈利跨块延续。
+    """
+    high, low, close, open_ = candles['high'], candles['low'], candles['close'], candles['open']
+    n = len(close)
+    count = len(entry_index)
+    out = {
+        'exit_offset': np.zeros(count, dtype=np.int32),
+        'profit': np.zeros(count),
+        'highest': np.zeros(count),
+        'tier': np.zeros(count, dtype=np.int8),
+        'closed': np.zeros(count, dtype=bool),
+    }
+    for start in range(0, count, chunk):
+        active = np.arange(start, min(start + chunk, count))
+        # 最高盈利从 0 开始，与机器人首次检测时 highest_profits[symbol] = 0 一致
+        carry = np.zeros(len(active))
+        offset = 0
+        width = block
+        while len(active) and offset < horizon:
+            width = min(width, horizon - offset)
+            index = entry_index[active, None] + np.arange(offset + 1, offset + width + 1)
+            valid = index < n
+            # 本块已经用到最后一根 K 线的，本块结束后就不能再推进
+            at_end = index[:, -1] >= n - 1
+            index = np.minimum(index, n - 1)
+            entry = entry_price[active, None]
+            side = sign[active, None]
+            long = side > 0
+
+            def pct(price):
+                return (price - entry) / entry * 100 * side
+
+            bar_high, bar_low = high[index], low[index]
+            favourable = pct(np.where(long, bar_high, bar_low))
+            adverse = pct(np.where(long, bar_low, bar_high))
+            close_pct = pct(close[index])
+
+            prior = np.empty_like(favourable)
+            prior[:, 0] = carry
+            prior[:, 1:] = favourable[:, :-1]
+            np.maximum.accumulate(prior, axis=1, out=prior)
+            current = np.maximum(prior, favourable)
+
+            _, stop_prior = ladder.stop_line(prior)
+            tier_current, stop_current = ladder.stop_line(current)
+            intrabar = (adverse <= stop_prior) & valid
+            hit = intrabar | ((close_pct <= stop_current) & valid)
+            closed = hit.any(axis=1)
+            # 数据到头或持有满 horizon 仍未平仓的，按最后一根收盘价计盈亏
+            ended = ~closed & (at_end | (offset + width >= horizon))
+            done = closed | ended
+            first = np.where(closed, hit.argmax(axis=1), np.maximum(valid.sum(axis=1) - 1, 0))
+
+            rows = np.flatnonzero(done)
+            at = first[rows]
+            targets = active[rows]
+            open_pct = (open_[index[rows, at]] - entry[rows, 0]) / entry[rows, 0] * 100 * side[rows, 0]
+            out['exit_offset'][targets] = offset + at + 1
+            out['profit'][targets] = np.where(intrabar[rows, at],
+                                              np.minimum(stop_prior[rows, at], open_pct),
+                                              close_pct[rows, at])
+            out['highest'][targets] = current[rows, at]
+            out['tier'][targets] = tier_current[rows, at]
+            out['closed'][targets] = closed[rows]
+
+            keep = ~done
+            carry = current[keep, -1]
+            active = active[keep]
+            offset += width
+            width = min(width * 2, max_block)
+    return out
+
+
+def summarize(profit, fee_pct=0.0):
+    """按入场时间顺序累计收益，返回总收益、最大回撤、胜率等（单位均为 %）"""
+    profit = np.asarray(profit) - fee_pct
+    if not len(profit):
+        return {'trades': 0, 'pnl': 0.0, 'avg': 0.0, 'max_drawdown': 0.0, 'hit_rate': 0.0}
+    equity = np.cumsum(profit)
+    drawdown = np.maximum.accumulate(np.maximum(equity, 0)) - equity
+    return {
+        'trades': int(len(profit)),
+        'pnl': float(equity[-1]),
+        'avg': float(profit.mean()),
+        'max_drawdown': float(drawdown.max()),
+        'hit_rate': float((profit > 0).mean()),
+    }
+
+
+def entry_points(length, every, sides=('long', 'short')):
+    """每 every 根 K 线一个入场点，返回 (entry_index, sign)，同一时刻多空各一笔"""
+    base = np.arange(0, max(length - 1, 0), every)
+    signs = [1.0 if side == 'long' else -1.0 for side in sides]
+    entry_index = np.repeat(base, len(signs))
+    sign = np.tile(np.array(signs), len(base))
+    return entry_index, sign
+
+
+def backtest_symbol(mark, trade_close, ladder, every=60, horizon=1440, sides=('long', 'short')):
+    entry_index, sign = entry_points(len(mark['close']), every, sides)
+    result = simulate(mark, entry_index, trade_close[entry_index], sign, ladder, horizon)
+    result['entry_ts'] = np.asarray(mark['ts'][entry_index], dtype=np.int64)
+    result['sign'] = sign
+    return result
+
+
+def run(symbols, params, every=60, horizon=1440, fee_pct=0.0, sides=('long', 'short')):
+    """symbols: {instId: (mark 列 dict, trade_close)}；params: 七个分档参数的 dict"""
+    ladder = Ladder(*(params[name] for name in TIER_PARAMS))
+    report = {}
+    profits = []
+    for inst_id, (mark, trade_close) in symbols.items():
+        result = backtest_symbol(mark, trade_close, ladder, every, horizon, sides)
+        report[inst_id] = summarize(result['profit'], fee_pct)
+        report[inst_id]['tiers'] = {TIER_NAMES[i]: int((result['tier'] == i).sum()) for i in range(len(TIER_NAMES))}
+        profits.append(result)
+    if profits:
+        entry_ts = np.concatenate([result['entry_ts'] for result in profits])
+        profit = np.concatenate([result['profit'] for result in profits])
+        report['total'] = summarize(profit[np.argsort(entry_ts, kind='stable')], fee_pct)
+    return report
+
+
+def load_symbols(store, inst_ids, bar='1m'):
+    symbols = {}
+    for inst_id in inst_ids:
+        mark = store.read(inst_id, bar, 'mark')
+        if not len(mark['ts']):
+            continue
+        symbols[inst_id] = align(mark, store.read(inst_id, bar, 'trade'))
+    return symbols
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--inst', nargs='+', required=True)
+    parser.add_argument('--bar', default='1m')
+    parser.add_argument('--days', type=float, default=30)
+    parser.add_argument('--every', type=int, default=60, help='每隔多少根 K 线取一个入场点')
+    parser.add_argument('--horizon', type=int, default=1440, help='单笔最长持有 K 线数')
+    parser.add_argument('--fee', type=float, default=0.0, help='每笔往返手续费 %%')
+    parser.add_argument('--config', default='config.json')
+    parser.add_argument('--exchange', default='okx')
+    parser.add_argument('--cache', default=STORE_DIR)
+    parser.add_argument('--sync', action='store_true', help='先从 OKX 补齐缓存，否则完全离线')
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as f:
+        params = json.load(f)[args.exchange]
+
+    store = CandleStore(args.cache)
+    if args.sync:
+        import okx.Market_api as MarketAPI
+        store.market_api = MarketAPI.MarketAPI('', '', '', False, '0')
+        since_ms = int((time.time() - args.days * 86400) * 1000)
+        for inst_id in args.inst:
+            for kind in KINDS:
+                print(f"synced {inst_id} {kind}: {store.sync(inst_id, args.bar, kind, since_ms)} bars")
+
+    start = time.perf_counter()
+    report = run(load_symbols(store, args.inst, args.bar), params, args.every, args.horizon, args.fee)
+    elapsed = time.perf_counter() - start
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    print(f"elapsed {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
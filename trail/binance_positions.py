@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""币安 U 本位持仓的快速读取（chua_bn 使用）
+
+ccxt 的 fetch_positions 会把 positionRisk 的每一行都完整规范化成统一结构（还要查杠杆分层等），
+而机器人只用到 symbol / side / contracts / entryPrice / markPrice 和 info 里的 positionAmt、entryPrice。
+这里直接调用原始 positionRisk 接口，在任何规范化之前丢掉 positionAmt 为 0 的行，
+只给真正有仓位的行构造精简记录；info 直接引用原始行，不做拷贝。
+"""
+
+
+def compact_position(row, symbol):
+    amount = float(row['positionAmt'])
+    position_side = row.get('positionSide', 'BOTH')
+    if position_side in ('LONG', 'SHORT'):
+        side = position_side.lower()
+    else:
+        side = 'long' if amount > 0 else 'short'
+    return {
+        'symbol': symbol,
+        'side': side,
+        'contracts': abs(amount),
+        'entryPrice': float(row['entryPrice']),
+        'markPrice': float(row['markPrice']),
+        'info': row,
+    }
+
+
+class PositionRiskReader:
+    def __init__(self, exchange):
+        self.exchange = exchange
+        self.symbols = None  # 币安 id（BTCUSDT）-> ccxt 统一符号（BTC/USDT:USDT）
+
+    def _load_symbols(self, reload=False):
+        markets = self.exchange.load_markets(reload)
+        self.symbols = {market['id']: market['symbol'] for market in markets.values()
+                        if market.get('linear') and market.get('contract')}
+
+    def symbol_of(self, market_id):
+        if self.symbols is None:
+            self._load_symbols()
+        symbol = self.symbols.get(market_id)
+        if symbol is None:
+            # 新上线的合约，重新加载一次市场列表
+            self._load_symbols(reload=True)
+            symbol = self.symbols.setdefault(market_id, self.exchange.safe_symbol(market_id, None, None, 'swap'))
+        return symbol
+
+    def fetch_rows(self):
+        # v3 只返回有持仓或有挂单的交易对
+        return self.exchange.fapiPrivateV3GetPositionRisk()
+
+    def parse(self, rows):
+        return [compact_position(row, self.symbol_of(row['symbol'])) for row in rows
+                if row.get('positionAmt') and float(row['positionAmt']) != 0]
+
+    def fetch(self):
+        return self.parse(self.fetch_rows())
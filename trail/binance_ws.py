@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""币安 U 本位合约用户数据流（listenKey）
+
+每次（重）连接前用 REST 创建 listenKey，连上后先拉一次 positionRisk 全量快照，再消费 ACCOUNT_UPDATE
+里的仓位增量（只包含发生变化的仓位，数量为 0 即已平仓）。ACCOUNT_UPDATE 不带标记价格，
+这里按 开仓价 + 未实现盈亏 / 数量 反推，逐 tick 的标记价格仍由 BinanceMarkPriceFeed 提供。
+
+- listenKey 有效期 60 分钟，每 keepalive_interval 秒续期一次；
+- 收到 listenKeyExpired、续期失败、断线时都会重连，重连后重新拉快照（resync），
+  早于快照时间的增量直接丢弃，保证不会用旧数据覆盖新数据；
+- 用户数据流没有序号，无法发现中途丢失的事件，所以在线时每 resync_interval 秒也重新对齐一次快照。
+"""
+import time
+
+from trail.binance_positions import compact_position
+from trail.ws import WsThread
+
+BINANCE_FSTREAM_URL = 'wss://fstream.binance.com/ws'
+
+
+def parse_account_update(event, symbol_of):
+    """ACCOUNT_UPDATE -> 与 PositionRiskReader 相同字段的精简记录"""
+    positions = []
+    for row in event.get('a', {}).get('P', []):
+        amount = float(row['pa'])
+        entry = float(row['ep'])
+        mark = entry + float(row.get('up') or 0) / amount if amount else entry
+        raw = {'symbol': row['s'], 'positionSide': row.get('ps', 'BOTH'), 'positionAmt': row['pa'],
+               'entryPrice': row['ep'], 'markPrice': str(mark), 'marginType': row.get('mt'),
+               'updateTime': event.get('E')}
+        positions.append(compact_position(raw, symbol_of(row['s'])))
+    return positions
+
+
+class BinanceUserStream(WsThread):
+    """on_positions(positions, full_snapshot) 在推送线程中回调；快照处理完后 live 置位，断线期间清除"""
+
+    def __init__(self, exchange, reader, on_positions, logger, url=BINANCE_FSTREAM_URL, keepalive_interval=1800,
+                 resync_interval=600, on_state=None):
+        super().__init__(url, logger, ping_interval=20, on_state=on_state)
+        self.exchange = exchange
+        self.reader = reader  # PositionRiskReader，用于快照和 symbol 映射
+        self.on_positions = on_positions
+        self.keepalive_interval = keepalive_interval
+        self.resync_interval = resync_interval
+        self._last_resync = 0.0
+        self.listen_key = None
+        self._last_keepalive = 0.0
+        self._updated = {}  # (symbol, side) -> 最近一次已应用数据的时间（毫秒）
+
+    def connect_url(self):
+        self.listen_key = self.exchange.fapiPrivatePostListenKey()['listenKey']
+        self._last_keepalive = time.monotonic()
+        return f"{self.url.rstrip('/')}/{self.listen_key}"
+
+    def maintain(self):
+        """listenKey 续期和定时对齐快照；续期失败时抛出，由 WsThread 断开重连并重新换取 listenKey"""
+        now = time.monotonic()
+        if now - self._last_keepalive >= self.keepalive_interval:
+            self.exchange.fapiPrivatePutListenKey({'listenKey': self.listen_key})
+            self._last_keepalive = now
+        if now - self._last_resync >= self.resync_interval:
+            self.resync()
+
+    def ping(self):
+        # 币安由服务端发 ping 帧、websockets 自动回 pong，不需要发文本 ping
+        self.maintain()
+
+    def on_open(self):
+        self.resync()
+
+    def resync(self):
+        rows = self.reader.fetch_rows()
+        for row in rows:
+            key = (row['symbol'], row.get('positionSide', 'BOTH'))
+            self._updated[key] = max(self._updated.get(key, 0), int(row.get('updateTime') or 0))
+        self._last_resync = time.monotonic()
+        self.on_positions(self.reader.parse(rows), True)
+        self.set_live(True)
+
+    def on_message(self, message):
+        self.maintain()
+        event = message.get('e')
+        if event == 'listenKeyExpired':
+            raise RuntimeError("listenKey 已过期")
+        if event != 'ACCOUNT_UPDATE':
+            return
+        event_time = int(message.get('E') or 0)
+        rows = []
+        for row in message.get('a', {}).get('P', []):
+            key = (row['s'], row.get('ps', 'BOTH'))
+            if event_time <= self._updated.get(key, 0):
+                continue  # 早于快照或已应用的数据
+            self._updated[key] = event_time
+            rows.append(row)
+        if rows:
+            update = dict(message, a=dict(message['a'], P=rows))
+            self.on_positions(parse_account_update(update, self.reader.symbol_of), False)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""Bitget v2 私有 positions 频道（USDT-FUTURES，双向持仓）
+
+每次（重）连接都用新的时间戳重新签名登录，登录成功后订阅 positions 频道。
+推送按 (symbol, holdSide) 维护一张持仓表，每次推送应用后把整张表交给调用方：
+- action=snapshot：推送的是当前全部持仓，整表替换，表里有而快照里没有的即为已平仓；
+- action=update：只包含变化的仓位，total 为 0 即已平仓，uTime 比表里旧的行直接丢弃（同一毫秒内的多次更新以后到的为准）。
+断线期间 live 清除，由调用方回退到 REST 轮询；重连后的首个快照重新对齐整张表。
+"""
+import base64
+import hmac
+import threading
+import time
+
+from trail.ws import WsThread
+
+BITGET_WS_PRIVATE_URL = 'wss://ws.bitget.com/v2/ws/private'
+
+
+def login_args(api_key, secret, passphrase):
+    timestamp = str(int(time.time()))
+    digest = hmac.new(secret.encode('utf-8'), f"{timestamp}GET/user/verify".encode('utf-8'), 'sha256').digest()
+    return {"apiKey": api_key, "passphrase": passphrase, "timestamp": timestamp,
+            "sign": base64.b64encode(digest).decode('utf-8')}
+
+
+def inst_id_to_symbol(inst_id):
+    """BTCUSDT -> BTC/USDT:USDT，与 ccxt 的 symbol 保持一致"""
+    base = inst_id[:-4] if inst_id.endswith('USDT') else inst_id
+    return f"{base}/USDT:USDT"
+
+
+def parse_position(row):
+    """把 positions 频道的原始数据转换成与 ccxt fetch_positions 相同字段的字典"""
+    total = float(row.get('total') or 0)
+    side = row.get('holdSide', 'long')
+    entry = float(row.get('openPriceAvg') or 0)
+    mark = float(row.get('markPrice') or 0)
+    if not mark and total and entry:
+        # 没有 markPrice 字段时按未实现盈亏反推
+        pnl = float(row.get('unrealizedPL') or 0) / total
+        mark = entry + pnl if side == 'long' else entry - pnl
+    return {
+        'symbol': inst_id_to_symbol(row['instId']),
+        'contracts': total,
+        'entryPrice': entry,
+        'markPrice': mark,
+        'side': side,
+        'marginMode': 'cross' if row.get('marginMode') == 'crossed' else row.get('marginMode'),
+        'info': row,
+    }
+
+
+class BitgetPositionStream(WsThread):
+    """on_positions(positions) 在推送线程中回调，positions 为当前全部持仓；首个快照到达后 live 置位"""
+
+    def __init__(self, api_key, secret, passphrase, on_positions, logger, url=BITGET_WS_PRIVATE_URL,
+                 inst_type='USDT-FUTURES', on_state=None):
+        # Bitget 要求 30s 内至少发送一次 ping
+        super().__init__(url, logger, ping_interval=25, on_state=on_state)
+        self.api_key = api_key
+        self.secret = secret
+        self.passphrase = passphrase
+        self.inst_type = inst_type
+        self.on_positions = on_positions
+        self.table = {}  # (symbol, holdSide) -> position
+        self.table_lock = threading.Lock()
+
+    def on_open(self):
+        # 登录签名带时间戳，每次重连都重新生成
+        self.send_json({"op": "login", "args": [login_args(self.api_key, self.secret, self.passphrase)]})
+
+    def positions(self):
+        with self.table_lock:
+            return list(self.table.values())
+
+    def forget(self, symbol, side):
+        """平仓请求成功后先从表里移除，避免在平仓推送到达前被下一次推送重复平仓"""
+        with self.table_lock:
+            self.table.pop((symbol, side), None)
+
+    def on_message(self, message):
+        event = message.get('event')
+        if event == 'login':
+            if str(message.get('code')) != '0':
+                raise RuntimeError(f"WebSocket 登录失败: {message}")
+            self.send_json({"op": "subscribe",
+                            "args": [{"instType": self.inst_type, "channel": "positions", "instId": "default"}]})
+            return
+        if event == 'error':
+            raise RuntimeError(f"WebSocket 错误: {message}")
+        if event is not None or message.get('arg', {}).get('channel') != 'positions':
+            return
+
+        positions = [parse_position(row) for row in message.get('data') or []]
+        with self.table_lock:
+            if message.get('action') == 'snapshot':
+                self.table = {(p['symbol'], p['side']): p for p in positions if p['contracts'] != 0}
+            else:
+                for p in positions:
+                    key = (p['symbol'], p['side'])
+                    current = self.table.get(key)
+                    if current and int(current['info'].get('uTime') or 0) > int(p['info'].get('uTime') or 0):
+                        continue  # 乱序到达的旧数据；uTime 相同的按到达顺序覆盖
+                    if p['contracts'] != 0:
+                        self.table[key] = p
+                    else:
+                        self.table.pop(key, None)
+            table = list(self.table.values())
+        self.on_positions(table)
+        if message.get('action') == 'snapshot':
+            self.set_live(True)
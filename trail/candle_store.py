@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""本地 K 线存储
+
+按 kind/instId/bar 分目录，每一列一个定宽二进制文件（ts 为 int64，其余为 float64），
+meta.json 记录行数。读取时直接 np.memmap 成只读视图，不做任何拷贝；追加新 K 线只在文件末尾写入，
+已经打开的视图不受影响。
+
+同步分两段：
+- 尾部：只请求最后一根已存 K 线之后缺失的部分；
+- 回补：比最早一根更早、直到 since_ms 的部分按 100 根一页切好区间，用线程池并行拉取，
+  限速交给 market_api 自带的 okx.ratelimit（按接口分桶，与其他 API 客户端共用同一份预算）。
+
+未收盘（confirm=0）的 K 线不会落盘。
+
+    python -m trail.candle_store --inst BTC-USDT-SWAP ETH-USDT-SWAP --bar 1m --days 365
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+STORE_DIR = os.path.join('data', 'candles')
+COLUMNS = (('ts', np.int64), ('open', np.float64), ('high', np.float64), ('low', np.float64),
+           ('close', np.float64), ('vol', np.float64))
+KINDS = ('mark', 'trade')
+BAR_MS = {'1m': 60000, '3m': 180000, '5m': 300000, '15m': 900000, '30m': 1800000,
+          '1H': 3600000, '2H': 7200000, '4H': 14400000, '1D': 86400000}
+PAGE_LIMIT = 100
+# /market/candles 与 /market/mark-price-candles 只覆盖最近 1440 根
+RECENT_BARS = 1440
+
+
+def parse_rows(rows):
+    """OKX K 线（新到旧的字符串数组）-> 按时间升序的列 dict，丢弃未收盘的 K 线"""
+    rows = [row for row in rows if row[-1] != '0']
+    rows.reverse()
+    columns = {}
+    for index, (name, dtype) in enumerate(COLUMNS):
+        if name == 'vol':
+            columns[name] = np.array([row[5] if len(row) > 6 else 0 for row in rows], dtype=dtype)
+        else:
+            columns[name] = np.array([row[index] for row in rows], dtype=np.float64).astype(dtype)
+    return columns
+
+
+def empty_columns():
+    return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS}
+
+
+def concat_columns(parts):
+    """合并多段列数据，按 ts 排序去重"""
+    parts = [part for part in parts if len(part['ts'])]
+    if not parts:
+        return empty_columns()
+    merged = {name: np.concatenate([part[name] for part in parts]) for name, _ in COLUMNS}
+    _, index = np.unique(merged['ts'], return_index=True)
+    return {name: column[index] for name, column in merged.items()}
+
+
+class CandleStore:
+    def __init__(self, root=STORE_DIR, market_api=None, workers=8, logger=None):
+        self.root = root
+        self.market_api = market_api
+        self.workers = workers
+        self.logger = logger
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def directory(self, inst_id, bar, kind):
+        return os.path.join(self.root, kind, inst_id, bar)
+
+    def _lock(self, key):
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def count(self, inst_id, bar='1m', kind='mark'):
+        path = os.path.join(self.directory(inst_id, bar, kind), 'meta.json')
+        if not os.path.exists(path):
+            return 0
+        with open(path, 'r') as f:
+            return json.load(f)['count']
+
+    def read(self, inst_id, bar='1m', kind='mark'):
+        """返回 {列名: 只读 memmap}，不存在时返回空数组"""
+        return self.read_directory(self.directory(inst_id, bar, kind), self.count(inst_id, bar, kind))
+
+    def _write_meta(self, directory, count):
+        tmp = os.path.join(directory, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'count': int(count), 'columns': [name for name, _ in COLUMNS]}, f)
+        os.replace(tmp, os.path.join(directory, 'meta.json'))
+
+    def _append(self, directory, count, columns):
+        # 先写数据再更新 meta，读者看到的行数永远不会超过已写入的数据
+        for name, dtype in COLUMNS:
+            with open(os.path.join(directory, f"{name}.bin"), 'r+b' if count else 'wb') as f:
+                f.seek(count * np.dtype(dtype).itemsize)
+                f.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+                f.truncate()
+        self._write_meta(directory, count + len(columns['ts']))
+
+    def _prepend(self, directory, count, columns):
+        """回补的更早数据需要整体重写，写到临时文件后原子替换，旧的 memmap 仍指向原文件"""
+        current = self.read_directory(directory, count)
+        for name, dtype in COLUMNS:
+            path = os.path.join(directory, f"{name}.bin")
+            with open(path + '.tmp', 'wb') as f:
+                f.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+                f.write(np.ascontiguousarray(current[name]).tobytes())
+            os.replace(path + '.tmp', path)
+        self._write_meta(directory, count + len(columns['ts']))
+
+    def read_directory(self, directory, count):
+        if not count:
+            return empty_columns()
+        return {name: np.memmap(os.path.join(directory, f"{name}.bin"), dtype=dtype, mode='r', shape=(count,))
+                for name, dtype in COLUMNS}
+
+    def write(self, inst_id, bar, kind, columns):
+        """写入一批 K 线：比已存最新更新的追加，比已存最早更早的前插，中间已有的部分忽略"""
+        directory = self.directory(inst_id, bar, kind)
+        with self._lock((inst_id, bar, kind)):
+            os.makedirs(directory, exist_ok=True)
+            count = self.count(inst_id, bar, kind)
+            stored = self.read_directory(directory, count)
+            ts = columns['ts']
+            if count:
+                newer = ts > stored['ts'][-1]
+                older = ts < stored['ts'][0]
+            else:
+                newer = np.ones(len(ts), dtype=bool)
+                older = np.zeros(len(ts), dtype=bool)
+            if older.any():
+                self._prepend(directory, count, {name: column[older] for name, column in columns.items()})
+                count += int(older.sum())
+            if newer.any():
+                self._append(directory, count, {name: column[newer] for name, column in columns.items()})
+                count += int(newer.sum())
+            return count
+
+    def fetch_page(self, inst_id, bar, kind, after, recent):
+        api = self.market_api
+        if kind == 'mark':
+            method = api.get_markprice_candlesticks if recent else api.get_history_markprice_candlesticks
+        else:
+            method = api.get_candlesticks if recent else api.get_history_candlesticks
+        result = method(instId=inst_id, after=str(after) if after else '', bar=bar, limit=PAGE_LIMIT)
+        if result.get('code') != '0':
+            raise RuntimeError(f"获取 {inst_id} {kind} {bar} K 线失败: {result}")
+        return parse_rows(result.get('data', []))
+
+    def fetch_range(self, inst_id, bar, kind, start_ms, end_ms):
+        """并行拉取 [start_ms, end_ms) 之间的 K 线，按 100 根一页切分区间"""
+        bar_ms = BAR_MS[bar]
+        page_ms = PAGE_LIMIT * bar_ms
+        recent_from = int(time.time() * 1000) - RECENT_BARS * bar_ms
+        afters = list(range(int(end_ms), int(start_ms), -page_ms))
+
+        def fetch(after):
+            return self.fetch_page(inst_id, bar, kind, after, recent=after - page_ms >= recent_from)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pages = list(pool.map(fetch, afters))
+        columns = concat_columns(pages)
+        keep = (columns['ts'] >= start_ms) & (columns['ts'] < end_ms)
+        return {name: column[keep] for name, column in columns.items()}
+
+    def sync(self, inst_id, bar='1m', kind='mark', since_ms=None):
+        """补齐尾部并回补到 since_ms，返回同步后的行数"""
+        bar_ms = BAR_MS[bar]
+        now_ms = int(time.time() * 1000)
+        count = self.count(inst_id, bar, kind)
+        if count:
+            stored = self.read(inst_id, bar, kind)
+            first_ts, last_ts = int(stored['ts'][0]), int(stored['ts'][-1])
+            tail = self.fetch_range(inst_id, bar, kind, last_ts + bar_ms, now_ms + bar_ms)
+            count = self.write(inst_id, bar, kind, tail)
+        else:
+            if since_ms is None:
+                since_ms = now_ms - RECENT_BARS * bar_ms
+            first_ts = now_ms + bar_ms
+        if since_ms is not None and since_ms < first_ts:
+            backfill = self.fetch_range(inst_id, bar, kind, since_ms, first_ts)
+            count = self.write(inst_id, bar, kind, backfill)
+        if self.logger:
+            self.logger.info(f"{inst_id} {kind} {bar} 已存储 {count} 根 K 线")
+        return count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--inst', nargs='+', required=True)
+    parser.add_argument('--bar', default='1m')
+    parser.add_argument('--days', type=float, default=30)
+    parser.add_argument('--kind', nargs='+', default=list(KINDS), choices=KINDS)
+    parser.add_argument('--root', default=STORE_DIR)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    import okx.Market_api as MarketAPI
+    store = CandleStore(args.root, MarketAPI.MarketAPI('', '', '', False, '0'), workers=args.workers)
+    since_ms = int((time.time() - args.days * 86400) * 1000)
+    for inst_id in args.inst:
+        for kind in args.kind:
+            start = time.perf_counter()
+            count = store.sync(inst_id, args.bar, kind, since_ms)
+            print(f"{inst_id} {kind} {args.bar}: {count} bars ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,574 @@
+# -*- coding: utf-8 -*-
+"""分档移动止盈核心
+
+chua_ok.py / chua_bn.py / chua_bitget.py / chua_ok_bot.py 原来各自复制了一份 MultiAssetTradingBot，
+拉取、解析、平仓和分档判断都各写一遍（detected_positions 有的是 set 有的是 dict，加仓判断也不一致）。
+现在分档判断、快照差分、标记价格推送、状态持久化都在 TrailingBot 里，交易所差异收进 ExchangeAdapter：
+
+- snapshot()：拉一次持仓，返回 (持仓列表, 是否完整)，失败时抛异常；
+- close(position)：平掉一个仓位，请求被接受返回 True；只是提交了异步请求、交易所还没回复时返回 CLOSE_PENDING，
+  结果由 on_close_result(position, ok) 回报，确认之前 TrailingBot 保留该仓位的追踪状态；
+- stream(on_positions, on_state) / mark_feed(on_mark_price)：推送线程，未开启时返回 None；
+- sync_stop / forget / retain / flush：交易所常驻止损等可选钩子，默认不做任何事。
+
+持仓记录统一为 ccxt 风格的 dict：symbol、side（long/short）、contracts、entryPrice、markPrice、marginMode。
+追踪状态按 trail.diff.position_key 即 (symbol, side, marginMode) 区分仓位，双向持仓下同一品种的多空两边互不影响；
+黑名单和标记价格订阅仍按品种。
+"""
+import threading
+import time
+from itertools import repeat
+from operator import itemgetter
+
+import numpy as np
+
+from trail.diff import SnapshotDiffer, CLOSE, REDUCE, FLIP, position_key
+from trail.logsetup import CycleLog
+from trail.notify import FeishuNotifier
+from trail.state_store import StateStore, reconcile
+from trail.trigger_book import TriggerBook
+from trail.vector_engine import VectorEngine
+
+_SYMBOL = itemgetter('symbol')
+_SIDE = itemgetter('side')
+_CONTRACTS = itemgetter('contracts')
+_ENTRY = itemgetter('entryPrice')
+_MARK = itemgetter('markPrice')
+_SIDES = frozenset(('long', 'short'))
+
+CLOSE_PENDING = 'pending'
+
+
+class ExchangeAdapter:
+    """交易所适配层，TrailingBot 只通过这些方法访问交易所"""
+    name = None  # 状态文件名：{state_dir}/{name}.sqlite
+    notifier = None
+    on_close_result = None  # 由 TrailingBot 设置，close 返回 CLOSE_PENDING 的适配器平仓有结果后调用
+    reset_on_add = True  # 加仓时重置最高盈利和档位；为 False 时只更新记录的仓位数量，照常判断
+
+    def __init__(self, config, logger):
+        self.config = config
+        self.logger = logger
+
+    def prepare(self):
+        """机器人初始化完成后调用一次（此时已可发通知），用于检查持仓模式、清理遗留挂单等"""
+
+    def snapshot(self):
+        raise NotImplementedError
+
+    def close(self, position):
+        raise NotImplementedError
+
+    def stream(self, on_positions, on_state):
+        """私有持仓推送线程，on_positions(positions, full_snapshot)；未开启时返回 None"""
+        return None
+
+    def mark_feed(self, on_mark_price):
+        """公共标记价格推送线程，on_mark_price(symbol, mark_price)；未开启时返回 None"""
+        return None
+
+    def sync_stop(self, position, trigger):
+        """仓位的止损线变化时调用"""
+
+    def forget(self, key):
+        """仓位已由机器人平掉，key 为 position_key"""
+
+    def retain(self, keys):
+        """每次处理完快照后调用，keys 为仍在监控的仓位的 position_key"""
+
+    def flush(self):
+        """主循环每轮调用一次"""
+
+    def notify(self, message, key=None):
+        """key 用于反复出现的报错去重，交易通知不要带 key"""
+        if self.notifier:
+            self.notifier.notify(message, key=key)
+
+
+class TrailingBot:
+    def __init__(self, adapter, config, logger, feishu_webhook=None, monitor_interval=4, notifier=None,
+                 state_store=None):
+        self.leverage = float(config["leverage"])
+        self.stop_loss_pct = config["stop_loss_pct"]
+        self.low_trail_stop_loss_pct = config["low_trail_stop_loss_pct"]
+        self.trail_stop_loss_pct = config["trail_stop_loss_pct"]
+        self.higher_trail_stop_loss_pct = config["higher_trail_stop_loss_pct"]
+        self.low_trail_profit_threshold = config["low_trail_profit_threshold"]
+        self.first_trail_profit_threshold = config["first_trail_profit_threshold"]
+        self.second_trail_profit_threshold = config["second_trail_profit_threshold"]
+        self.feishu_webhook = feishu_webhook
+        self.blacklist = set(config.get("blacklist", []))
+        self.monitor_interval = monitor_interval  # 从配置文件读取的监控循环时间
+
+        self.adapter = adapter
+        self.logger = logger
+        # 飞书通知由后台线程合并、去重后发送；多账户时由调用方传入共用的 notifier
+        if notifier is None and feishu_webhook:
+            notifier = FeishuNotifier(feishu_webhook, logger)
+        self.notifier = notifier
+        # 每个仓位只在数量/档位/最高盈利变化时记日志，每轮结束记一行汇总
+        self.cycle_log = CycleLog(logger)
+        # 追踪状态（最高盈利、档位）持久化，重启后按首个持仓快照对齐恢复；state_dir 为空时关闭
+        # 多账户时由调用方传入共用 StateStore 里本账户的视图
+        self.restored_state = {}
+        if state_store is None and config.get("state_dir", "state"):
+            state_store = StateStore(f"{config.get('state_dir', 'state')}/{adapter.name}.sqlite", logger=logger)
+        self.state_store = state_store
+        if state_store is not None:
+            self.restored_state = state_store.load()
+
+        # 用于记录每个持仓的最高盈利值、当前档位和已检测到的仓位数量
+        self.highest_profits = {}
+        self.current_tiers = {}
+        self.detected_positions = {}
+        # 最近一次持仓快照，标记价格推送到达时只替换越过止损价或创新高的仓位的 markPrice 重新计算
+        self.positions_cache = {}
+        # 相邻两次持仓快照的差分，只对新开、加减仓、价格变化的仓位重新判断
+        self.position_diff = SnapshotDiffer()
+        # 每个持仓的绝对止损价/峰值价索引，tick 只在越过止损价或创新高时才走完整的档位判断
+        self.trigger_book = TriggerBook.from_config(config)
+        # 一轮需要判断的仓位较多时用列式引擎一次算完，仓位少时逐个判断更快
+        self.vector_engine = VectorEngine.from_config(config) if config.get("vector_engine", True) else None
+        self.vector_min_batch = config.get("vector_min_batch", 64)
+        # 每个仓位最近一次 evaluate_position 时的数量和最高盈利，两者都没变的仓位档位和日志状态也不会变
+        self.evaluated_amounts = {}
+        self.evaluated_highest = {}
+        # 已提交、等待交易所确认的平仓请求：key -> 仓位
+        self.pending_closes = {}
+        # 推送线程和主循环都会修改上面的状态，统一加锁
+        self.state_lock = threading.RLock()
+
+        adapter.notifier = self.notifier
+        adapter.on_close_result = self.on_close_result
+        adapter.prepare()
+
+        # 私有持仓推送模式，断线时回退到 REST 轮询
+        self.position_stream = adapter.stream(self.on_position_push, self.on_stream_state)
+        # 公共标记价格推送模式：逐 tick 计算止盈；REST 仍按 monitor_interval 轮询以发现新开和加减仓的仓位，
+        # 只有标记价格变化的仓位每 position_refresh_interval 才完整重新判断一次
+        self.position_refresh_interval = config.get("position_refresh_interval", monitor_interval * 10)
+        self.next_full_evaluation = 0
+        self.mark_feed = adapter.mark_feed(self.on_mark_price)
+
+    def send_feishu_notification(self, message, key=None):
+        if self.notifier:
+            self.notifier.notify(message, key=key)
+
+    def on_position_push(self, positions, full_snapshot):
+        try:
+            # 推送的全量快照就是交易所当前的持仓表，为空即已全部平仓，不需要再次确认
+            self.process_positions(positions, full_snapshot, confirmed=True)
+        except Exception as e:
+            self.logger.error(f"处理持仓推送时出现异常: {e}")
+
+    def on_stream_state(self, live):
+        if live:
+            self.logger.info("持仓推送已就绪，暂停 REST 轮询")
+        else:
+            self.logger.warning("持仓推送断开，回退到 REST 轮询")
+
+    def on_mark_price(self, symbol, mark_price):
+        with self.state_lock:
+            # 未越过止损价也未创新高的仓位档位和止损线都不变，不做任何计算
+            for key in dict.fromkeys(self.trigger_book.on_price(symbol, mark_price)):
+                position = self.positions_cache.get(key)
+                if position is None:
+                    continue
+                position = dict(position, markPrice=mark_price)
+                self.positions_cache[key] = position
+                try:
+                    if self.evaluate_position(position):
+                        # 已尝试平仓，等下一次持仓刷新确认结果，避免失败时逐 tick 重复下单
+                        self.positions_cache.pop(key, None)
+                        self.trigger_book.remove(key)
+                    else:
+                        self.index_position(position)
+                        self.save_state([position])
+                except Exception as e:
+                    self.logger.error(f"处理 {symbol} 标记价格推送时出现异常: {e}")
+
+    def index_position(self, position):
+        symbol = position['symbol']
+        key = position_key(position)
+        entry_price = float(position['entryPrice'])
+        highest_profit = self.highest_profits.get(key, 0)
+        trigger = self.trigger_book.get(key)
+        if trigger is not None and trigger.entry_price == entry_price and trigger.highest_profit == highest_profit:
+            return  # 开仓价和最高盈利都没变，止损线不变
+        trigger = self.trigger_book.upsert(key, symbol, position['side'], entry_price, highest_profit)
+        if trigger is not None:
+            try:
+                self.adapter.sync_stop(position, trigger)
+            except Exception as e:
+                self.logger.error(f"同步 {symbol} 止损条件单时出现异常: {e}")
+
+    def restore_state(self, positions):
+        kept, dropped = reconcile(self.restored_state, positions)
+        self.restored_state = {}
+        for key, state in kept.items():
+            self.detected_positions[key] = state.amount
+            self.highest_profits[key] = state.highest_profit
+            self.current_tiers[key] = state.tier
+        for key in dropped:
+            self.state_store.remove(key)
+        self.logger.info(f"恢复 {len(kept)} 个仓位的追踪状态，丢弃 {len(dropped)} 条已失效的记录")
+
+    def save_state(self, positions, full=False):
+        """记录仓位的最新追踪状态（未变化的不会写入）；full 为 True 时 positions 是全部持仓，其余记录删除
+
+        重启后还没用完整快照恢复（restore_state）之前什么都不写：空快照或不完整快照会把尚未对齐的记录删掉，
+        首次检测的仓位也会用清零的最高盈利覆盖保存的记录。
+        """
+        if self.state_store is None or self.restored_state:
+            return
+        keys = []
+        for position in positions:
+            key = position_key(position)
+            keys.append(key)
+            if key in self.highest_profits:
+                self.state_store.record(key, float(position['entryPrice']), abs(float(position['contracts'])),
+                                        self.highest_profits[key], self.current_tiers.get(key, "无"))
+        if full:
+            # 等待确认的平仓请求失败时仍要按保存的状态继续判断
+            self.state_store.retain(keys + list(self.pending_closes))
+
+    def skip_price_only(self, positions):
+        """标记价格推送在线时，把只有标记价格变化的仓位从本轮判断中去掉（价格由 on_mark_price 逐 tick 处理）
+
+        新开、加减仓、开仓价变化或不在 positions_cache 里（例如平仓请求刚失败）的仓位照常判断；
+        每 position_refresh_interval 完整判断一次全部变化的仓位。
+        """
+        if not (self.mark_feed and self.mark_feed.live.is_set()):
+            return positions
+        now = time.monotonic()
+        if now >= self.next_full_evaluation:
+            self.next_full_evaluation = now + self.position_refresh_interval
+            return positions
+        cache = self.positions_cache
+        evaluate = []
+        for position in positions:
+            cached = cache.get(position_key(position))
+            if (cached is None or cached['contracts'] != position['contracts']
+                    or cached['entryPrice'] != position['entryPrice']):
+                evaluate.append(position)
+        return evaluate
+
+    def schedule_task(self):
+        self.logger.info("启动主循环，开始执行任务调度...")
+        if self.position_stream:
+            self.position_stream.start()
+        if self.mark_feed:
+            self.mark_feed.start()
+        try:
+            while True:
+                with self.state_lock:
+                    self.adapter.flush()
+                if self.position_stream and self.position_stream.live.is_set():
+                    # 推送模式下由推送线程驱动，这里只等待断线
+                    time.sleep(self.monitor_interval)
+                    continue
+                self.monitor_positions()
+                time.sleep(self.monitor_interval)
+        except KeyboardInterrupt:
+            self.logger.info("程序收到中断信号，开始退出...")
+        except Exception as e:
+            error_message = f"程序异常退出: {str(e)}"
+            self.logger.error(error_message)
+            self.send_feishu_notification(error_message, key="fatal")
+
+    def fetch_positions(self):
+        """返回 (持仓列表, 是否完整)；拉取失败时为 (None, False)"""
+        try:
+            return self.adapter.snapshot()
+        except Exception as e:
+            self.logger.error(f"Error fetching positions: {e}")
+            return None, False
+
+    def close_position(self, position):
+        symbol = position['symbol']
+        side = position['side']
+        key = position_key(position)
+        amount = abs(float(position['contracts']))
+        # 无论成败，下一次快照都重新判断该仓位
+        self.position_diff.invalidate(key)
+        try:
+            result = self.adapter.close(position)
+        except Exception as e:
+            self.logger.error(f"Error closing position for {symbol}: {e}")
+            return False
+        if not result:
+            return False
+        if result == CLOSE_PENDING:
+            # 交易所还没回复，保留最高盈利和档位；请求失败时下一次快照按原状态重新判断
+            if key not in self.pending_closes:
+                self.logger.info(f"{symbol} 平仓请求已提交，等待交易所确认")
+            self.pending_closes[key] = position
+            return True
+        self.finish_close(position)
+        return True
+
+    def on_close_result(self, position, ok):
+        """CLOSE_PENDING 的平仓请求有了结果；快照里仓位已经消失时已经收尾，这里不再重复"""
+        with self.state_lock:
+            if self.pending_closes.pop(position_key(position), None) is not None and ok:
+                self.finish_close(position)
+
+    def finish_close(self, position):
+        """平仓已确认：通知并丢弃该仓位的追踪状态"""
+        symbol = position['symbol']
+        side = position['side']
+        key = position_key(position)
+        amount = abs(float(position['contracts']))
+        self.logger.info(f"Closed position for {symbol} with size {amount}, side: {side}")
+        self.send_feishu_notification(f"Closed position for {symbol} with size {amount}, side: {side}")
+        self.cycle_log.closed(key)
+        self.forget_position(key)
+        self.positions_cache.pop(key, None)
+        self.trigger_book.remove(key)
+        self.adapter.forget(key)
+        return True
+
+    def forget_position(self, key):
+        """丢弃一个仓位的追踪状态，再次出现时按首次检测处理"""
+        self.evaluated_amounts.pop(key, None)
+        self.evaluated_highest.pop(key, None)
+        self.detected_positions.pop(key, None)
+        self.highest_profits.pop(key, None)
+        self.current_tiers.pop(key, None)
+
+    def monitor_positions(self):
+        positions, complete = self.fetch_positions()
+        if positions is None:
+            return  # 拉取失败不当作空仓处理，等下一轮
+        # 不完整的快照（例如部分信号策略拉取失败）按增量处理，缺失的仓位不当作已平仓
+        self.process_positions(positions, complete)
+
+    def process_positions(self, positions, full_snapshot=True, confirmed=False):
+        """confirmed 为 True 表示快照来自推送（交易所的持仓表本身），空快照直接按全部平仓处理"""
+        with self.state_lock:
+            self.cycle_log.begin()
+            try:
+                self._process_positions(positions, full_snapshot, confirmed)
+            finally:
+                self.cycle_log.end()
+
+    def _process_positions(self, positions, full_snapshot, confirmed):
+        if self.restored_state and full_snapshot and positions:
+            # 重启后的首个非空全量快照，恢复仍然有效的追踪状态
+            self.restore_state(positions)
+        diff = self.position_diff.apply(positions, full_snapshot, confirmed)
+        if diff is None:
+            self.logger.warning("持仓快照为空，等待再次确认后再按全部平仓处理")
+            return
+        self.handle_position_events(diff.events)
+
+        changed = diff.changed
+        if full_snapshot:
+            changed = self.skip_price_only(changed)
+        if self.vector_engine is not None and len(changed) >= self.vector_min_batch:
+            quiet, changed = self.evaluate_batch(changed)
+            for position in quiet:
+                self.positions_cache[position_key(position)] = position
+                self.index_position(position)
+        for position in changed:
+            key = position_key(position)
+            if position['symbol'] not in self.blacklist:
+                self.positions_cache[key] = position
+            if self.evaluate_position(position):
+                self.positions_cache.pop(key, None)
+                self.trigger_book.remove(key)
+            elif key in self.positions_cache:
+                self.index_position(position)
+
+        self.adapter.retain(self.positions_cache.keys())
+        if self.mark_feed:
+            self.mark_feed.set_symbols({symbol for symbol, _, _ in self.positions_cache})
+        # 只有确认过的全量快照才能删除其余记录，增量推送或部分拉取失败时 positions_cache 不代表全部持仓
+        self.save_state(self.positions_cache.values(), full=full_snapshot)
+
+    def handle_position_events(self, events):
+        for event in events:
+            symbol = event.symbol
+            if event.kind in (CLOSE, FLIP) and self.pending_closes.pop(position_key(event.previous), None):
+                # 等待确认的平仓请求已经生效
+                self.finish_close(event.previous)
+                if event.kind == CLOSE:
+                    continue
+            if event.kind == CLOSE:
+                key = position_key(event.previous)
+                if key in self.detected_positions:
+                    self.logger.info(f"手动平仓检测：{symbol} 已平仓，从监控中移除")
+                    self.send_feishu_notification(f"手动平仓检测：{symbol} 已平仓，从监控中移除")
+                self.forget_position(key)
+                self.cycle_log.forget(key)
+                self.positions_cache.pop(key, None)
+                self.trigger_book.remove(key)
+            elif event.kind == REDUCE:
+                key = position_key(event.position)
+                if key in self.detected_positions:
+                    self.logger.info(f"{symbol} 减仓：{event.previous['contracts']} -> {event.position['contracts']}")
+                    self.detected_positions[key] = abs(float(event.position['contracts']))
+            elif event.kind == FLIP:
+                # 反手后按新仓位重新记录最高盈利和档位
+                self.logger.info(f"{symbol} 反手：{event.previous['side']} -> {event.position['side']}，重新开始监控")
+                self.send_feishu_notification(f"{symbol} 反手为{event.position['side']}，重新开始监控")
+                key = position_key(event.previous)
+                self.forget_position(key)
+                self.cycle_log.forget(key)
+                self.positions_cache.pop(key, None)
+                self.trigger_book.remove(key)
+
+    def evaluate_batch(self, positions):
+        """用 VectorEngine 一次判断已跟踪的仓位，返回 (无需再处理的仓位, 仍需 evaluate_position 的仓位)
+
+        只有数量和最高盈利都与上一次 evaluate_position 看到的相同、且不需要平仓的仓位留在这里：
+        它们的档位、日志状态都不会变，不写入任何状态。首次检测、加仓、黑名单、需要平仓或最高盈利变化的仓位
+        原样交给 evaluate_position，结果与逐个判断完全相同。取字段和查字典都用 map 在 C 层完成。
+        """
+        count = len(positions)
+        keys = list(map(position_key, positions))
+        sides = list(map(_SIDE, positions))
+        amounts = np.abs(np.array(list(map(_CONTRACTS, positions)), dtype=np.float64))
+        detected = np.fromiter(map(self.detected_positions.get, keys, repeat(-1.0)), np.float64, count)
+        eligible = (detected > 0) & (amounts > 0) & (amounts <= detected)
+        if not _SIDES.issuperset(sides):
+            eligible &= np.fromiter(map(_SIDES.__contains__, sides), np.bool_, count)
+        if self.blacklist:
+            eligible &= ~np.fromiter(map(self.blacklist.__contains__, map(_SYMBOL, positions)), np.bool_, count)
+        rows = np.flatnonzero(eligible)
+        if not len(rows):
+            return [], positions
+
+        n = len(rows)
+        if n == count:
+            tracked = positions
+            tracked_keys, tracked_sides = keys, sides
+        else:
+            row_list = rows.tolist()
+            tracked = [positions[row] for row in row_list]
+            tracked_keys = [keys[row] for row in row_list]
+            tracked_sides = [sides[row] for row in row_list]
+        engine = self.vector_engine
+        engine.load(tracked_keys, tracked_sides, np.array(list(map(_ENTRY, tracked)), dtype=np.float64), amounts[rows],
+                    np.array(list(map(_MARK, tracked)), dtype=np.float64),
+                    np.fromiter(map(self.highest_profits.get, tracked_keys, repeat(0.0)), np.float64, n))
+        closing = engine.evaluate()
+        same = ((np.fromiter(map(self.evaluated_amounts.get, tracked_keys, repeat(np.nan)), np.float64, n)
+                 == amounts[rows])
+                & (np.fromiter(map(self.evaluated_highest.get, tracked_keys, repeat(np.nan)), np.float64, n)
+                   == engine.highest[:n]))
+        quiet_rows = same & ~closing
+        if not quiet_rows.any():
+            return [], positions
+        quiet_profit = engine.profit[quiet_rows]
+        self.cycle_log.unchanged(int(quiet_rows.sum()), float(quiet_profit.min()), float(quiet_profit.max()))
+        eligible[rows[~quiet_rows]] = False
+        # 其余仓位保持原有顺序，平仓顺序与逐个判断一致
+        return ([positions[row] for row in np.flatnonzero(eligible).tolist()],
+                [positions[row] for row in np.flatnonzero(~eligible).tolist()])
+
+    def evaluate_position(self, position):
+        """对单个仓位执行分档止盈/止损判断，触发平仓时返回 True"""
+        symbol = position['symbol']
+        key = position_key(position)
+        position_amt = abs(float(position['contracts']))
+        entry_price = float(position['entryPrice'])
+        current_price = float(position['markPrice'])
+        side = position['side']
+
+        if position_amt == 0:
+            return False
+
+        if symbol in self.blacklist:
+            if key not in self.detected_positions:
+                self.send_feishu_notification(f"检测到黑名单品种：{symbol}，跳过监控")
+                self.detected_positions[key] = position_amt
+            return False
+
+        # 首次检测仓位
+        if key not in self.detected_positions:
+            self.detected_positions[key] = position_amt  # 存储仓位数量
+            self.highest_profits[key] = 0
+            self.current_tiers[key] = "无"
+            self.logger.info(
+                f"首次检测到仓位：{symbol}, 仓位数量: {position_amt}, 开仓价格: {entry_price}, 方向: {side}")
+            self.send_feishu_notification(
+                f"首次检测到仓位：{symbol}, 仓位数量: {position_amt}, 开仓价格: {entry_price}, 方向: {side}")
+
+        # 检测是否有加仓
+        elif position_amt > self.detected_positions[key] and not self.adapter.reset_on_add:
+            self.detected_positions[key] = position_amt
+            self.logger.info(f"{symbol} 检测到加仓，保留最高盈利和档位。")
+        elif position_amt > self.detected_positions[key]:
+            self.highest_profits[key] = 0  # 重置最高盈利
+            self.current_tiers[key] = "无"  # 重置档位
+            self.detected_positions[key] = position_amt  # 更新持仓数量
+            self.logger.info(f"{symbol} 检测到加仓，重置最高盈利和档位。")
+            return False  # 加仓后本轮不做止盈判断，下一次再评估
+
+        # 计算盈亏
+        if side == 'long':
+            profit_pct = (current_price - entry_price) / entry_price * 100
+        elif side == 'short':
+            profit_pct = (entry_price - current_price) / entry_price * 100
+        else:
+            return False
+
+        highest_profit = self.highest_profits.get(key, 0)
+        if profit_pct > highest_profit:
+            highest_profit = profit_pct
+            self.highest_profits[key] = highest_profit
+
+        if highest_profit >= self.second_trail_profit_threshold:
+            current_tier = "第二档移动止盈"
+        elif highest_profit >= self.first_trail_profit_threshold:
+            current_tier = "第一档移动止盈"
+        elif highest_profit >= self.low_trail_profit_threshold:
+            current_tier = "低档保护止盈"
+        else:
+            current_tier = "无"
+
+        self.current_tiers[key] = current_tier
+
+        self.evaluated_amounts[key] = position_amt
+        self.evaluated_highest[key] = highest_profit
+        changed = self.cycle_log.changed(key, (position_amt, current_tier, round(highest_profit, 2)), profit_pct)
+        if changed:
+            self.logger.info(
+                f"监控 {symbol}，仓位: {position_amt}，方向: {side}，开仓价格: {entry_price}，当前价格: {current_price}，浮动盈亏: {profit_pct:.2f}%，最高盈亏: {highest_profit:.2f}%，当前档位: {current_tier}",
+                extra={'fields': {'symbol': symbol, 'side': side, 'amount': position_amt, 'tier': current_tier,
+                                   'profit_pct': round(profit_pct, 4), 'highest_pct': round(highest_profit, 4)}})
+
+        if current_tier == "低档保护止盈":
+            if changed:
+                self.logger.info(f"回撤到{self.low_trail_stop_loss_pct:.2f}% 止盈")
+            if profit_pct <= self.low_trail_stop_loss_pct:
+                self.logger.info(f"{symbol} 触发低档保护止盈，当前盈亏回撤到: {profit_pct:.2f}%，执行平仓")
+                self.close_position(position)
+                return True
+
+        elif current_tier == "第一档移动止盈":
+            trail_stop_loss = highest_profit * (1 - self.trail_stop_loss_pct)
+            if changed:
+                self.logger.info(f"回撤到 {trail_stop_loss:.2f}% 止盈")
+            if profit_pct <= trail_stop_loss:
+                self.logger.info(
+                    f"{symbol} 达到利润回撤阈值，当前档位：第一档移动止盈，最高盈亏: {highest_profit:.2f}%，当前盈亏: {profit_pct:.2f}%，执行平仓")
+                self.close_position(position)
+                return True
+
+        elif current_tier == "第二档移动止盈":
+            trail_stop_loss = highest_profit * (1 - self.higher_trail_stop_loss_pct)
+            if changed:
+                self.logger.info(f"回撤到 {trail_stop_loss:.2f}% 止盈")
+            if profit_pct <= trail_stop_loss:
+                self.logger.info(
+                    f"{symbol} 达到利润回撤阈值，当前档位：第二档移动止盈，最高盈亏: {highest_profit:.2f}%，当前盈亏: {profit_pct:.2f}%，执行平仓")
+                self.close_position(position)
+                return True
+
+        if profit_pct <= -self.stop_loss_pct:
+            self.logger.info(f"{symbol} 触发止损，当前盈亏: {profit_pct:.2f}%，执行平仓")
+            self.close_position(position)
+            return True
+        return False
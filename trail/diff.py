@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""持仓快照差分
+
+按 (symbol, side, marginMode) 比较相邻两次持仓快照，输出带类型的生命周期事件：
+- open：新出现的仓位；add / reduce：数量增加 / 减少；close：仓位消失或数量为 0；
+- flip：同一品种、同一保证金模式下一个方向平掉、另一个方向开出（单向持仓反手），取代该品种的 close + open。
+数量、开仓价、标记价格都没变的仓位不会出现在 changed 里，机器人只对 changed 里的仓位重新做分档判断。
+
+空快照保护：拉取失败时机器人直接跳过本轮（不要把失败当成空仓传进来）；拉取成功但结果为空、而上一次还有仓位时，
+需要连续 empty_confirmations 次空快照才认定全部平仓，避免交易所偶发的空响应被当成 “全部手动平仓”。
+推送线程维护的持仓表不存在偶发空响应，调用方以 confirmed=True 传入，空快照立即生效。
+"""
+from collections import namedtuple
+
+OPEN = 'open'
+ADD = 'add'
+REDUCE = 'reduce'
+CLOSE = 'close'
+FLIP = 'flip'
+
+PositionEvent = namedtuple('PositionEvent', 'kind symbol position previous')
+Diff = namedtuple('Diff', 'events changed closed')
+
+
+def position_key(position):
+    """(symbol, side, marginMode)，没有保证金模式的交易所记为空字符串，保证 key 之间可以比较大小"""
+    return position['symbol'], position['side'], position.get('marginMode') or ''
+
+
+def _amount(position):
+    return abs(float(position['contracts']))
+
+
+class SnapshotDiffer:
+    def __init__(self, empty_confirmations=2, key=position_key):
+        self.empty_confirmations = empty_confirmations
+        self.key = key
+        self.positions = {}  # key -> 上一次快照里的仓位
+        self._dirty = set()
+        self._empty_count = 0
+
+    def invalidate(self, key):
+        """下一次快照里该仓位即使没有变化也放进 changed（例如平仓请求失败，需要重新判断）"""
+        self._dirty.add(key)
+
+    def apply(self, positions, full_snapshot=True, confirmed=False):
+        """返回 Diff；全量空快照尚未确认时返回 None，调用方应跳过本轮"""
+        current = {}
+        for position in positions:
+            if _amount(position) != 0:
+                current[self.key(position)] = position
+
+        if full_snapshot:
+            if not current and self.positions and not confirmed:
+                self._empty_count += 1
+                if self._empty_count < self.empty_confirmations:
+                    return None
+            self._empty_count = 0
+            gone = [key for key in self.positions if key not in current]
+        else:
+            # 增量推送只包含变化的仓位，数量为 0 的即为已平仓
+            gone = []
+            for position in positions:
+                if _amount(position) != 0:
+                    continue
+                key = self.key(position)
+                if key in self.positions:
+                    gone.append(key)
+                    continue
+                # 单向持仓平仓后的推送可能带不出原来的方向，按品种和保证金模式匹配
+                gone.extend(other for other, previous in self.positions.items()
+                            if other not in current and other not in gone and previous['symbol'] == position['symbol']
+                            and previous.get('marginMode') == position.get('marginMode'))
+
+        events = []
+        changed = []
+        closed = [self.positions.pop(key) for key in gone]
+        opened = []
+        for key, position in current.items():
+            previous = self.positions.get(key)
+            self.positions[key] = position
+            if previous is None:
+                opened.append(position)
+                changed.append(position)
+                continue
+            amount, previous_amount = _amount(position), _amount(previous)
+            if amount > previous_amount:
+                events.append(PositionEvent(ADD, position['symbol'], position, previous))
+            elif amount < previous_amount:
+                events.append(PositionEvent(REDUCE, position['symbol'], position, previous))
+            if (amount != previous_amount or position['entryPrice'] != previous['entryPrice']
+                    or position['markPrice'] != previous['markPrice'] or key in self._dirty):
+                changed.append(position)
+
+        # 同一品种同一保证金模式一平一开即为反手
+        flipped = {}
+        for position in closed:
+            for other in opened:
+                if (id(other) not in flipped and other['symbol'] == position['symbol']
+                        and other['side'] != position['side'] and other.get('marginMode') == position.get('marginMode')):
+                    flipped[id(position)] = other
+                    flipped[id(other)] = position
+                    events.append(PositionEvent(FLIP, other['symbol'], other, position))
+                    break
+        events.extend(PositionEvent(CLOSE, position['symbol'], None, position)
+                      for position in closed if id(position) not in flipped)
+        events.extend(PositionEvent(OPEN, position['symbol'], position, None)
+                      for position in opened if id(position) not in flipped)
+        self._dirty.difference_update(self.key(position) for position in changed + closed)
+        return Diff(events, changed, closed)
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""紧急全部平仓
+
+全局止损触发时把所有仓位的 close-position 请求同时发出，并发度由 okx.ratelimit 的按账户预算约束
+（平仓 20 次/2s），不会因为扇出触发 429；挂单按 20 个一批走 cancel-batch-orders。
+每个品种记录从开始到收到响应的耗时，平仓完成后由调用方只重新拉一次持仓确认结果。
+
+    results, cancels = flatten((api_key, secret, password), close_targets(positions, position_mode))
+"""
+import asyncio
+import time
+
+from okx.async_api import AsyncTradeAPI
+
+# cancel-batch-orders 单次最多 20 个订单
+CANCEL_BATCH = 20
+
+
+def inst_id_of(symbol):
+    """ccxt 的 BTC/USDT:USDT -> OKX 的 BTC-USDT-SWAP"""
+    inst_id = symbol.replace('/', '-').replace(':USDT', '')
+    if 'SWAP' not in inst_id:  # 确保是永续合约标识
+        inst_id += '-SWAP'
+    return inst_id
+
+
+def close_targets(positions, position_mode):
+    """ccxt 持仓 -> close-position 的参数；双向持仓模式下指定平仓方向，单向模式用 net"""
+    targets = []
+    for position in positions:
+        amount = abs(float(position.get('contracts') or 0))
+        if amount <= 0:
+            continue
+        targets.append({
+            'symbol': position['symbol'],
+            'side': position['side'],
+            'amount': amount,
+            'instId': inst_id_of(position['symbol']),
+            'mgnMode': position['marginMode'],
+            'posSide': position['side'] if position_mode == 'long_short_mode' else 'net',
+        })
+    return targets
+
+
+def cancel_batches(orders):
+    """ccxt 挂单 -> cancel-batch-orders 的参数列表，每批最多 CANCEL_BATCH 个"""
+    items = [{'instId': (order.get('info') or {}).get('instId') or inst_id_of(order['symbol']), 'ordId': str(order['id'])}
+             for order in orders]
+    return [items[i:i + CANCEL_BATCH] for i in range(0, len(items), CANCEL_BATCH)]
+
+
+async def _close_one(api, target, started):
+    try:
+        response = await api.close_positions(instId=target['instId'], mgnMode=target['mgnMode'],
+                                             posSide=target['posSide'], autoCxl='true')
+        error = None if response.get('code') == '0' else response
+    except Exception as e:
+        response, error = None, e
+    return dict(target, ok=error is None, response=response, error=error, latency=time.perf_counter() - started)
+
+
+async def _cancel_batch(api, batch, started):
+    try:
+        response = await api.cancel_multiple_orders(batch)
+        # 整批成功 code 为 0，部分失败为 2，逐单结果在 data 里
+        failed = [item for item in response.get('data', []) if item.get('sCode') != '0']
+        error = None if response.get('code') == '0' else (failed or response)
+    except Exception as e:
+        response, error = None, e
+    return {'orders': batch, 'ok': error is None, 'response': response, 'error': error,
+            'latency': time.perf_counter() - started}
+
+
+async def flatten_async(api, targets, batches=()):
+    """并发发出全部平仓和撤单请求，返回 (每个仓位的结果, 每批撤单的结果)"""
+    started = time.perf_counter()
+    closes = [_close_one(api, target, started) for target in targets]
+    cancels = [_cancel_batch(api, batch, started) for batch in batches]
+    results = await asyncio.gather(*closes, *cancels)
+    return results[:len(closes)], results[len(closes):]
+
+
+def flatten(credentials, targets, batches=(), flag='0', **kwargs):
+    """阻塞入口：在新的事件循环里执行 flatten_async，kwargs 透传给 AsyncTradeAPI"""
+    async def run():
+        async with AsyncTradeAPI(*credentials, False, flag, **kwargs) as api:
+            return await flatten_async(api, targets, batches)
+
+    return asyncio.run(run())
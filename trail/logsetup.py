@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""机器人日志：队列异步写出 + 状态变化日志 + 每轮汇总
+
+- setup_logger：机器人线程只把记录放进队列（QueueHandler），格式化和文件/控制台写入都在 QueueListener 线程里完成；
+  文件仍按天切分（TimedRotatingFileHandler），默认每行一条 JSON，控制台保持原来的文本格式。
+- CycleLog：每个仓位只在状态（数量、档位、最高盈利）变化时记一行，每轮结束再记一行汇总，
+  不再每轮为每个仓位写两三行。
+"""
+import atexit
+import json
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """一行一条 JSON：时间、级别、logger、消息，以及 extra={'fields': {...}} 附带的结构化字段"""
+
+    def format(self, record):
+        item = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            item.update(fields)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            item['exc'] = record.exc_text
+        return json.dumps(item, ensure_ascii=False, default=str)
+
+    def formatTime(self, record, datefmt=None):
+        return time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f".{int(record.msecs):03d}"
+
+
+def setup_logger(name, log_file, json_lines=True, level=logging.INFO):
+    """配置并返回 logger；同名 logger 重复调用时直接返回已配置好的
+
+    记录经队列交给后台线程写出，调用方不会被文件写入阻塞；文件按天切分，保留 7 天，
+    json_lines 为 True（默认）时每行一条 JSON，控制台始终是文本格式。
+    """
+    logger = logging.getLogger(name)
+    if getattr(logger, '_queue_listener', None):
+        return logger
+    logger.setLevel(level)
+
+    # 以天为单位进行日志分割，文件名后缀例如 multi_asset_bot.log.2024-11-05
+    file_handler = TimedRotatingFileHandler(log_file, when='midnight', interval=1, backupCount=7, encoding='utf-8')
+    file_handler.suffix = "%Y-%m-%d"
+    file_handler.setFormatter(JsonFormatter() if json_lines else logging.Formatter(TEXT_FORMAT))
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    # 退出时把队列里剩下的记录写完
+    atexit.register(listener.stop)
+    logger.addHandler(QueueHandler(log_queue))
+    logger._queue_listener = listener
+    return logger
+
+
+class CycleLog:
+    """按品种记录上一次输出的状态，只有变化时 changed 才返回 True；end 输出本轮汇总"""
+
+    def __init__(self, logger):
+        self.logger = logger
+        self.states = {}
+        self._begin()
+
+    def _begin(self):
+        self.started = time.perf_counter()
+        self.positions = 0
+        self.changes = 0
+        self.closes = 0
+        self.best = None
+        self.worst = None
+
+    def begin(self):
+        self._begin()
+
+    def changed(self, symbol, state, profit_pct=None):
+        self.positions += 1
+        if profit_pct is not None:
+            self.best = profit_pct if self.best is None else max(self.best, profit_pct)
+            self.worst = profit_pct if self.worst is None else min(self.worst, profit_pct)
+        if self.states.get(symbol) == state:
+            return False
+        self.states[symbol] = state
+        self.changes += 1
+        return True
+
+    def unchanged(self, count, worst, best):
+        """批量记录 count 个状态没有变化的仓位（TrailingBot 向量化判断时使用），只计数和更新盈亏区间"""
+        self.positions += count
+        self.best = best if self.best is None else max(self.best, best)
+        self.worst = worst if self.worst is None else min(self.worst, worst)
+
+    def closed(self, symbol):
+        self.closes += 1
+        self.states.pop(symbol, None)
+
+    def forget(self, symbol):
+        self.states.pop(symbol, None)
+
+    def end(self, **fields):
+        elapsed = (time.perf_counter() - self.started) * 1000
+        summary = {'positions': self.positions, 'changes': self.changes, 'closes': self.closes,
+                   'best_pct': None if self.best is None else round(self.best, 4),
+                   'worst_pct': None if self.worst is None else round(self.worst, 4),
+                   'elapsed_ms': round(elapsed, 2)}
+        summary.update(fields)
+        profit = '' if self.best is None else f"，盈亏区间: {self.worst:.2f}% ~ {self.best:.2f}%"
+        self.logger.info(f"本轮监控仓位 {self.positions} 个，状态变化 {self.changes} 个，平仓 {self.closes} 个"
+                         f"{profit}，耗时 {elapsed:.1f}ms", extra={'fields': summary})
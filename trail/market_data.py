@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""公共标记价格推送
+
+只订阅当前持仓的品种，每个 tick 回调 on_tick(symbol, mark_price)，symbol 使用 ccxt 格式（BTC/USDT:USDT），
+由机器人只对该品种重新计算分档止盈。持仓结构（数量、开仓价、保证金模式）仍由低频的 REST 刷新维护。
+"""
+import threading
+
+from trail.ws import WsThread
+
+OKX_WS_PUBLIC_URL = 'wss://ws.okx.com:8443/ws/v5/public'
+BINANCE_WS_URL = 'wss://fstream.binance.com/ws'
+BITGET_WS_PUBLIC_URL = 'wss://ws.bitget.com/v2/ws/public'
+
+
+def symbol_to_inst_id(symbol):
+    """BTC/USDT:USDT -> BTC-USDT-SWAP"""
+    return symbol.replace('/', '-').replace(':USDT', '-SWAP')
+
+
+def symbol_to_exchange_id(symbol):
+    """BTC/USDT:USDT -> BTCUSDT（Binance/Bitget 的合约 id）"""
+    return symbol.replace("/", "").replace(":USDT", "")
+
+
+class MarkPriceFeed(WsThread):
+    """按持仓动态增减订阅的标记价格推送基类"""
+
+    def __init__(self, url, on_tick, logger, on_state=None):
+        super().__init__(url, logger, on_state=on_state)
+        self.on_tick = on_tick
+        self.symbols = set()
+        self._ids = {}  # 交易所品种 id -> ccxt symbol
+        self._lock = threading.Lock()
+
+    def to_exchange_id(self, symbol):
+        raise NotImplementedError
+
+    def subscribe(self, exchange_ids):
+        raise NotImplementedError
+
+    def unsubscribe(self, exchange_ids):
+        raise NotImplementedError
+
+    def set_symbols(self, symbols):
+        """同步订阅列表为当前持仓品种，只发送增量的订阅/退订"""
+        symbols = set(symbols)
+        with self._lock:
+            added = symbols - self.symbols
+            removed = self.symbols - symbols
+            if not added and not removed:
+                return
+            self.symbols = symbols
+            for symbol in added:
+                self._ids[self.to_exchange_id(symbol)] = symbol
+            removed_ids = [self.to_exchange_id(symbol) for symbol in removed]
+            for exchange_id in removed_ids:
+                self._ids.pop(exchange_id, None)
+            added_ids = [self.to_exchange_id(symbol) for symbol in added]
+        if self._ws is None:
+            return  # 未连接时由 on_open 订阅全部品种
+        try:
+            if added_ids:
+                self.subscribe(added_ids)
+            if removed_ids:
+                self.unsubscribe(removed_ids)
+        except Exception as e:
+            self.logger.error(f"更新标记价格订阅失败: {e}")
+
+    def on_open(self):
+        with self._lock:
+            exchange_ids = list(self._ids)
+        if exchange_ids:
+            self.subscribe(exchange_ids)
+        self.set_live(True)
+
+    def emit(self, exchange_id, mark_price):
+        symbol = self._ids.get(exchange_id)
+        if symbol is not None and mark_price:
+            self.on_tick(symbol, float(mark_price))
+
+
+class OkxMarkPriceFeed(MarkPriceFeed):
+    def __init__(self, on_tick, logger, url=OKX_WS_PUBLIC_URL, on_state=None):
+        super().__init__(url, on_tick, logger, on_state=on_state)
+
+    def to_exchange_id(self, symbol):
+        return symbol_to_inst_id(symbol)
+
+    def subscribe(self, exchange_ids):
+        self.send_json({"op": "subscribe", "args": [{"channel": "mark-price", "instId": i} for i in exchange_ids]})
+
+    def unsubscribe(self, exchange_ids):
+        self.send_json({"op": "unsubscribe", "args": [{"channel": "mark-price", "instId": i} for i in exchange_ids]})
+
+    def on_message(self, message):
+        if message.get('event') == 'error':
+            self.logger.error(f"标记价格订阅错误: {message}")
+            return
+        for row in message.get('data', []):
+            self.emit(row.get('instId'), row.get('markPx'))
+
+
+class BinanceMarkPriceFeed(MarkPriceFeed):
+    def __init__(self, on_tick, logger, url=BINANCE_WS_URL, on_state=None):
+        super().__init__(url, on_tick, logger, on_state=on_state)
+        self._request_id = 0
+
+    def to_exchange_id(self, symbol):
+        return symbol_to_exchange_id(symbol)
+
+    def ping(self):
+        pass  # Binance 使用协议层 ping 帧，由 websockets 自动应答
+
+    def _send(self, method, exchange_ids):
+        self._request_id += 1
+        self.send_json({"method": method, "params": [f"{i.lower()}@markPrice@1s" for i in exchange_ids],
+                        "id": self._request_id})
+
+    def subscribe(self, exchange_ids):
+        self._send("SUBSCRIBE", exchange_ids)
+
+    def unsubscribe(self, exchange_ids):
+        self._send("UNSUBSCRIBE", exchange_ids)
+
+    def on_message(self, message):
+        if message.get('e') == 'markPriceUpdate':
+            self.emit(message.get('s'), message.get('p'))
+
+
+class BitgetMarkPriceFeed(MarkPriceFeed):
+    def __init__(self, on_tick, logger, url=BITGET_WS_PUBLIC_URL, on_state=None):
+        super().__init__(url, on_tick, logger, on_state=on_state)
+
+    def to_exchange_id(self, symbol):
+        return symbol_to_exchange_id(symbol)
+
+    def _args(self, exchange_ids):
+        return [{"instType": "USDT-FUTURES", "channel": "ticker", "instId": i} for i in exchange_ids]
+
+    def subscribe(self, exchange_ids):
+        self.send_json({"op": "subscribe", "args": self._args(exchange_ids)})
+
+    def unsubscribe(self, exchange_ids):
+        self.send_json({"op": "unsubscribe", "args": self._args(exchange_ids)})
+
+    def on_message(self, message):
+        if message.get('event') == 'error':
+            self.logger.error(f"标记价格订阅错误: {message}")
+            return
+        for row in message.get('data', []):
+            self.emit(row.get('instId'), row.get('markPrice'))
+
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""监控循环指标，按 Prometheus 文本格式导出
+
+- trail_cycle_seconds：一轮（并发拉取并处理全部到期账户）的耗时直方图；
+- trail_account_loop_seconds{account}：单个账户拉取 + 处理持仓的耗时直方图；
+- trail_positions{account}：账户当前监控的仓位数；
+- trail_fetch_errors_total{account}：拉取持仓失败次数。
+
+serve(port) 在后台线程里提供 GET /metrics，不依赖 prometheus_client。
+"""
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels}le="{bound}"}} {cumulative}'
+        labels = f'{{{labels.rstrip(",")}}}' if labels else ''
+        yield f'{name}_sum{labels} {self.sum:.6f}'
+        yield f'{name}_count{labels} {self.count}'
+
+
+class LoopMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cycle = _Histogram()
+        self.accounts = {}  # account -> _Histogram
+        self.positions = {}
+        self.errors = {}
+
+    def observe_cycle(self, seconds):
+        with self._lock:
+            self.cycle.observe(seconds)
+
+    def observe_account(self, account, seconds, positions=None):
+        with self._lock:
+            self.accounts.setdefault(account, _Histogram()).observe(seconds)
+            if positions is not None:
+                self.positions[account] = positions
+
+    def fetch_error(self, account):
+        with self._lock:
+            self.errors[account] = self.errors.get(account, 0) + 1
+
+    def render(self):
+        with self._lock:
+            lines = ['# HELP trail_cycle_seconds 一轮并发处理全部到期账户的耗时',
+                     '# TYPE trail_cycle_seconds histogram']
+            lines.extend(self.cycle.lines('trail_cycle_seconds', ''))
+            lines += ['# HELP trail_account_loop_seconds 单个账户拉取并处理持仓的耗时',
+                      '# TYPE trail_account_loop_seconds histogram']
+            for account, histogram in sorted(self.accounts.items()):
+                lines.extend(histogram.lines('trail_account_loop_seconds', f'account="{account}",'))
+            lines += ['# HELP trail_positions 账户当前监控的仓位数', '# TYPE trail_positions gauge']
+            lines.extend(f'trail_positions{{account="{account}"}} {count}'
+                         for account, count in sorted(self.positions.items()))
+            lines += ['# HELP trail_fetch_errors_total 拉取持仓失败次数', '# TYPE trail_fetch_errors_total counter']
+            lines.extend(f'trail_fetch_errors_total{{account="{account}"}} {count}'
+                         for account, count in sorted(self.errors.items()))
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port, host='0.0.0.0'):
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                data = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+        return server
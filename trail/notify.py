@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""飞书通知的后台发送
+
+机器人原来在监控循环里直接 requests.post（没有超时），每次平仓、首次检测到仓位、报错都要等一次 webhook 往返。
+FeishuNotifier 把消息放进有界队列立即返回，由后台线程通过复用连接的 Session 发送：
+- 第一条消息到达后再等 window 秒，把这段时间内的消息合并成一张汇总卡片（只有一条时仍发普通文本）；
+- 只对显式带 key 的消息（拉取失败、连接异常等会反复出现的报错）去重：同一个 key 在 dedupe_ttl 秒内只发一次，
+  期间重复的次数在下一次发出时附上，接口故障时不会每个循环都刷屏；开平仓等交易通知不带 key，一条都不会丢；
+- 队列满时直接丢弃并计数，绝不阻塞交易循环；进程退出时（atexit）把队列里剩下的消息发完。
+"""
+import atexit
+import queue
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+_STOP = object()
+
+
+class FeishuNotifier:
+    def __init__(self, webhook, logger, title="交易通知", window=2.0, dedupe_ttl=60, maxsize=256, timeout=5,
+                 max_lines=50):
+        self.webhook = webhook
+        self.logger = logger
+        self.title = title
+        self.window = window
+        self.dedupe_ttl = dedupe_ttl
+        self.timeout = timeout
+        self.max_lines = max_lines  # 单张卡片最多的行数，超过时拆成多张
+        self.queue = queue.Queue(maxsize)
+        self.dropped = 0
+        self.sent = 0
+        self._last_sent = {}  # key -> 最近一次发出的时间
+        self._suppressed = {}  # key -> 去重期间被压掉的次数
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.thread = threading.Thread(target=self._run, name='feishu-notify', daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def notify(self, message, key=None):
+        """放进后台队列立即返回，不阻塞调用方的监控循环；队列已满时丢弃。只有带 key 的消息会去重"""
+        try:
+            self.queue.put_nowait((key, message))
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 100 == 0:
+                self.logger.warning(f"飞书通知队列已满，已丢弃 {self.dropped} 条")
+
+    def close(self, timeout=10):
+        """发完队列里的消息后停止后台线程"""
+        if not self.thread.is_alive():
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self.thread.join(timeout)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            lines = self._coalesce(batch)
+            for i in range(0, len(lines), self.max_lines):
+                self._send(lines[i:i + self.max_lines])
+
+    def _coalesce(self, batch):
+        """合并同 key 的消息，并按 dedupe_ttl 去重，返回要发出的行；不带 key 的消息原样保留"""
+        now = time.monotonic()
+        counts = {}
+        for i, (key, message) in enumerate(batch):
+            if key is None:
+                key = (None, i)  # 不与任何消息合并，也不记录发送时间
+            if key in counts:
+                counts[key][1] += 1
+            else:
+                counts[key] = [message, 1]
+        lines = []
+        for key, (message, count) in counts.items():
+            if isinstance(key, tuple) and key[0] is None:
+                lines.append(message)
+                continue
+            if now - self._last_sent.get(key, -self.dedupe_ttl) < self.dedupe_ttl:
+                self._suppressed[key] = self._suppressed.get(key, 0) + count
+                continue
+            count += self._suppressed.pop(key, 0)
+            self._last_sent[key] = now
+            lines.append(message if count == 1 else f"{message}（重复 {count} 次）")
+        # 清理过期的去重记录，避免长期运行时不断增长
+        if len(self._last_sent) > 1024:
+            self._last_sent = {key: sent for key, sent in self._last_sent.items() if now - sent < self.dedupe_ttl}
+            self._suppressed = {key: count for key, count in self._suppressed.items() if key in self._last_sent}
+        return lines
+
+    def _payload(self, lines):
+        if len(lines) == 1:
+            return {"msg_type": "text", "content": {"text": lines[0]}}
+        return {
+            "msg_type": "interactive",
+            "card": {
+                "header": {"title": {"tag": "plain_text", "content": f"{self.title}（{len(lines)} 条）"}},
+                "elements": [{"tag": "div", "text": {"tag": "lark_md", "content": "\n".join(lines)}}],
+            },
+        }
+
+    def _send(self, lines):
+        try:
+            response = self.session.post(self.webhook, json=self._payload(lines), timeout=self.timeout)
+            if response.status_code == 200:
+                self.sent += len(lines)
+                self.logger.info("飞书通知发送成功")
+            else:
+                self.logger.error("飞书通知发送失败，状态码: %s", response.status_code)
+        except Exception as e:
+            self.logger.error("发送飞书通知时出现异常: %s", str(e))
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import time
+
+from okx import utils
+from trail.ws import WsThread
+
+OKX_WS_PRIVATE_URL = 'wss://ws.okx.com:8443/ws/v5/private'
+OKX_WS_PRIVATE_DEMO_URL = 'wss://wspap.okx.com:8443/ws/v5/private?brokerId=9999'
+
+
+def login_args(api_key, secret, passphrase):
+    timestamp = str(int(time.time()))
+    sign = utils.sign(utils.pre_hash(timestamp, 'GET', '/users/self/verify', ''), secret).decode('utf-8')
+    return {"apiKey": api_key, "passphrase": passphrase, "timestamp": timestamp, "sign": sign}
+
+
+def inst_id_to_symbol(inst_id):
+    """BTC-USDT-SWAP -> BTC/USDT:USDT，与 ccxt 的 symbol 保持一致"""
+    base, quote = inst_id.split('-')[:2]
+    return f"{base}/{quote}:{quote}"
+
+
+def parse_position(row):
+    """把 positions 频道的原始数据转换成与 ccxt fetch_positions 相同字段的字典"""
+    pos = float(row.get('pos') or 0)
+    pos_side = row.get('posSide')
+    if pos_side in ('long', 'short'):
+        side = pos_side
+    else:
+        side = 'long' if pos > 0 else 'short'
+    return {
+        'symbol': inst_id_to_symbol(row['instId']),
+        'contracts': abs(pos),
+        'entryPrice': float(row.get('avgPx') or 0),
+        'markPrice': float(row.get('markPx') or 0),
+        'side': side,
+        'marginMode': row.get('mgnMode'),
+        'info': row,
+    }
+
+
+class OkxPositionStream(WsThread):
+    """订阅 OKX 私有 positions 频道（SWAP）
+
+    on_positions(positions, full_snapshot) 在推送线程中回调；首个快照到达后 live 置位，
+    断线期间 live 清除，由调用方回退到 REST 轮询。
+    """
+
+    def __init__(self, api_key, secret, passphrase, on_positions, logger, url=OKX_WS_PRIVATE_URL, inst_type='SWAP',
+                 on_state=None):
+        super().__init__(url, logger, ping_interval=20, on_state=on_state)
+        self.api_key = api_key
+        self.secret = secret
+        self.passphrase = passphrase
+        self.inst_type = inst_type
+        self.on_positions = on_positions
+        self._snapshot_rows = []
+
+    def on_open(self):
+        self._snapshot_rows = []
+        self.send_json({"op": "login", "args": [login_args(self.api_key, self.secret, self.passphrase)]})
+
+    def on_message(self, message):
+        event = message.get('event')
+        if event == 'login':
+            if message.get('code') != '0':
+                raise RuntimeError(f"WebSocket 登录失败: {message}")
+            self.send_json({"op": "subscribe", "args": [{"channel": "positions", "instType": self.inst_type}]})
+            return
+        if event == 'error':
+            raise RuntimeError(f"WebSocket 错误: {message}")
+        if event is not None or 'data' not in message:
+            return
+
+        rows = [row for row in message['data'] if row.get('instId')]
+        if message.get('eventType') != 'snapshot':
+            self.on_positions([parse_position(row) for row in rows], False)
+            return
+        # 快照（首次订阅及定时推送）可能分页下发，收齐最后一页再按全量处理
+        self._snapshot_rows.extend(rows)
+        if not message.get('lastPage', True):
+            return
+        rows, self._snapshot_rows = self._snapshot_rows, []
+        self.on_positions([parse_position(row) for row in rows], True)
+        self.set_live(True)
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""分档参数的并行网格/随机搜索
+
+K 线只从本地存储读一次，按列拼成一块放进共享内存；每个工作进程在初始化时按名字挂载，
+得到零拷贝的 NumPy 视图，任务里只传参数组合本身。每个组合用 trail.backtest 回放，
+按收益排序输出表格，并给出可以直接粘贴进 config.json 的 JSON。
+
+    python -m trail.optimize --inst BTC-USDT-SWAP ETH-USDT-SWAP \\
+        --grid stop_loss_pct=1,2,3 trail_stop_loss_pct=0.1,0.2,0.3 --samples 20000
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from trail.backtest import load_symbols, run
+from trail.candle_store import CandleStore, STORE_DIR
+from trail.trigger_book import TIER_PARAMS
+
+# 随机搜索的默认取值范围
+DEFAULT_RANGES = {
+    "stop_loss_pct": (0.5, 5.0),
+    "low_trail_stop_loss_pct": (0.05, 0.5),
+    "trail_stop_loss_pct": (0.05, 0.5),
+    "higher_trail_stop_loss_pct": (0.05, 0.5),
+    "low_trail_profit_threshold": (0.1, 1.0),
+    "first_trail_profit_threshold": (0.5, 3.0),
+    "second_trail_profit_threshold": (1.5, 8.0),
+}
+
+# 共享内存中按行排列的列，每个品种占其中连续的一段
+SHARED_COLUMNS = ('ts', 'open', 'high', 'low', 'close', 'trade_close')
+
+_symbols = None
+_shm = None
+
+
+def valid_params(params):
+    """档位阈值必须递增，低档保护线必须低于低档触发阈值，否则该组合没有意义"""
+    return (params["low_trail_profit_threshold"] < params["first_trail_profit_threshold"]
+            < params["second_trail_profit_threshold"]
+            and params["low_trail_stop_loss_pct"] < params["low_trail_profit_threshold"]
+            and params["stop_loss_pct"] > 0)
+
+
+def grid_combinations(base, grid):
+    names = list(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = dict(base, **dict(zip(names, values)))
+        if valid_params(params):
+            yield params
+
+
+def random_combinations(base, ranges, samples, seed=0):
+    rng = random.Random(seed)
+    produced = 0
+    while produced < samples:
+        params = dict(base)
+        for name, (low, high) in ranges.items():
+            params[name] = round(rng.uniform(low, high), 3)
+        if valid_params(params):
+            produced += 1
+            yield params
+
+
+def share_symbols(symbols):
+    """把 {instId: (mark 列, trade_close)} 按列拼进一块共享内存，返回 (SharedMemory, 布局)"""
+    layout = []
+    total = sum(len(mark['close']) for mark, _ in symbols.values())
+    shm = shared_memory.SharedMemory(create=True, size=max(total * len(SHARED_COLUMNS) * 8, 8))
+    buffer = np.ndarray((len(SHARED_COLUMNS), total), dtype=np.float64, buffer=shm.buf)
+    offset = 0
+    for inst_id, (mark, trade_close) in symbols.items():
+        length = len(mark['close'])
+        for row, name in enumerate(SHARED_COLUMNS):
+            buffer[row, offset:offset + length] = trade_close if name == 'trade_close' else mark[name]
+        layout.append((inst_id, offset, length))
+        offset += length
+    return shm, (total, layout)
+
+
+def attach_symbols(name, shape):
+    global _symbols, _shm
+    total, layout = shape
+    _shm = shared_memory.SharedMemory(name=name)
+    buffer = np.ndarray((len(SHARED_COLUMNS), total), dtype=np.float64, buffer=_shm.buf)
+    _symbols = {}
+    for inst_id, offset, length in layout:
+        views = {column: buffer[row, offset:offset + length] for row, column in enumerate(SHARED_COLUMNS)}
+        _symbols[inst_id] = (views, views.pop('trade_close'))
+
+
+def evaluate_batch(batch, every, horizon, fee_pct):
+    results = []
+    for params in batch:
+        report = run(_symbols, params, every, horizon, fee_pct)
+        results.append((params, report.get('total')))
+    return results
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def sweep(symbols, combinations, every=60, horizon=1440, fee_pct=0.0, workers=None, batch_size=16):
+    """并行评估全部组合，返回按 pnl 降序的 [(params, summary)]"""
+    shm, shape = share_symbols(symbols)
+    try:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=attach_symbols,
+                                 initargs=(shm.name, shape)) as pool:
+            futures = [pool.submit(evaluate_batch, batch, every, horizon, fee_pct)
+                       for batch in batched(combinations, batch_size)]
+            results = [item for future in futures for item in future.result()]
+    finally:
+        shm.close()
+        shm.unlink()
+    results = [(params, summary) for params, summary in results if summary]
+    results.sort(key=lambda item: item[1]['pnl'], reverse=True)
+    return results
+
+
+def format_table(results, top=20):
+    short = ["sl", "low_sl", "trail", "h_trail", "low_th", "first_th", "second_th"]
+    header = " ".join(f"{name:>9}" for name in short)
+    lines = [f"{'rank':>4} {header} {'pnl%':>10} {'maxDD%':>9} {'hit':>6} {'trades':>7}"]
+    for rank, (params, summary) in enumerate(results[:top], 1):
+        values = " ".join(f"{params[name]:>9.3f}" for name in TIER_PARAMS)
+        lines.append(f"{rank:>4} {values} {summary['pnl']:>10.2f} {summary['max_drawdown']:>9.2f} "
+                     f"{summary['hit_rate']:>6.2%} {summary['trades']:>7}")
+    return "\n".join(lines)
+
+
+def parse_grid(items):
+    grid = {}
+    for item in items or []:
+        name, values = item.split('=', 1)
+        if name not in TIER_PARAMS:
+            raise SystemExit(f"未知参数: {name}")
+        grid[name] = [float(value) for value in values.split(',')]
+    return grid
+
+
+def parse_ranges(items):
+    ranges = dict(DEFAULT_RANGES)
+    for item in items or []:
+        name, values = item.split('=', 1)
+        if name not in TIER_PARAMS:
+            raise SystemExit(f"未知参数: {name}")
+        low, high = values.split(':')
+        ranges[name] = (float(low), float(high))
+    return ranges
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--inst', nargs='+', required=True)
+    parser.add_argument('--bar', default='1m')
+    parser.add_argument('--config', default='config.json')
+    parser.add_argument('--exchange', default='okx', help='作为基准参数的配置段，输出的 JSON 也对应这一段')
+    parser.add_argument('--grid', nargs='*', help='网格参数，例如 stop_loss_pct=1,2,3')
+    parser.add_argument('--samples', type=int, default=0, help='随机搜索的组合数')
+    parser.add_argument('--range', nargs='*', dest='ranges', help='随机搜索范围，例如 trail_stop_loss_pct=0.1:0.4')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--every', type=int, default=60)
+    parser.add_argument('--horizon', type=int, default=1440)
+    parser.add_argument('--fee', type=float, default=0.0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--cache', default=STORE_DIR)
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as f:
+        section = json.load(f)[args.exchange]
+    base = {name: section[name] for name in TIER_PARAMS}
+
+    symbols = load_symbols(CandleStore(args.cache), args.inst, args.bar)
+    if not symbols:
+        raise SystemExit("本地没有 K 线，先运行 python -m trail.candle_store 同步")
+
+    combinations = []
+    grid = parse_grid(args.grid)
+    if grid:
+        combinations = itertools.chain(combinations, grid_combinations(base, grid))
+    if args.samples:
+        ranges = parse_ranges(args.ranges)
+        combinations = itertools.chain(combinations, random_combinations(base, ranges, args.samples, args.seed))
+    if not grid and not args.samples:
+        combinations = [base]
+
+    start = time.perf_counter()
+    results = sweep(symbols, combinations, args.every, args.horizon, args.fee, args.workers)
+    elapsed = time.perf_counter() - start
+    print(format_table(results, args.top))
+    print(f"\n{len(results)} 组参数，耗时 {elapsed:.1f}s")
+    if results:
+        best = dict(results[0][0])
+        print(f"\n最优参数（粘贴到 config.json 的 {args.exchange} 段）：")
+        print(json.dumps(best, indent=4))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""账户级组合盈亏（chua_ok_all 使用）
+
+每个循环只拉一次持仓，整理成按行对齐的数组快照；仓位规模变化、组合盈亏、全部平仓都基于同一份快照，
+不再在同一个循环里拿三次不同时刻的数据。组合盈亏有三种口径：
+- simple：各仓位盈亏百分比的简单平均（原有行为）；
+- notional：按名义价值（张数 × 合约面值 × 标记价）加权；
+- margin：按保证金加权，ccxt 没有返回保证金时按 名义价值 / 杠杆 估算。
+合约面值按品种缓存，只在第一次遇到该品种时查询。
+"""
+import numpy as np
+
+WEIGHTINGS = ('simple', 'notional', 'margin')
+
+
+def _float(value, default=0.0):
+    try:
+        return float(value) if value not in (None, '') else default
+    except (TypeError, ValueError):
+        return default
+
+
+class Snapshot:
+    """一次 fetch_positions 的结果（只保留有方向、有开仓价的仓位），按行对齐成数组"""
+
+    def __init__(self, positions, contract_sizes):
+        self.positions = rows = positions
+        self.symbols = [p['symbol'] for p in rows]
+        self.sides = [p['side'] for p in rows]
+        self.sign = np.array([1.0 if p['side'] == 'long' else -1.0 for p in rows])
+        self.entry = np.array([_float(p.get('entryPrice')) for p in rows])
+        self.mark = np.array([_float(p.get('markPrice')) for p in rows])
+        self.contracts = np.abs(np.array([_float(p.get('contracts')) for p in rows]))
+        self.contract_size = np.array(contract_sizes, dtype=np.float64)
+        self.notional = self.contracts * self.contract_size * self.mark
+        leverage = np.array([_float(p.get('leverage'), 1.0) or 1.0 for p in rows])
+        margin = np.array([_float(p.get('initialMargin')) for p in rows])
+        self.margin = np.where(margin > 0, margin, self.notional / leverage)
+        self.profit_pct = (self.mark - self.entry) / self.entry * 100 * self.sign
+        # 与原来 sum(abs(contracts)) 的口径一致，用于检测加仓
+        self.total_contracts = float(self.contracts.sum())
+
+    def __len__(self):
+        return len(self.positions)
+
+    def weights(self, weighting='simple'):
+        if weighting == 'notional':
+            return self.notional
+        if weighting == 'margin':
+            return self.margin
+        return np.ones(len(self))
+
+    def profit(self, weighting='simple'):
+        """组合浮动盈亏百分比；没有仓位或权重全为 0 时返回 0"""
+        if not len(self):
+            return 0.0
+        weights = self.weights(weighting)
+        total = weights.sum()
+        if total <= 0:
+            return 0.0
+        return float(np.dot(self.profit_pct, weights) / total)
+
+
+class Portfolio:
+    def __init__(self, exchange=None, weighting='simple'):
+        if weighting not in WEIGHTINGS:
+            raise ValueError(f"未知的组合盈亏口径: {weighting}，可选 {WEIGHTINGS}")
+        self.exchange = exchange
+        self.weighting = weighting
+        self.contract_sizes = {}  # symbol -> 合约面值
+
+    def contract_size(self, position):
+        symbol = position['symbol']
+        size = self.contract_sizes.get(symbol)
+        if size is None:
+            size = _float(position.get('contractSize'))
+            if not size and self.exchange is not None:
+                try:
+                    size = _float(self.exchange.market(symbol).get('contractSize'))
+                except Exception:
+                    size = 0.0
+            size = size or 1.0
+            self.contract_sizes[symbol] = size
+        return size
+
+    def snapshot(self, positions):
+        live = [p for p in positions or []
+                if p.get('side') in ('long', 'short') and _float(p.get('entryPrice')) > 0]
+        return Snapshot(live, [self.contract_size(p) for p in live])
+
+    def profit(self, snapshot):
+        return snapshot.profit(self.weighting)
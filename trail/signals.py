@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""信号策略持仓的并发拉取（chua_ok_bot 使用）
+
+algoId 列表很少变化，缓存 ttl 秒，过期后由后台线程刷新，期间继续使用旧列表；
+每个循环只对缓存里的 algoId 并发请求 /tradingBot/signal/positions，合并成一份持仓快照。
+请求在常驻的事件循环线程里发出，aiohttp 会话跨循环复用，并发度受 okx.ratelimit 的按账户预算约束，
+策略数增加时循环耗时基本不变。
+"""
+import asyncio
+import threading
+import time
+
+
+class LoopThread:
+    """常驻后台线程的事件循环，供同步代码提交协程"""
+
+    def __init__(self, name='aio-loop'):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self.thread.start()
+
+    def run(self, coro, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+class AlgoIdCache:
+    def __init__(self, load, ttl=60, logger=None):
+        """load: 返回 algoId 列表的函数，失败时抛异常（不会把失败缓存成空列表）"""
+        self.load = load
+        self.ttl = ttl
+        self.logger = logger
+        self.algo_ids = None
+        self.updated = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def get(self):
+        """返回 algoId 列表；一次都没有加载成功时返回 None，调用方不能把它当成“没有策略”"""
+        if self.algo_ids is None:
+            # 首次没有可用的列表，只能同步拉取
+            self.refresh()
+        elif time.monotonic() - self.updated > self.ttl:
+            self.refresh_in_background()
+        algo_ids = self.algo_ids
+        return None if algo_ids is None else list(algo_ids)
+
+    def refresh(self):
+        try:
+            algo_ids = self.load()
+            with self._lock:
+                self.algo_ids = algo_ids
+                self.updated = time.monotonic()
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"Error fetching signals: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self.refresh, name='algo-id-refresh', daemon=True).start()
+
+    def invalidate(self):
+        """某个 algoId 请求失败（策略可能已停止），下一次 get 时后台刷新"""
+        self.updated = 0.0
+
+
+def parse_positions(algo_id, data):
+    positions = []
+    for item in data:
+        pos = float(item['pos'])
+        positions.append({
+            'symbol': item['instId'].replace('-', '/'),
+            'contracts': pos,
+            'entryPrice': float(item['avgPx']),
+            'markPrice': float(item['markPx']),
+            'side': 'long' if pos > 0 else 'short',
+            'marginMode': item['mgnMode'],
+            'algoId': algo_id,  # 包含 `algoId` 方便平仓时使用
+        })
+    return positions
+
+
+async def fetch_signal_positions(api, algo_ids):
+    """并发请求每个信号策略的持仓，返回 (合并后的持仓列表, {algoId: 错误})"""
+    responses = await asyncio.gather(*(api.signal_positions(algoOrdType='contract', algoId=algo_id)
+                                       for algo_id in algo_ids), return_exceptions=True)
+    positions = []
+    errors = {}
+    for algo_id, response in zip(algo_ids, responses):
+        if isinstance(response, Exception):
+            errors[algo_id] = response
+        elif response.get('code') != '0':
+            errors[algo_id] = response.get('msg')
+        else:
+            positions.extend(parse_positions(algo_id, response.get('data', [])))
+    return positions, errors
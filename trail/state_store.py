@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""追踪状态（最高盈利、档位、已检测数量）的持久化
+
+机器人的 highest_profits / current_tiers / detected_positions 原来只在内存里，重启后所有仓位回到档位 “无”、
+峰值清零。StateStore 用 SQLite（WAL，synchronous=NORMAL）保存每个仓位的最新状态，
+按 (symbol, side, marginMode) 区分仓位，双向持仓下同一品种的多空两边各占一行。
+多账户时所有账户共用一个文件，各方法的 account 参数区分账户（account(name) 返回绑定账户的视图）：
+- record 只更新内存里的待写表，与上次写入相同的状态直接忽略，监控线程不做任何磁盘 I/O；
+- 后台线程每 flush_interval 秒把待写表在一个事务里批量写入（组提交），WAL 模式下提交不做 fsync，
+  进程崩溃不会丢已提交的数据，最多丢最近 flush_interval 秒的变化；
+- 启动时 load 一次读回本账户的全部行，再由 reconcile 与首个持仓快照对齐：品种、方向、保证金模式和开仓价都对得上的才恢复，
+  重启期间已平仓或平仓后重新开仓的仓位丢弃。
+"""
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from trail.diff import position_key
+
+TrailState = namedtuple('TrailState', 'symbol side margin_mode entry_price amount highest_profit tier updated')
+
+_COLUMNS = ('account', 'symbol', 'side', 'margin_mode', 'entry_price', 'amount', 'highest_profit', 'tier', 'updated')
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    account TEXT NOT NULL DEFAULT '',
+    symbol TEXT NOT NULL,
+    side TEXT NOT NULL,
+    margin_mode TEXT NOT NULL DEFAULT '',
+    entry_price REAL,
+    amount REAL,
+    highest_profit REAL,
+    tier TEXT,
+    updated REAL,
+    PRIMARY KEY (account, symbol, side, margin_mode)
+)
+"""
+
+
+def _migrate(conn):
+    """旧版本的表（只以 symbol 为主键、没有 account 列等）按新表结构重建，缺少的列取默认值"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(trail_state)")]
+    if not columns or tuple(columns) == _COLUMNS:
+        return
+    kept = ', '.join(column for column in _COLUMNS if column in columns)
+    conn.execute("BEGIN")
+    try:
+        conn.execute("DROP TABLE IF EXISTS trail_state_new")
+        conn.execute(_SCHEMA.format(table='trail_state_new'))
+        conn.execute(f"INSERT OR REPLACE INTO trail_state_new ({kept}) SELECT {kept} FROM trail_state")
+        conn.execute("DROP TABLE trail_state")
+        conn.execute("ALTER TABLE trail_state_new RENAME TO trail_state")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+class StateStore:
+    def __init__(self, path, flush_interval=1.0, logger=None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.flush_interval = flush_interval
+        self.logger = logger
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        _migrate(self.conn)
+        self.conn.execute(_SCHEMA.format(table='trail_state'))
+        self._db_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._saved = {}  # account -> {(symbol, side, marginMode): 最近一次 record 的状态（不含时间）}
+        self._pending = {}  # (account, symbol, side, marginMode) -> 待写入的行，None 表示删除
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='state-store', daemon=True)
+        self._thread.start()
+        # 退出时写完最后一批
+        atexit.register(self.close)
+
+    def account(self, account):
+        return AccountStateStore(self, account)
+
+    def load(self, account=''):
+        """读回该账户的全部状态，返回 {(symbol, side, marginMode): TrailState}"""
+        with self._db_lock:
+            rows = self.conn.execute(f"SELECT {', '.join(_COLUMNS[1:])} FROM trail_state WHERE account = ?",
+                                     (account,)).fetchall()
+        states = {row[:3]: TrailState(*row) for row in rows}
+        with self._lock:
+            saved = self._saved.setdefault(account, {})
+            for key, state in states.items():
+                saved.setdefault(key, state[3:7])
+        return states
+
+    def record(self, key, entry_price, amount, highest_profit, tier, account=''):
+        """key 为 trail.diff.position_key 返回的 (symbol, side, marginMode)"""
+        state = (entry_price, amount, highest_profit, tier)
+        with self._lock:
+            saved = self._saved.setdefault(account, {})
+            if saved.get(key) == state:
+                return
+            saved[key] = state
+            self._pending[(account,) + key] = (account,) + key + state + (time.time(),)
+
+    def remove(self, key, account=''):
+        with self._lock:
+            row_key = (account,) + key
+            if self._saved.get(account, {}).pop(key, None) is not None or row_key in self._pending:
+                self._pending[row_key] = None
+
+    def retain(self, keys, account=''):
+        """删除该账户不在 keys 中的状态（仓位已平）"""
+        keys = set(keys)
+        with self._lock:
+            stale = [key for key in self._saved.get(account, ()) if key not in keys]
+        for key in stale:
+            self.remove(key, account)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        upserts = [row for row in pending.values() if row is not None]
+        deletes = [key for key, row in pending.items() if row is None]
+        with self._db_lock:
+            try:
+                self.conn.execute("BEGIN")
+                if upserts:
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO trail_state VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", upserts)
+                if deletes:
+                    self.conn.executemany("DELETE FROM trail_state WHERE account = ? AND symbol = ? AND side = ?"
+                                          " AND margin_mode = ?", deletes)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                # 写入失败时放回待写表，下次重试（期间新的变化优先）
+                with self._lock:
+                    for key, row in pending.items():
+                        self._pending.setdefault(key, row)
+                raise
+        return len(pending)
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+        with self._db_lock:
+            self.conn.close()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"保存追踪状态时出现异常: {e}")
+
+
+class AccountStateStore:
+    """共用 StateStore 中一个账户的视图，接口与 StateStore 相同；close 由 StateStore 的拥有者负责"""
+
+    def __init__(self, store, account):
+        self.store = store
+        self.account = account
+
+    def load(self):
+        return self.store.load(self.account)
+
+    def record(self, key, entry_price, amount, highest_profit, tier):
+        self.store.record(key, entry_price, amount, highest_profit, tier, self.account)
+
+    def remove(self, key):
+        self.store.remove(key, self.account)
+
+    def retain(self, keys):
+        self.store.retain(keys, self.account)
+
+    def flush(self):
+        return self.store.flush()
+
+    def close(self):
+        pass
+
+
+def reconcile(restored, positions, tolerance=1e-6):
+    """用首个持仓快照校验恢复的状态，返回 (可恢复的 {key: TrailState}, 丢弃的 key 列表)
+
+    品种、方向、保证金模式都相同的仓位仍在，且开仓价相同（相对误差 tolerance 以内）才恢复；
+    开仓价变了说明重启期间平仓后重新开仓或加仓，按新仓位处理。
+    """
+    live = {}
+    for position in positions:
+        if float(position['contracts']) != 0:
+            live[position_key(position)] = position
+    kept = {}
+    dropped = []
+    for key, state in restored.items():
+        position = live.get(key)
+        if position is not None:
+            entry = float(position['entryPrice'])
+            if abs(entry - state.entry_price) <= tolerance * max(abs(entry), 1e-12):
+                kept[key] = state
+                continue
+        dropped.append(key)
+    return kept, dropped
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""用母账户 API key 发现子账户，转成 Supervisor 的账户配置
+
+view_list 按创建时间倒序分页，每页最多 100 个，after 取上一页最后一个子账户的 ts；
+iter_sub_accounts 是异步生成器，每读到一页就逐个交出，不必等全部页读完。
+
+OKX 的持仓接口只能查 API key 所属账户自己的持仓，母账户 key 读不到子账户持仓，
+所以发现的子账户要在 okx_sub_accounts 里配了该子账户的 API key 才会被监控，没配的只记日志跳过。
+"""
+from okx import consts as c
+from okx.async_api import AsyncSubAccountAPI
+
+PAGE_LIMIT = 100
+
+
+async def iter_sub_accounts(api, enable='true', limit=PAGE_LIMIT):
+    after = ''
+    while True:
+        response = await api.view_list(enable=enable, after=after, limit=str(limit))
+        if response.get('code') != '0':
+            raise RuntimeError(f"读取子账户列表失败: {response.get('msg') or response}")
+        rows = response.get('data', [])
+        for row in rows:
+            yield row
+        if len(rows) < limit:
+            return
+        after = rows[-1]['ts']
+
+
+async def discover_accounts(master, overrides, logger, session):
+    """master：母账户配置（apiKey、secret、password、flag、base_api）；overrides：子账户名 -> 该子账户的 key 和参数
+
+    返回可监控的子账户配置列表，name 为子账户名，其余参数以 overrides 里的为准。
+    """
+    api = AsyncSubAccountAPI(master["apiKey"], master["secret"], master["password"], False,
+                             master.get("flag", '0'), base_api=master.get("base_api", c.API_URL), session=session)
+    accounts, skipped = [], []
+    async for row in iter_sub_accounts(api):
+        name = row['subAcct']
+        override = overrides.get(name)
+        if not override or not override.get("apiKey"):
+            skipped.append(name)
+            continue
+        accounts.append(dict(override, name=name))
+    if skipped:
+        shown = ', '.join(skipped[:20]) + (f" 等 {len(skipped)} 个" if len(skipped) > 20 else "")
+        logger.warning(f"以下子账户没有在 okx_sub_accounts 配置 API key，无法读取持仓，跳过: {shown}")
+    missing = set(overrides) - {account["name"] for account in accounts} - set(skipped)
+    if missing:
+        logger.warning(f"okx_sub_accounts 里的子账户不存在或已冻结: {', '.join(sorted(missing))}")
+    logger.info(f"发现 {len(accounts) + len(skipped)} 个子账户，监控其中 {len(accounts)} 个")
+    return accounts
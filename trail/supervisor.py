@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""多账户监管：一个进程、一个 asyncio 事件循环驱动多个 OKX 账户
+
+原来每个账户各跑一份 chua_ok.py：各自的解释器、ccxt 实例（加载全部市场信息）、日志线程和轮询循环。
+Supervisor 为每个账户只建一个 TrailingBot（分档状态、触发簿、快照差分彼此独立）和一个轻量的
+OkxAccountAdapter，其余都共用：
+
+- 持仓走 okx 异步客户端直接读 /account/positions，用 trail.okx_ws.parse_position 转换，不加载 ccxt 市场信息；
+- 所有账户共用一个 aiohttp 连接池和一个事件循环，每轮并发拉取各账户持仓；
+- okx.ratelimit 按 API key 分桶，每个账户仍然有自己独立的限速预算，一个账户排队不影响其他账户；
+- 开启 ws_mark_price 时所有账户共用一条标记价格连接，订阅各账户持仓品种的并集，tick 只分发给持有该品种的账户；
+- 日志写同一个文件，每个账户一个子 logger（logger 名带账户名）；飞书通知共用一个队列，消息前加账户名；
+- 追踪状态共用一个 SQLite 文件（state_dir/okx_accounts.sqlite）和一个写入线程，按账户名区分行；
+- 拉取在事件循环里并发，分档判断（process_positions）放到线程池执行，不阻塞其他账户的请求。
+
+传入 sub_accounts 时启动前先用母账户 key（defaults 里的 apiKey）分页读取子账户列表（trail.subaccounts），
+配了 API key 的子账户与显式账户一起监控；传入 metrics（trail.metrics.LoopMetrics）时记录每轮和每个账户的耗时。
+
+平仓请求在事件循环里异步发出，close 返回 CLOSE_PENDING，TrailingBot 保留追踪状态直到交易所确认（on_close_result）
+或下一次快照里仓位消失；请求失败时记日志并通知，下一次持仓刷新后按原来的最高盈利和档位重新判断。
+"""
+import asyncio
+import threading
+import time
+
+import aiohttp
+
+from okx import consts as c
+from okx.async_api import AsyncAccountAPI, AsyncTradeAPI
+from trail.core import CLOSE_PENDING, ExchangeAdapter, TrailingBot
+from trail.diff import position_key
+from trail.market_data import OkxMarkPriceFeed, OKX_WS_PUBLIC_URL, symbol_to_inst_id
+from trail.notify import FeishuNotifier
+from trail.okx_ws import parse_position
+from trail.state_store import StateStore
+from trail.subaccounts import discover_accounts
+
+
+class SharedMarkFeed:
+    """所有账户共用的标记价格连接"""
+
+    def __init__(self, logger, url=OKX_WS_PUBLIC_URL):
+        self.feed = OkxMarkPriceFeed(self._on_tick, logger, url=url)
+        self.live = self.feed.live
+        self._lock = threading.Lock()
+        self._subscribers = {}  # 账户名 -> (on_mark_price, 品种集合)
+        self._by_symbol = {}  # 品种 -> [on_mark_price]
+
+    def view(self, name, on_mark_price):
+        return _MarkFeedView(self, name, on_mark_price)
+
+    def update(self, name, on_mark_price, symbols):
+        with self._lock:
+            self._subscribers[name] = (on_mark_price, set(symbols))
+            by_symbol = {}
+            for callback, held in self._subscribers.values():
+                for symbol in held:
+                    by_symbol.setdefault(symbol, []).append(callback)
+            self._by_symbol = by_symbol
+        self.feed.set_symbols(by_symbol.keys())
+
+    def _on_tick(self, symbol, mark_price):
+        for callback in self._by_symbol.get(symbol, ()):
+            callback(symbol, mark_price)
+
+    def start(self):
+        self.feed.start()
+
+    def stop(self):
+        self.feed.stop()
+
+
+class _MarkFeedView:
+    """TrailingBot 看到的 mark_feed：set_symbols 只更新本账户的订阅，连接由 SharedMarkFeed 统一启动"""
+
+    def __init__(self, shared, name, on_mark_price):
+        self.shared = shared
+        self.name = name
+        self.on_mark_price = on_mark_price
+        self.live = shared.live
+
+    def set_symbols(self, symbols):
+        self.shared.update(self.name, self.on_mark_price, symbols)
+
+    def start(self):
+        pass
+
+
+class _AccountNotifier:
+    """共用的飞书通知，消息前加账户名"""
+
+    def __init__(self, notifier, name):
+        self.notifier = notifier
+        self.name = name
+
+    def notify(self, message, key=None):
+        self.notifier.notify(f"[{self.name}] {message}", key=key and f"{self.name}:{key}")
+
+
+class OkxAccountAdapter(ExchangeAdapter):
+    """由 Supervisor 在事件循环里调用 fetch()；snapshot() 不可用"""
+
+    def __init__(self, config, logger, session, loop, shared_feed=None):
+        super().__init__(config, logger)
+        self.account = config["name"]
+        self.name = f"okx_{self.account}"
+        flag = config.get("flag", '0')
+        base_api = config.get("base_api", c.API_URL)
+        credentials = (config["apiKey"], config["secret"], config["password"])
+        # 同一 API key 的所有请求共用 okx.ratelimit 里该账户的限速桶
+        self.account_api = AsyncAccountAPI(*credentials, False, flag, base_api=base_api, session=session)
+        self.trade_api = AsyncTradeAPI(*credentials, False, flag, base_api=base_api, session=session)
+        self.loop = loop
+        self.shared_feed = shared_feed
+        self.position_mode = None
+        self.closing = {}  # position_key -> 进行中的平仓请求
+        self._closing_lock = threading.Lock()
+
+    async def load_position_mode(self):
+        try:
+            response = await self.account_api.get_account_config()
+            data = response.get('data', [])
+            if data and isinstance(data, list):
+                self.position_mode = data[0].get('posMode', 'single')
+                self.logger.info(f"当前持仓模式: {self.position_mode}")
+            else:
+                self.logger.error("无法检测持仓模式: 'data' 字段为空或格式不正确")
+                self.position_mode = 'single'
+        except Exception as e:
+            self.logger.error(f"无法检测持仓模式: {e}")
+
+    async def fetch(self):
+        response = await self.account_api.get_positions(instType='SWAP')
+        if response.get('code') != '0':
+            raise RuntimeError(response.get('msg') or response)
+        return [parse_position(row) for row in response.get('data', []) if float(row.get('pos') or 0) != 0]
+
+    def close(self, position):
+        key = position_key(position)
+        pos_side = position['side'] if self.position_mode == 'long_short_mode' else 'net'
+        # 线程池和标记价格推送线程里触发的平仓都交给事件循环发出；登记和调度在同一把锁里，
+        # _close 结束时要拿到同一把锁才能移除记录，不会先于登记执行
+        with self._closing_lock:
+            if key not in self.closing:  # 否则上一次平仓请求还没返回
+                self.closing[key] = asyncio.run_coroutine_threadsafe(
+                    self._close(key, position, pos_side), self.loop)
+        return CLOSE_PENDING
+
+    def pending_closes(self):
+        with self._closing_lock:
+            return list(self.closing.values())
+
+    async def _close(self, key, position, pos_side):
+        symbol = key[0]
+        try:
+            try:
+                response = await self.trade_api.close_positions(instId=symbol_to_inst_id(symbol),
+                                                                mgnMode=position['marginMode'],
+                                                                posSide=pos_side, autoCxl='true')
+                error = None if response.get('code') == '0' else response
+            except Exception as e:
+                error = e
+            if error is not None:
+                self.logger.error(f"Failed to close position for {symbol}: {error}")
+                self.notify(f"{symbol} 平仓请求失败：{error}，下一次持仓刷新后重新判断", key=f"close_failed:{symbol}")
+            if self.on_close_result is not None:
+                # 回调要拿 TrailingBot 的状态锁，放到线程池里，不阻塞事件循环
+                await self.loop.run_in_executor(None, self.on_close_result, position, error is None)
+        finally:
+            # 回调结束后才移除记录，期间的重复平仓只会得到 CLOSE_PENDING
+            with self._closing_lock:
+                self.closing.pop(key, None)
+
+    def mark_feed(self, on_mark_price):
+        if self.shared_feed is None:
+            return None
+        return self.shared_feed.view(self.account, on_mark_price)
+
+
+class Supervisor:
+    def __init__(self, accounts, defaults, logger, feishu_webhook=None, monitor_interval=4, sub_accounts=None,
+                 metrics=None):
+        """accounts：每个账户的配置（至少 name、apiKey、secret、password），与 defaults 合并后使用
+        sub_accounts：子账户名 -> 该子账户的 API key 和覆盖参数，传入（可以为空字典）即开启子账户发现
+        """
+        names = [account["name"] for account in accounts]
+        if len(set(names)) != len(names):
+            raise ValueError(f"账户名重复: {names}")
+        self.defaults = defaults
+        self.account_configs = [dict(defaults, **account) for account in accounts]
+        self.sub_accounts = sub_accounts
+        self.metrics = metrics
+        self.logger = logger
+        self.monitor_interval = monitor_interval
+        self.notifier = FeishuNotifier(feishu_webhook, logger) if feishu_webhook else None
+        self.state_store = None
+        if defaults.get("state_dir", "state"):
+            self.state_store = StateStore(f"{defaults.get('state_dir', 'state')}/okx_accounts.sqlite", logger=logger)
+        self.shared_feed = None
+        if defaults.get("ws_mark_price", False):
+            self.shared_feed = SharedMarkFeed(logger, url=defaults.get("ws_public_url", OKX_WS_PUBLIC_URL))
+        self.session = None
+        self.bots = []
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        connector = aiohttp.TCPConnector(limit=c.ASYNC_MAX_IN_FLIGHT, keepalive_timeout=30)
+        self.session = aiohttp.ClientSession(connector=connector)
+        if self.sub_accounts is not None:
+            await self.discover()
+        for config in self.account_configs:
+            logger = self.logger.getChild(config["name"])
+            adapter = OkxAccountAdapter(config, logger, self.session, loop, self.shared_feed)
+            notifier = _AccountNotifier(self.notifier, config["name"]) if self.notifier else None
+            state_store = None
+            if self.state_store and config.get("state_dir", "state"):
+                state_store = self.state_store.account(config["name"])
+            self.bots.append(TrailingBot(adapter, config, logger, monitor_interval=self.monitor_interval,
+                                         notifier=notifier, state_store=state_store))
+        await asyncio.gather(*(bot.adapter.load_position_mode() for bot in self.bots))
+        if self.shared_feed:
+            self.shared_feed.start()
+        self.logger.info(f"已启动 {len(self.bots)} 个账户")
+
+    async def discover(self):
+        names = {config["name"] for config in self.account_configs}
+        for account in await discover_accounts(self.defaults, self.sub_accounts, self.logger, self.session):
+            if account["name"] in names:
+                self.logger.warning(f"子账户 {account['name']} 已在 okx_accounts 中配置，以 okx_accounts 为准")
+                continue
+            self.account_configs.append(dict(self.defaults, **account))
+
+    async def poll(self, bot):
+        started = time.perf_counter()
+        try:
+            positions = await bot.adapter.fetch()
+        except Exception as e:
+            bot.logger.error(f"Error fetching positions: {e}")
+            if self.metrics:
+                self.metrics.fetch_error(bot.adapter.account)
+            return
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, bot.process_positions, positions)
+        except Exception as e:
+            bot.logger.error(f"处理持仓时出现异常: {e}")
+        if self.metrics:
+            self.metrics.observe_account(bot.adapter.account, time.perf_counter() - started, len(bot.positions_cache))
+
+    async def poll_all(self):
+        """并发拉取所有账户；标记价格推送在线时只有价格变化的仓位由 TrailingBot 降频判断"""
+        started = time.perf_counter()
+        await asyncio.gather(*(self.poll(bot) for bot in self.bots))
+        if self.metrics:
+            self.metrics.observe_cycle(time.perf_counter() - started)
+
+    async def close(self):
+        if self.shared_feed:
+            self.shared_feed.stop()
+        pending = [future for bot in self.bots for future in bot.adapter.pending_closes()]
+        if pending:
+            await asyncio.gather(*(asyncio.wrap_future(future) for future in pending), return_exceptions=True)
+        if self.session is not None:
+            await self.session.close()
+        if self.state_store is not None:
+            self.state_store.close()
+
+    async def run(self):
+        await self.start()
+        try:
+            while True:
+                await self.poll_all()
+                await asyncio.sleep(self.monitor_interval)
+        finally:
+            await self.close()
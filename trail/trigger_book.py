@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""按价格索引的触发簿
+
+把每个仓位当前的止损线（档位保护线、移动止盈线、硬止损三者取最高）换算成绝对触发价，
+按品种、方向放进有序列表。价格更新时用二分查找只取出真正越过触发价或创出新高的仓位，
+其余仓位不做任何计算；创新高时也只重新定价该仓位本身。
+
+空头的价格统一取负数存储，这样多空两边都可以按 “价格 <= 止损价即触发、价格 > 峰值价即创新高” 处理。
+
+同一品种的大量仓位会在同一个 tick 一起创新高，逐个重新定价和逐个调整有序列表是尾延迟的来源。
+创新高的仓位改为并入该方向的 cohort：它们的峰值都等于 cohort_peak，之后继续创新高只更新这一个数。
+止损价离峰值至少有一段固定比例（guard，由分档参数算出），价格回撤进这段以内之前不可能触发任何 cohort 仓位，
+回撤到 guard 时才一次性重新定价并排序插回列表。
+"""
+from bisect import bisect_left, insort
+
+TIER_NONE = "无"
+TIER_LOW = "低档保护止盈"
+TIER_FIRST = "第一档移动止盈"
+TIER_SECOND = "第二档移动止盈"
+
+TIER_PARAMS = (
+    "stop_loss_pct",
+    "low_trail_stop_loss_pct",
+    "trail_stop_loss_pct",
+    "higher_trail_stop_loss_pct",
+    "low_trail_profit_threshold",
+    "first_trail_profit_threshold",
+    "second_trail_profit_threshold",
+)
+
+# 单个 tick 内创新高的仓位超过该数量时整体重排止损价列表
+_BATCH = 64
+
+
+class Trigger:
+    __slots__ = ("key", "symbol", "side", "entry_price", "highest_profit", "tier", "stop_profit",
+                 "stop_price", "peak_price", "_sign")
+
+    def __init__(self, key, symbol, side, entry_price):
+        self.key = key
+        self.symbol = symbol
+        self.side = side
+        self.entry_price = entry_price
+        self._sign = 1 if side == 'long' else -1
+
+    def price_at(self, profit_pct):
+        """盈亏百分比对应的价格（空头为负数）"""
+        return self._sign * self.entry_price * (1 + self._sign * profit_pct / 100)
+
+    def crossed(self, price):
+        return self._sign * price <= self.stop_price
+
+
+class _Book:
+    """一个品种方向的索引；cohort 里的仓位峰值都等于 cohort_peak，止损价延后到价格回撤接近止损线时才计算"""
+    __slots__ = ("stops", "peaks", "cohort", "cohort_peak")
+
+    def __init__(self):
+        self.stops = []  # [(止损价, key)] 升序，不含 cohort
+        self.peaks = []  # [(峰值价, key)] 升序，不含 cohort
+        self.cohort = set()
+        self.cohort_peak = None
+
+    def __bool__(self):
+        return bool(self.stops) or bool(self.cohort)
+
+
+class TriggerBook:
+    def __init__(self, stop_loss_pct, low_trail_stop_loss_pct, trail_stop_loss_pct, higher_trail_stop_loss_pct,
+                 low_trail_profit_threshold, first_trail_profit_threshold, second_trail_profit_threshold):
+        self.stop_loss_pct = stop_loss_pct
+        self.low_trail_stop_loss_pct = low_trail_stop_loss_pct
+        self.trail_stop_loss_pct = trail_stop_loss_pct
+        self.higher_trail_stop_loss_pct = higher_trail_stop_loss_pct
+        self.low_trail_profit_threshold = low_trail_profit_threshold
+        self.first_trail_profit_threshold = first_trail_profit_threshold
+        self.second_trail_profit_threshold = second_trail_profit_threshold
+        self.triggers = {}
+        # (symbol, side) -> _Book
+        self._books = {}
+        # 有符号价格 <= cohort_peak * guard 时 cohort 里才可能有仓位越过止损价
+        self._guard = {'long': self._guard_ratio(1), 'short': self._guard_ratio(-1)}
+
+    @classmethod
+    def from_config(cls, config, prefix=''):
+        """从机器人配置读取分档参数，chua_ok_all.py 的全仓参数使用 prefix='all_'"""
+        return cls(*(config[prefix + name] for name in TIER_PARAMS))
+
+    def tier(self, highest_profit):
+        if highest_profit >= self.second_trail_profit_threshold:
+            return TIER_SECOND
+        if highest_profit >= self.first_trail_profit_threshold:
+            return TIER_FIRST
+        if highest_profit >= self.low_trail_profit_threshold:
+            return TIER_LOW
+        return TIER_NONE
+
+    def stop_profit(self, highest_profit):
+        """当前档位下的平仓线（盈亏百分比），与 monitor_positions 中档位判断加硬止损的组合等价"""
+        tier = self.tier(highest_profit)
+        stop = -self.stop_loss_pct
+        if tier == TIER_LOW:
+            stop = max(stop, self.low_trail_stop_loss_pct)
+        elif tier == TIER_FIRST:
+            stop = max(stop, highest_profit * (1 - self.trail_stop_loss_pct))
+        elif tier == TIER_SECOND:
+            stop = max(stop, highest_profit * (1 - self.higher_trail_stop_loss_pct))
+        return stop
+
+    def _guard_ratio(self, sign):
+        """止损价与峰值价之比的上界（空头为下界）
+
+        每一档内平仓线是常数或最高盈利的 (1 - 回撤比例) 倍，这个比值随最高盈利单调变化，极值在各档的起点。
+        """
+        ratios = [(1 + sign * self.stop_profit(h) / 100) / (1 + sign * h / 100)
+                  for h in (0, self.low_trail_profit_threshold, self.first_trail_profit_threshold,
+                            self.second_trail_profit_threshold) if sign * h < 100]
+        # 留一点余量吸收浮点误差，只会让重新定价略早一点发生
+        return max(ratios) * (1 + 1e-9) if sign > 0 else min(ratios) * (1 - 1e-9)
+
+    def __len__(self):
+        return len(self.triggers)
+
+    def __contains__(self, key):
+        return key in self.triggers
+
+    def get(self, key):
+        trigger = self.triggers.get(key)
+        if trigger is not None:
+            book = self._books[(trigger.symbol, trigger.side)]
+            if key in book.cohort:
+                self._settle(trigger, book.cohort_peak)
+        return trigger
+
+    def clear(self):
+        self.triggers.clear()
+        self._books.clear()
+
+    def upsert(self, key, symbol, side, entry_price, highest_profit=0):
+        """新增或重置一个仓位，highest_profit 沿用机器人记录的最高盈利"""
+        if side not in ('long', 'short'):
+            return None
+        self.remove(key)
+        trigger = Trigger(key, symbol, side, float(entry_price))
+        self._price(trigger, highest_profit)
+        self.triggers[key] = trigger
+        book = self._books.get((symbol, side))
+        if book is None:
+            book = self._books[(symbol, side)] = _Book()
+        insort(book.stops, (trigger.stop_price, key))
+        insort(book.peaks, (trigger.peak_price, key))
+        return trigger
+
+    def remove(self, key):
+        trigger = self.triggers.pop(key, None)
+        if trigger is None:
+            return None
+        book = self._books[(trigger.symbol, trigger.side)]
+        if key in book.cohort:
+            book.cohort.discard(key)
+            self._settle(trigger, book.cohort_peak)
+        else:
+            _discard(book.stops, (trigger.stop_price, key))
+            _discard(book.peaks, (trigger.peak_price, key))
+        if not book:
+            del self._books[(trigger.symbol, trigger.side)]
+        return trigger
+
+    def remove_many(self, keys):
+        """批量移除（例如一次暴跌同时触发大量仓位），每个品种方向只重建一次列表"""
+        grouped = {}
+        for key in keys:
+            trigger = self.triggers.pop(key, None)
+            if trigger is not None:
+                grouped.setdefault((trigger.symbol, trigger.side), set()).add(key)
+        for book_key, removed in grouped.items():
+            book = self._books[book_key]
+            book.cohort -= removed
+            book.stops[:] = [item for item in book.stops if item[1] not in removed]
+            book.peaks[:] = [item for item in book.peaks if item[1] not in removed]
+            if not book:
+                del self._books[book_key]
+
+    def on_price(self, symbol, price, raised=True):
+        """处理一次价格更新，返回越过止损价或创出新高的仓位 key 列表；raised 为 False 时只返回越过止损价的
+
+        创新高的仓位在簿内跟随新价格（需要时才重新定价）；越过止损价的仓位保持原样，由调用方平仓后 remove。
+        """
+        touched = []
+        for side, signed_price in (('long', price), ('short', -price)):
+            book = self._books.get((symbol, side))
+            if book is None:
+                continue
+            cohort = book.cohort
+            if cohort and signed_price > book.cohort_peak:
+                # cohort 整体创新高，只更新共同的峰值
+                book.cohort_peak = signed_price
+                if raised:
+                    touched.extend(cohort)
+            # 峰值价 < 当前价的其余仓位创出新高
+            index = bisect_left(book.peaks, (signed_price,))
+            if index:
+                keys = [key for _, key in book.peaks[:index]]
+                del book.peaks[:index]
+                if cohort and signed_price < book.cohort_peak:
+                    # 还没追上 cohort 的峰值（例如刚重置的仓位），单独重新定价
+                    self._reprice(book, keys, price)
+                else:
+                    self._join(book, keys, signed_price)
+                if raised:
+                    touched.extend(keys)
+            if cohort and signed_price <= book.cohort_peak * self._guard[side]:
+                self._materialize(book)
+            # 止损价 >= 当前价的仓位全部触发
+            index = bisect_left(book.stops, (signed_price,))
+            touched.extend(key for _, key in book.stops[index:])
+        return touched
+
+    def _reprice(self, book, keys, price):
+        stops, peaks = book.stops, book.peaks
+        old_stops = set()
+        new_stops = []
+        for key in keys:
+            trigger = self.triggers[key]
+            old_stops.add((trigger.stop_price, key))
+            profit_pct = (price - trigger.entry_price) / trigger.entry_price * 100 * trigger._sign
+            self._price(trigger, max(trigger.highest_profit, profit_pct))
+            new_stops.append((trigger.stop_price, key))
+            peaks.append((trigger.peak_price, key))
+        self._remove_stops(stops, old_stops)
+        if len(new_stops) <= _BATCH:
+            for item in new_stops:
+                insort(stops, item)
+        else:
+            stops.extend(new_stops)
+            stops.sort()
+        # 新峰值价都在剩余峰值之下，两段各自有序，sort 只做一次线性归并
+        peaks.sort()
+
+    def _join(self, book, keys, signed_price):
+        """创新高的仓位并入 cohort，止损价先从列表里移除，等回撤到 guard 再计算"""
+        triggers = self.triggers
+        self._remove_stops(book.stops, {(triggers[key].stop_price, key) for key in keys})
+        book.cohort.update(keys)
+        book.cohort_peak = signed_price
+
+    def _materialize(self, book):
+        """价格回撤到 guard 以内：按 cohort_peak 一次性重新定价全部 cohort 仓位，排序插回列表"""
+        triggers = self.triggers
+        for key in book.cohort:
+            trigger = triggers[key]
+            self._settle(trigger, book.cohort_peak)
+            book.stops.append((trigger.stop_price, key))
+            book.peaks.append((trigger.peak_price, key))
+        book.stops.sort()
+        book.peaks.sort()
+        book.cohort.clear()
+        book.cohort_peak = None
+
+    def _settle(self, trigger, signed_peak):
+        profit_pct = (signed_peak - trigger._sign * trigger.entry_price) / trigger.entry_price * 100
+        if profit_pct > trigger.highest_profit:
+            self._price(trigger, profit_pct)
+
+    @staticmethod
+    def _remove_stops(stops, removed):
+        if len(removed) <= _BATCH:
+            for item in removed:
+                _discard(stops, item)
+        else:
+            # 大批量同时创新高（例如刚建簿后的第一个上涨 tick）时整体重建，避免逐个删除的 O(k*n)
+            stops[:] = [item for item in stops if item not in removed]
+
+    def _price(self, trigger, highest_profit):
+        trigger.highest_profit = highest_profit
+        trigger.tier = self.tier(highest_profit)
+        trigger.stop_profit = self.stop_profit(highest_profit)
+        trigger.stop_price = trigger.price_at(trigger.stop_profit)
+        trigger.peak_price = trigger.price_at(highest_profit)
+
+
+def _discard(items, item):
+    index = bisect_left(items, item)
+    if index < len(items) and items[index] == item:
+        del items[index]
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""列式分档止盈引擎
+
+把 highest_profits / current_tiers / detected_positions 三个按品种的字典换成按行对齐的 NumPy 数组
+（开仓价、标记价、方向、最高盈利、档位），一次向量化计算就得到全部仓位的平仓掩码，
+用于多子账户、大量仓位时替代逐仓位的 Python 循环。档位规则与 monitor_positions 完全一致：
+触发平仓的条件是 盈亏 <= max(档位保护线/移动止盈线, -stop_loss_pct)。
+
+TrailingBot 在一轮需要判断的仓位达到 vector_min_batch 个时用 load() 整体载入快照、evaluate() 一次算完，
+只有需要平仓或档位/最高盈利变化（要记日志）的仓位才回到逐仓位的 evaluate_position。
+"""
+import numpy as np
+
+from trail.trigger_book import TIER_NONE, TIER_LOW, TIER_FIRST, TIER_SECOND, TIER_PARAMS
+
+TIER_NAMES = (TIER_NONE, TIER_LOW, TIER_FIRST, TIER_SECOND)
+
+
+class Ladder:
+    """分档规则的数组版本，输入最高盈利数组（任意形状），返回档位下标和平仓线"""
+
+    def __init__(self, stop_loss_pct, low_trail_stop_loss_pct, trail_stop_loss_pct, higher_trail_stop_loss_pct,
+                 low_trail_profit_threshold, first_trail_profit_threshold, second_trail_profit_threshold):
+        self.stop_loss_pct = stop_loss_pct
+        self.thresholds = np.array([low_trail_profit_threshold, first_trail_profit_threshold,
+                                    second_trail_profit_threshold], dtype=np.float64)
+        # 按档位下标查表：固定保护线（低档）与最高盈利的保留比例（第一、二档）
+        self.floor = np.array([-np.inf, low_trail_stop_loss_pct, -np.inf, -np.inf])
+        self.keep = np.array([0.0, 0.0, 1 - trail_stop_loss_pct, 1 - higher_trail_stop_loss_pct])
+
+    @classmethod
+    def from_config(cls, config, prefix=''):
+        return cls(*(config[prefix + name] for name in TIER_PARAMS))
+
+    def stop_line(self, highest):
+        tier = np.searchsorted(self.thresholds, highest, side='right')
+        trailing = np.where(tier >= 2, highest * self.keep[tier], -np.inf)
+        stop = np.maximum(self.floor[tier], trailing)
+        np.maximum(stop, -self.stop_loss_pct, out=stop)
+        return tier, stop
+
+
+class VectorEngine:
+    def __init__(self, stop_loss_pct, low_trail_stop_loss_pct, trail_stop_loss_pct, higher_trail_stop_loss_pct,
+                 low_trail_profit_threshold, first_trail_profit_threshold, second_trail_profit_threshold,
+                 capacity=1024):
+        self.ladder = Ladder(stop_loss_pct, low_trail_stop_loss_pct, trail_stop_loss_pct, higher_trail_stop_loss_pct,
+                             low_trail_profit_threshold, first_trail_profit_threshold, second_trail_profit_threshold)
+        self.keys = []
+        self.profit = np.empty(0)  # 最近一次 evaluate 的浮动盈亏，与 keys 对齐
+        self.rows = {}
+        self._alloc(capacity)
+
+    @classmethod
+    def from_config(cls, config, prefix='', capacity=1024):
+        return cls(*(config[prefix + name] for name in TIER_PARAMS), capacity=capacity)
+
+    def _alloc(self, capacity):
+        n = len(self.keys)
+        old = getattr(self, 'entry', None)
+        columns = (('entry', np.float64), ('mark', np.float64), ('size', np.float64), ('sign', np.float64),
+                   ('highest', np.float64), ('tier', np.int8), ('skip', np.bool_))
+        for name, dtype in columns:
+            column = np.zeros(capacity, dtype=dtype)
+            if old is not None:
+                column[:n] = getattr(self, name)[:n]
+            setattr(self, name, column)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def upsert(self, key, side, entry_price, size, mark_price=None, highest_profit=0):
+        """新增仓位或更新数量/开仓价；加仓时与 monitor_positions 一样重置最高盈利和档位，并跳过本轮判断，返回行号"""
+        row = self.rows.get(key)
+        if row is None:
+            row = len(self.keys)
+            if row == len(self.entry):
+                self._alloc(len(self.entry) * 2)
+            self.keys.append(key)
+            self.rows[key] = row
+            self.highest[row] = highest_profit
+            self.tier[row] = 0
+            self.skip[row] = False
+        elif size > self.size[row]:
+            self.highest[row] = 0
+            self.tier[row] = 0
+            self.skip[row] = True
+        self.entry[row] = entry_price
+        self.size[row] = size
+        self.sign[row] = 1.0 if side == 'long' else -1.0
+        self.mark[row] = entry_price if mark_price is None else mark_price
+        return row
+
+    def remove(self, key):
+        """删除一行，用最后一行填补空位保持数组紧凑"""
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        last = len(self.keys) - 1
+        if row != last:
+            moved = self.keys[last]
+            self.keys[row] = moved
+            self.rows[moved] = row
+            for column in (self.entry, self.mark, self.size, self.sign, self.highest, self.tier, self.skip):
+                column[row] = column[last]
+        self.keys.pop()
+
+    def load(self, keys, sides, entries, sizes, marks, highest):
+        """用一份快照整体替换全部行，各参数为与 keys 对齐的序列；不做加仓判断，调用方需先处理"""
+        n = len(keys)
+        self.keys = []
+        if n > len(self.entry):
+            self._alloc(max(n, len(self.entry) * 2))
+        self.keys = list(keys)
+        self.rows = dict(zip(self.keys, range(n)))
+        self.entry[:n] = entries
+        self.size[:n] = sizes
+        self.sign[:n] = np.where(np.asarray(sides) == 'long', 1.0, -1.0)
+        self.mark[:n] = marks
+        self.highest[:n] = highest
+        self.tier[:n] = 0
+        self.skip[:n] = False
+
+    def retain(self, keys):
+        """只保留给定的 key（例如本轮快照里仍存在的仓位）"""
+        keys = set(keys)
+        for key in [key for key in self.keys if key not in keys]:
+            self.remove(key)
+
+    def set_marks(self, keys, prices):
+        for key, price in zip(keys, prices):
+            row = self.rows.get(key)
+            if row is not None:
+                self.mark[row] = price
+
+    def evaluate(self, marks=None):
+        """一次计算全部仓位，更新最高盈利和档位，返回与 self.keys 对齐的平仓布尔掩码
+
+        marks 可直接传入与行对齐的标记价数组，省去按 key 逐个写入。
+        本轮刚加仓的行不更新最高盈利、也不会平仓，与 monitor_positions 加仓后 continue 一致。
+        """
+        n = len(self.keys)
+        if marks is not None:
+            self.mark[:n] = marks
+        entry = self.entry[:n]
+        highest = self.highest[:n]
+        skip = self.skip[:n]
+        profit = (self.mark[:n] - entry) / entry * 100 * self.sign[:n]
+        np.maximum(highest, np.where(skip, highest, profit), out=highest)
+        tier, stop = self.ladder.stop_line(highest)
+        self.tier[:n] = np.where(skip, 0, tier)
+        self.profit = profit
+        mask = (profit <= stop) & ~skip
+        skip[:] = False
+        return mask
+
+    def closing(self, mask):
+        return [self.keys[i] for i in np.flatnonzero(mask)]
+
+    def state(self, key):
+        row = self.rows[key]
+        return {
+            'highest_profit': float(self.highest[row]),
+            'tier': TIER_NAMES[self.tier[row]],
+            'mark_price': float(self.mark[row]),
+        }
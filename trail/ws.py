@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+import time
+
+from websockets.sync.client import connect
+
+
+class WsThread(threading.Thread):
+    """带自动重连的 WebSocket 后台线程
+
+    子类实现 on_open（登录/订阅）和 on_message，连接状态变化通过 on_state 回调通知，
+    主循环据此在推送和 REST 轮询之间切换。
+    """
+
+    def __init__(self, url, logger, ping_interval=20, reconnect_delay=1, max_reconnect_delay=30, on_state=None):
+        super().__init__(daemon=True)
+        self.url = url
+        self.logger = logger
+        self.ping_interval = ping_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.on_state = on_state
+        self.live = threading.Event()  # 已登录且收到首个快照，推送数据可用
+        self._stop_event = threading.Event()
+        self._ws = None
+
+    def stop(self):
+        self._stop_event.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+    def send_json(self, payload):
+        self._ws.send(json.dumps(payload))
+
+    def set_live(self, live):
+        if live == self.live.is_set():
+            return
+        if live:
+            self.live.set()
+        else:
+            self.live.clear()
+        if self.on_state:
+            self.on_state(live)
+
+    def connect_url(self):
+        """每次（重）连接前调用，需要先换取连接凭证（如 listenKey）的子类覆盖它"""
+        return self.url
+
+    def on_open(self):
+        pass
+
+    def on_message(self, message):
+        raise NotImplementedError
+
+    def ping(self):
+        self._ws.send('ping')
+
+    def run(self):
+        delay = self.reconnect_delay
+        while not self._stop_event.is_set():
+            try:
+                with connect(self.connect_url(), open_timeout=10, close_timeout=2) as ws:
+                    self._ws = ws
+                    self.logger.info(f"WebSocket 已连接: {self.url}")
+                    self.on_open()
+                    delay = self.reconnect_delay
+                    while not self._stop_event.is_set():
+                        try:
+                            message = ws.recv(timeout=self.ping_interval)
+                        except TimeoutError:
+                            self.ping()
+                            continue
+                        if message == 'pong':
+                            continue
+                        self.on_message(json.loads(message))
+            except Exception as e:
+                if not self._stop_event.is_set():
+                    self.logger.error(f"WebSocket 连接断开: {e}，{delay}s 后重连")
+            finally:
+                self._ws = None
+                self.set_live(False)
+            self._stop_event.wait(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)